@@ -0,0 +1,47 @@
+import copy
+import pickle
+import unittest
+import numpy as np
+
+from varro.algo.strategies.es.arena import PopulationArena
+from varro.algo.strategies.es.individual import ArrayIndividual, clone_individual
+
+
+class TestPopulationArena(unittest.TestCase):
+    def setUp(self):
+        self.arena = PopulationArena(ArrayIndividual)
+        self.pop = self.arena.adopt([ArrayIndividual(np.full(4, i, dtype=float)) for i in range(3)])
+
+    def test_rows(self):
+        rows = self.arena.rows(self.pop)
+        assert len(set(rows)) == 3 and (rows >= 0).all()
+        # Clones share the row of their parent
+        assert self.arena.row(clone_individual(self.pop[1])) == rows[1]
+
+    def test_foreign_individuals(self):
+        # Copies keep the row id of the individual they were copied from, but not its row
+        foreign = [copy.deepcopy(self.pop[0]), pickle.loads(pickle.dumps(self.pop[1])),
+                   ArrayIndividual(np.full(4, 7.0))]
+        np.testing.assert_array_equal(self.arena.rows(foreign), [-1, -1, -1])
+
+        pop = self.pop[:2] + foreign
+        np.testing.assert_array_equal(self.arena.matrix(pop)[:, 0], [0, 1, 0, 1, 7])
+
+        self.arena.recycle(pop)
+        assert sorted(self.arena.free_rows) == sorted(set(range(6)) - set(self.arena.rows(self.pop[:2])))
+
+    def test_bit_features(self):
+        # One flipped bit is one bit away, wherever it sits in its byte
+        genome = np.zeros(4, dtype=np.uint8)
+        pop = [ArrayIndividual(genome)]
+        for bit in range(8):
+            flipped = genome.copy()
+            flipped[1] = 1 << bit
+            pop.append(ArrayIndividual(flipped))
+        features = PopulationArena(ArrayIndividual).features(pop)
+        assert features.shape == (9, 32)
+        np.testing.assert_array_equal(np.linalg.norm(features[1:] - features[0], axis=1), np.ones(8))
+
+
+if __name__ == '__main__':
+    unittest.main()
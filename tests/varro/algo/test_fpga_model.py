@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+
+from varro.algo.models import ModelFPGA
+from varro.algo.problems import ProblemFuncApprox
+
+
+class TestQuantize(unittest.TestCase):
+    def setUp(self):
+        self.model = ModelFPGA(ProblemFuncApprox('simple_step'))
+
+    def test_quantize(self):
+        # Booleans drive every port high or low
+        np.testing.assert_array_equal(self.model.quantize(np.array([0, 1], dtype=np.int8)), [0, 4095])
+        # Other integers are already quantized, floats are scaled to the ports of their feature
+        np.testing.assert_array_equal(self.model.quantize(np.array([[3, 5]])), [3 | 5 << 6])
+        np.testing.assert_array_equal(self.model.quantize(np.array([0.0, 0.5, 1.0])), [0, 2048, 4095])
+
+    def test_too_many_features(self):
+        with self.assertRaises(ValueError):
+            self.model.quantize(np.zeros((2, 784)))
+
+
+class TestModelFPGA(unittest.TestCase):
+    def test_multiplex_on_farm(self):
+        with self.assertRaises(ValueError):
+            ModelFPGA(ProblemFuncApprox('simple_step'), tiles='simple_step', boards='sim:2', multiplex=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from varro.algo.problems.mnist import ProblemMNIST, cache_path
+
+
+class TestMNISTCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_path = os.path.join(self.tmpdir.name, 'mnist.npz')
+        # The first pixel of every image is its index, its label is the index mod 10
+        x_train = np.zeros((97, 28, 28), dtype=np.uint8)
+        x_train[:, 0, 0] = np.arange(97)
+        np.savez(self.data_path,
+                 x_train=x_train,
+                 y_train=(np.arange(97) % 10).astype(np.uint8),
+                 x_test=np.zeros((10, 28, 28), dtype=np.uint8),
+                 y_test=np.arange(10, dtype=np.uint8))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_minibatches(self):
+        np.random.seed(0)
+        problem = ProblemMNIST(data_path=self.data_path)
+        assert isinstance(problem.full_X_train, np.memmap)
+        assert problem.input_dim == 784 and problem.X_test.shape == (10, 784)
+        order = np.asarray(problem.full_X_train[:, 0])
+        assert sorted(order) == list(range(97))
+        position = np.argsort(order)
+
+        starts = []
+        for _ in range(10):
+            # Images keep their labels
+            np.testing.assert_array_equal(problem.X_train[:, 0] % 10, problem.y_train)
+            # Minibatches of 19 images are contiguous slices of the cache, which
+            # wrap around its end, and views of it if they do not
+            start = position[problem.X_train[0, 0]]
+            np.testing.assert_array_equal(problem.X_train[:, 0], order[(start + np.arange(19)) % 97])
+            assert start + 19 > 97 or np.shares_memory(problem.X_train, problem.full_X_train)
+            starts.append(start)
+            problem.reset_train_set()
+
+        # A pass is five minibatches in a row, the next pass starts somewhere else
+        for first, second in zip(starts[:4] + starts[5:9], starts[1:5] + starts[6:]):
+            assert second == (first + 19) % 97
+        assert starts[5] != (starts[4] + 19) % 97
+
+    def test_cache_reused(self):
+        ProblemMNIST(data_path=self.data_path)
+        mtime = os.path.getmtime(cache_path(self.data_path, 'X_train'))
+        ProblemMNIST(data_path=self.data_path)
+        assert os.path.getmtime(cache_path(self.data_path, 'X_train')) == mtime
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import importlib.util
+import numpy as np
+
+from varro.algo.models.nn import ACTIVATIONS, layer_spec, num_parameters, forward_population
+from varro.algo.problems import ProblemFuncApprox
+
+
+def forward(parameters, X, layers):
+    """Forward pass of one individual, layer by layer"""
+    outputs = np.asarray(X, dtype=np.float64).reshape(-1, layers[0][0])
+    idx = 0
+    for units_in, units_out, activation in layers:
+        kernel = parameters[idx:idx + units_in * units_out].reshape(units_in, units_out)
+        idx += units_in * units_out
+        bias = parameters[idx:idx + units_out]
+        idx += units_out
+        outputs = ACTIVATIONS[activation](outputs @ kernel + bias)
+    return outputs
+
+
+class TestForwardPopulation(unittest.TestCase):
+    def setUp(self):
+        self.problem = ProblemFuncApprox('sin')
+        self.layers = layer_spec(self.problem)
+        self.population = np.random.normal(size=(8, num_parameters(self.layers)))
+
+    def test_layer_spec(self):
+        assert self.layers == [(1, 6, 'tanh'), (6, 4, 'tanh'), (4, 2, 'tanh'), (2, 1, 'tanh')]
+        assert num_parameters(self.layers) == 12 + 28 + 10 + 3
+
+    def test_forward_population(self):
+        predictions = forward_population(self.population, self.problem.X_train, self.layers)
+        assert predictions.shape == (8, len(self.problem.X_train), 1)
+        for parameters, y_pred in zip(self.population, predictions):
+            np.testing.assert_allclose(y_pred, forward(parameters, self.problem.X_train, self.layers),
+                                       rtol=1e-4, atol=1e-5)
+
+    def test_softmax(self):
+        layers = [(784, 32, 'sigmoid'), (32, 10, 'softmax')]
+        rng = np.random.default_rng(0)
+        population = rng.normal(size=(4, num_parameters(layers)))
+        # Scaled to [0, 1] so the sigmoid layer does not saturate and the float32 pass
+        # stays close to the float64 reference
+        X = rng.integers(0, 256, size=(50, 28, 28)) / 255
+        predictions = forward_population(population, X, layers)
+        np.testing.assert_allclose(predictions.sum(axis=-1), 1, rtol=1e-5)
+        np.testing.assert_allclose(predictions[2], forward(population[2], X, layers), rtol=1e-4, atol=1e-4)
+
+    def test_backends(self):
+        from varro.algo.models import ModelNN
+        model = ModelNN(self.problem, backend='numpy')
+        with self.assertRaises(ValueError):
+            model.predict(self.problem.X_train)
+        model.load_parameters(self.population[0])
+        np.testing.assert_allclose(model.predict(self.problem.X_train),
+                                   forward(self.population[0], self.problem.X_train, self.layers),
+                                   rtol=1e-4, atol=1e-5)
+        assert model.batched
+        # Keras models are evaluated one individual at a time
+        assert not ModelNN(self.problem).batched
+
+    @unittest.skipUnless(importlib.util.find_spec('keras'), 'keras is not installed')
+    def test_keras(self):
+        from varro.algo.models import ModelNN
+        model = ModelNN(self.problem)
+        predictions = model.predict_population(list(self.population), self.problem.X_train)
+        for parameters, y_pred in zip(self.population, predictions):
+            model.load_parameters(parameters)
+            np.testing.assert_allclose(y_pred, model.predict(np.asarray(self.problem.X_train)),
+                                       rtol=1e-4, atol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
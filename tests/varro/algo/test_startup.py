@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+from varro.util.variables import ROOT_DIR
+
+# Builds a model and an MNIST problem with the numpy backend, then reports the time
+# it took and whether TensorFlow or Keras were imported on the way
+STARTUP = """
+import sys, time
+start = time.time()
+from varro.algo.fit import fit
+from varro.algo.models import ModelNN
+from varro.algo.problems import ProblemFuncApprox, ProblemMNIST
+ModelNN(ProblemFuncApprox('sin'), backend='numpy')
+ModelNN(ProblemMNIST(data_path=sys.argv[1]), backend='numpy')
+print(time.time() - start, 'tensorflow' in sys.modules or 'keras' in sys.modules)
+"""
+
+
+class TestStartup(unittest.TestCase):
+    def test_numpy_backend_startup(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_path = os.path.join(tmpdir, 'mnist.npz')
+            np.savez(data_path,
+                     x_train=np.random.randint(0, 256, size=(100, 28, 28), dtype=np.uint8),
+                     y_train=np.arange(100, dtype=np.uint8) % 10,
+                     x_test=np.random.randint(0, 256, size=(10, 28, 28), dtype=np.uint8),
+                     y_test=np.arange(10, dtype=np.uint8))
+            env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+            output = subprocess.check_output([sys.executable, '-c', STARTUP, data_path], env=env, cwd=ROOT_DIR)
+
+        startup_time, imported_tf = output.decode().split()
+        print("Startup with the numpy backend took {:.2f}s".format(float(startup_time)))
+        assert imported_tf == 'False'
+
+
+if __name__ == '__main__':
+    unittest.main()
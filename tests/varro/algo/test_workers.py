@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+
+from varro.algo.models import ModelNN
+from varro.algo.problems import ProblemFuncApprox
+from varro.algo.strategies.sga import StrategySGA
+from varro.algo.strategies.strategy import fitness_score
+from varro.algo.workers import FitnessPool, evaluate_genomes, individual_seed
+
+
+class NoisyModel:
+    """Model whose predictions depend on the RNG"""
+    def load_parameters(self, parameters):
+        self.parameters = parameters
+
+    def predict(self, X, problem=None):
+        return np.asarray(X) * self.parameters[0] + np.random.normal(size=len(X))
+
+
+class TestWorkers(unittest.TestCase):
+    def setUp(self):
+        self.problem = ProblemFuncApprox('sin')
+        self.model = ModelNN(self.problem, backend='numpy')
+        self.genomes = list(np.random.normal(size=(10, self.model.parameters_shape)))
+
+    def test_matches_serial(self):
+        serial = []
+        for genome in self.genomes:
+            self.model.load_parameters(genome)
+            serial.append(tuple(fitness_score(self.problem, self.model, reg_metric) for reg_metric in ('rmse', 'mae')))
+
+        pool = FitnessPool(self.model, 3)
+        try:
+            assert pool.evaluate(self.genomes, self.problem, ('rmse', 'mae'), generation=0) == serial
+
+            # A new training set is shared again
+            self.problem.reset_train_set()
+            self.model.load_parameters(self.genomes[4])
+            scores = pool.evaluate(self.genomes, self.problem, ('rmse',), generation=1)
+            assert scores[4] == (fitness_score(self.problem, self.model),)
+        finally:
+            pool.close()
+
+    def test_rng_streams(self):
+        seeds = [individual_seed(3, index) for index in range(len(self.genomes))]
+        serial = evaluate_genomes(NoisyModel(), self.problem, self.genomes, ('rmse',), seeds)
+        for workers in (2, 4):
+            pool = FitnessPool(NoisyModel(), workers)
+            try:
+                assert pool.evaluate(self.genomes, self.problem, ('rmse',), generation=3) == serial
+            finally:
+                pool.close()
+
+    def test_matches_strategy(self):
+        # The scores a strategy calculates in its own process and in a pool are the same,
+        # the strategy is not initialized as it only needs its model, problem and generation
+        strategy = StrategySGA.__new__(StrategySGA)
+        strategy.model, strategy.problem, strategy.curr_gen, strategy.pool = NoisyModel(), self.problem, 3, None
+        strategy.workers = 1
+        np.random.seed(0)
+        serial = strategy.evaluate_fitness(self.genomes, ('rmse',))
+        # The strategy's own RNG streams are left as they were
+        assert np.random.randint(2 ** 31) == np.random.RandomState(0).randint(2 ** 31)
+
+        strategy.workers = 3
+        try:
+            assert strategy.evaluate_fitness(self.genomes, ('rmse',)) == serial
+        finally:
+            strategy.pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
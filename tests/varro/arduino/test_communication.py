@@ -0,0 +1,46 @@
+import os
+import time
+import unittest
+import numpy as np
+
+from varro.arduino import communication
+from varro.arduino.fake_device import FakeArduino
+
+
+class TestCommunication(unittest.TestCase):
+    def setUp(self):
+        self.device = FakeArduino()
+
+    def tearDown(self):
+        communication.disconnect()
+        self.device.close()
+        os.environ.pop('VARRO_ARDUINO_PORTS', None)
+
+    def test_find_ports(self):
+        os.environ['VARRO_ARDUINO_PORTS'] = '/dev/ttyACM1, /dev/ttyACM2'
+        assert communication.find_arduino_ports() == ['/dev/ttyACM1', '/dev/ttyACM2']
+
+    def test_lazy_reset_wait(self):
+        start_time = time.time()
+        connection = communication.connect(self.device.port, reset_time=0.3)
+        assert time.time() - start_time < 0.2
+        assert communication.connect(self.device.port) is connection
+
+        connection.link
+        assert time.time() - start_time >= 0.3
+
+    def test_legacy_baud_rate(self):
+        connection = communication.connect(self.device.port, reset_time=0)
+        assert connection.serial.baudrate == 115200
+        # The legacy sketches still talk at 9600 baud
+        legacy = communication.connect(self.device.port, reset_time=0, baud_rate=9600)
+        assert legacy is not connection and legacy.serial.baudrate == 9600
+
+    def test_evaluate(self):
+        os.environ['VARRO_ARDUINO_PORTS'] = self.device.port
+        communication.connect(reset_time=0)
+        y = communication.evaluate_arduino_words(np.array([0, 4095]))
+        assert np.allclose(y, [0, 1023 / 1024])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import serial
+
+from varro.arduino.fake_device import FakeArduino
+from varro.arduino.protocol import ArduinoLink, ProtocolError, encode_frame, decode_readings, \
+                                   crc16, pack_words, MAX_BATCH, MSG_READINGS
+
+
+class TestProtocol(unittest.TestCase):
+    def setUp(self):
+        self.device = FakeArduino()
+        self.port = serial.Serial(self.device.port, 115200, timeout=1)
+        self.link = ArduinoLink(self.port)
+
+    def tearDown(self):
+        self.port.close()
+        self.device.close()
+
+    def test_crc(self):
+        # CRC-16/CCITT-FALSE check value
+        assert crc16(b'123456789') == 0x29B1
+
+    def test_frame(self):
+        readings = np.arange(12, dtype='<u2').reshape(2, 6)
+        frame = encode_frame(MSG_READINGS, readings.tobytes())
+        assert len(frame) == 4 + 24 + 2
+        assert np.array_equal(decode_readings(frame[4:-2]), readings)
+
+    def test_evaluate(self):
+        inputs = np.random.randint(0, 2, size=2 * MAX_BATCH + 10)
+        readings = self.link.evaluate(inputs)
+        assert readings.shape == (len(inputs), 6)
+        assert np.array_equal(readings[:, 0], inputs * 1023)
+        assert self.device.frames == 3
+
+    def test_retry(self):
+        self.device.corrupt_next = True
+        readings = self.link.evaluate([1, 0, 1])
+        assert np.array_equal(readings[:, 3], [1023, 0, 1023])
+
+    def test_pack_words(self):
+        assert list(pack_words([0, 4095], 12)) == [0, 4095]
+        assert list(pack_words([[1, 2, 3]], 4)) == [0x321]
+        with self.assertRaises(ValueError):
+            pack_words([[1, 2, 3]], 5)
+
+    def test_evaluate_words(self):
+        words = np.random.randint(0, 4096, size=MAX_BATCH + 1)
+        readings = self.link.evaluate_words(words)
+        assert np.array_equal(readings[:, 5], words >> 2)
+
+    def test_error(self):
+        self.link.max_retries = 0
+        with self.assertRaises(ProtocolError):
+            self.link.evaluate_batch(np.zeros(MAX_BATCH + 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from varro.fpga.bitstream_cache import BitstreamCache
+
+
+class TestBitstreamCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.file_base_name = os.path.join(self.dir.name, '1')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_key(self):
+        cram = np.random.randint(0, 256, size=(4, 8), dtype=np.uint8)
+        key = BitstreamCache.key(cram)
+        assert BitstreamCache.key(cram.copy()) == key
+        cram[0, 0] ^= 1
+        assert BitstreamCache.key(cram) != key
+
+    def test_memory_lru(self):
+        cache = BitstreamCache(max_entries=2)
+        assert cache.lookup('a', self.file_base_name) is None
+        cache.store('a', b'bit a', b'svf a')
+        cache.store('b', b'bit b', b'svf b')
+        assert cache.lookup('a', self.file_base_name) == self.file_base_name
+        with open(self.file_base_name + '.svf', 'rb') as f:
+            assert f.read() == b'svf a'
+
+        # 'b' is the least recently used
+        cache.store('c', b'bit c', b'svf c')
+        assert cache.lookup('b', self.file_base_name) is None
+        assert cache.lookup('c', self.file_base_name) is not None
+        assert cache.hits == 2 and cache.misses == 2
+        assert cache.hit_rate == 0.5
+
+    def test_memory_bytes(self):
+        cache = BitstreamCache(max_bytes=30)
+        cache.store('a', b'bit a', b'svf a')
+        cache.store('b', b'bit b', b'svf b')
+        cache.store('c', b'bit c', b'svf c')
+        assert cache.bytes == 30
+        # 'a' is evicted to make room
+        cache.store('d', b'bit d', b'svf d')
+        assert list(cache.entries) == ['b', 'c', 'd'] and cache.bytes == 30
+        # A payload larger than the whole cache is not kept
+        cache.store('e', b'b' * 31, b'')
+        assert list(cache.entries) == ['b', 'c', 'd']
+
+    def test_disk(self):
+        cache_dir = os.path.join(self.dir.name, 'cache')
+        cache = BitstreamCache(max_entries=1, cache_dir=cache_dir)
+        cache.store('a', b'bit a', b'svf a')
+        # Payloads on disk are copied, so evicting them cannot pull them from under a flash
+        assert cache.lookup('a', self.file_base_name) == self.file_base_name
+        with open(self.file_base_name + '.svf', 'rb') as f:
+            assert f.read() == b'svf a'
+
+        # Payloads on disk outlive the cache object
+        assert BitstreamCache(cache_dir=cache_dir).lookup('a', self.file_base_name) is not None
+
+        cache.store('b', b'bit b', b'svf b')
+        assert not os.path.exists(os.path.join(cache_dir, 'a.svf'))
+        assert os.path.exists(self.file_base_name + '.svf')
+
+if __name__ == '__main__':
+    unittest.main()
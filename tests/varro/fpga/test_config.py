@@ -0,0 +1,20 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from varro.fpga.config import get_new_id, make_workspace
+
+
+class TestConfig(unittest.TestCase):
+    def test_new_ids_are_unique(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ids = list(executor.map(lambda _: get_new_id(), range(1000)))
+        assert len(set(ids)) == 1000
+
+    def test_workspaces_are_private(self):
+        workspaces = [make_workspace() for _ in range(3)]
+        assert len(set(workspaces)) == 3
+        assert all(os.path.isdir(workspace) for workspace in workspaces)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,58 @@
+"""
+Benchmarks bulk copies between numpy arrays and pytrellis CRAMs
+"""
+
 import time
+import unittest
+import numpy as np
+import pytrellis
 
-'''
-def printer(frame, event, arg):
-  if event in ['exception', 'opcode']:
-      #print(arg[0])
-      print(frame, event, arg)
-  return printer
+from varro.cython.fast_cram import load_cram_fast, load_cram_packed, load_cram_frames, \
+                                   dump_cram, dump_cram_packed
+from varro.util.variables import FPGA_BITSTREAM_SHAPE
 
-sys.settrace(printer)
-'''
 
-import numpy as np
-import pytrellis
+def timed(name, func, *args, repeats=5):
+    """Runs func repeats times and prints the best time"""
+    best = float('inf')
+    for _ in range(repeats):
+        start_time = time.time()
+        result = func(*args)
+        best = min(best, time.time() - start_time)
+    print('{}: {:.4f}s'.format(name, best))
+    return result
+
+
+class TestFastCram(unittest.TestCase):
+
+    def setUp(self):
+        self.cram = pytrellis.CRAM(*FPGA_BITSTREAM_SHAPE)
+        self.data = np.random.randint(0, 2, size=FPGA_BITSTREAM_SHAPE).astype(bool)
+        self.packed = np.packbits(self.data, axis=1)
+
+    def test_bool_round_trip(self):
+        timed('load_cram_fast', load_cram_fast, self.cram, self.data)
+        dumped = timed('dump_cram', dump_cram, self.cram)
+        self.assertTrue(np.array_equal(dumped, self.data))
+        self.assertEqual(self.cram.bit(7, 3), self.data[7, 3])
 
-from varro.cython.fast_cram import load_cram_fast
-from varro.misc.variables import PRJTRELLIS_DATABASE, CHIP_NAME, CHIP_COMMENT
+    def test_packed_round_trip(self):
+        timed('load_cram_packed', load_cram_packed, self.cram, self.packed)
+        dumped = timed('dump_cram_packed', dump_cram_packed, self.cram)
+        self.assertTrue(np.array_equal(dumped, self.packed))
+        self.assertTrue(np.array_equal(dump_cram(self.cram), self.data))
 
-cram = pytrellis.CRAM(13294, 1136)
+    def test_load_frames(self):
+        frames = np.array([0, 5, 13293])
+        load_cram_frames(self.cram, self.packed, frames)
+        dumped = dump_cram(self.cram)
+        self.assertTrue(np.array_equal(dumped[frames], self.data[frames]))
+        self.assertFalse(dumped[1:5].any())
 
-FPGA_BITSTREAM_SHAPE = (13294, 1136)
-data = np.zeros(FPGA_BITSTREAM_SHAPE, dtype=np.int8)
+    def test_wrong_shape(self):
+        with self.assertRaises(ValueError):
+            load_cram_fast(self.cram, self.data[:-1])
 
-start_time = time.time()
-load_cram_fast(cram, data)
-end_time = time.time()
 
-print(end_time - start_time)
+if __name__ == '__main__':
+    unittest.main()
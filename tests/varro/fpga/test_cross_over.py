@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+
+from varro.fpga.cross_over import cross_over, swap_bits
+from varro.fpga.genome import GenomeLayout, unpack_genome
+
+
+class TestCrossOver(unittest.TestCase):
+    def test_swap_bits(self):
+        packed1 = np.random.randint(0, 256, size=(3, 5), dtype=np.uint8)
+        packed2 = np.random.randint(0, 256, size=(3, 5), dtype=np.uint8)
+        bits1, bits2 = np.unpackbits(packed1, axis=1), np.unpackbits(packed2, axis=1)
+        swap_bits(packed1, packed2, 3, 29)
+        assert np.array_equal(np.unpackbits(packed1, axis=1)[:, 3:29], bits2[:, 3:29])
+        assert np.array_equal(np.unpackbits(packed2, axis=1)[:, 3:29], bits1[:, 3:29])
+        assert np.array_equal(np.unpackbits(packed1, axis=1)[:, :3], bits1[:, :3])
+        assert np.array_equal(np.unpackbits(packed1, axis=1)[:, 29:], bits1[:, 29:])
+
+    def test_preserves_tiles(self):
+        regions = [('A', 0, 10, 0, 100), ('B', 0, 10, 100, 50), ('C', 20, 5, 3, 500)]
+        layout = GenomeLayout()
+        ind1, ind2 = layout.random(2)
+        cram1, cram2 = unpack_genome(ind1).copy(), unpack_genome(ind2).copy()
+        cross_over(ind1, ind2, layout, regions)
+
+        # Bits only move between the individuals, tile by tile
+        child1, child2 = unpack_genome(ind1), unpack_genome(ind2)
+        assert np.array_equal(child1 ^ child2, cram1 ^ cram2)
+        for _, frame_offset, num_frames, bit_offset, bits_per_frame in regions:
+            tile = np.s_[frame_offset:frame_offset+num_frames, bit_offset:bit_offset+bits_per_frame]
+            assert np.array_equal(child1[tile], cram1[tile]) or np.array_equal(child1[tile], cram2[tile])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import threading
+import unittest
+import numpy as np
+
+from varro.fpga.farm import BoardFarm, SimulatedBoard
+
+
+def evaluate(board, cram):
+    board.load(cram)
+    return board.evaluate(np.arange(4)).sum()
+
+
+class TestFarm(unittest.TestCase):
+    def setUp(self):
+        self.crams = [np.random.randint(0, 256, size=16, dtype=np.uint8) for _ in range(40)]
+        reference = SimulatedBoard('reference')
+        self.expected = [evaluate(reference, cram) for cram in self.crams]
+
+    def test_map(self):
+        farm = BoardFarm([SimulatedBoard('sim{}'.format(i), evaluate_time=0.001) for i in range(3)])
+        assert farm.map(evaluate, self.crams) == self.expected
+        assert sum(stats['evaluated'] for stats in farm.stats.values()) == 40
+        assert all(stats['evaluated'] > 0 for stats in farm.stats.values())
+        farm.close()
+
+    def test_failed_board_is_removed(self):
+        boards = [SimulatedBoard('sim0', evaluate_time=0.001),
+                  SimulatedBoard('sim1', evaluate_time=0.001, fail_after=5)]
+        farm = BoardFarm(boards)
+        assert farm.map(evaluate, self.crams) == self.expected
+        assert list(farm.boards) == ['sim0']
+        farm.close()
+
+    def test_health_check_on_worker(self):
+        # The main thread must not talk to a board while its worker may be using it
+        board = SimulatedBoard('sim0', evaluate_time=0.001, fail_after=5)
+        threads = []
+        health_check = board.health_check
+        board.health_check = lambda: threads.append(threading.current_thread()) or health_check()
+        farm = BoardFarm([board, SimulatedBoard('sim1', evaluate_time=0.001)])
+        assert farm.map(evaluate, self.crams) == self.expected
+        assert threads and threading.main_thread() not in threads
+        farm.close()
+
+    def test_no_boards_left(self):
+        farm = BoardFarm([SimulatedBoard('sim0', fail_after=0)])
+        with self.assertRaises(RuntimeError):
+            farm.map(evaluate, self.crams)
+
+    def test_registry(self):
+        farm = BoardFarm.from_registry('sim:2')
+        assert sorted(farm.boards) == ['sim0', 'sim1']
+        farm.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from varro.fpga.flash import bitstream_to_svf
+
+
+class TestFlash(unittest.TestCase):
+    def test_bitstream_to_svf(self):
+        svf = bitstream_to_svf(bytes([0x01, 0x80, 0xF0]), 0x81113043)
+        assert "\t\tTDO  (81113043)" in svf
+        # Bytes are shifted in last first, with their bits reversed
+        assert "SDR\t24\tTDI  (0F0180);" in svf
+
+    def test_svf_rows(self):
+        svf = bitstream_to_svf(bytes(12000), 0x81113043)
+        assert "SDR\t64000\tTDI  (" in svf
+        assert "SDR\t32000\tTDI  (" in svf
+
+if __name__ == '__main__':
+    unittest.main()
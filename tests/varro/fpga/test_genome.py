@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+
+from varro.fpga.genome import pack_cram, unpack_genome, random_genomes, sample_flip_indices, flip_bits
+from varro.fpga.genome import GenomeLayout
+
+
+class TestGenome(unittest.TestCase):
+    def test_pack_round_trip(self):
+        genome = random_genomes(1)[0]
+        cram_bits = unpack_genome(genome)
+        assert cram_bits.shape == (13294, 1136)
+        assert np.array_equal(pack_cram(cram_bits), genome)
+
+    def test_flip_bits(self):
+        genome = random_genomes(1)[0]
+        original = genome.copy()
+        idx = sample_flip_indices(genome.size * 8, 1e-4)
+        flip_bits(genome, idx)
+        changed = np.flatnonzero(np.unpackbits(genome ^ original))
+        assert np.array_equal(changed, idx)
+
+    def test_masked_layout(self):
+        # The second tile overlaps the first one in 3 frames and 20 bits
+        layout = GenomeLayout([('A', 10, 5, 100, 40), ('B', 12, 5, 120, 30)])
+        assert layout.num_bits == 200 + 150 - 60
+        assert list(layout.tile_bounds) == [0, 200, 290]
+
+        genome = layout.random(1)[0]
+        cram_bits = layout.to_cram(genome)
+        assert cram_bits.sum() == np.unpackbits(genome).sum()
+        assert not cram_bits[:10].any() and not cram_bits[:, :100].any()
+        assert np.array_equal(layout.from_cram(cram_bits), genome)
+
+
+if __name__ == '__main__':
+    unittest.main()
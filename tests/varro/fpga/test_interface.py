@@ -12,5 +12,15 @@ class TestInterface(unittest.TestCase):
         config.write_config_file()
         assert os.path.isfile(config.config_file) == 1
 
+    def test_dirty_frames(self):
+        config = FpgaConfig()
+        config_data = np.random.choice(a=[False, True], size=(13294, 1136))
+        assert len(config.load_cram(config_data)) > 13000
+
+        config_data[[3, 4000], [10, 20]] ^= True
+        assert list(config.load_cram(config_data)) == [3, 4000]
+        assert len(config.load_cram(config_data)) == 0
+        assert not config.dirty_tiles
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+
+from varro.fpga.genome import GenomeLayout
+from varro.fpga.multiplex import relocate_tile, relocate_config, find_offsets, demux_readings, \
+                                  MultiplexLayout
+from varro.fpga.tile_index import TileIndex
+
+
+class TestMultiplex(unittest.TestCase):
+    def setUp(self):
+        # Four routing tiles stacked in column 5, one frame apart, and a unique PLL tile
+        names = ['CIB_R{}C5:CIB_LR'.format(row) for row in range(1, 5)] + ['CIB_R1C9:CIB_PLL']
+        self.tile_index = TileIndex(names=names,
+                                    types=[name.split(':')[1] for name in names],
+                                    frame_offset=[0, 1, 2, 3, 0],
+                                    num_frames=[1, 1, 1, 1, 1],
+                                    bit_offset=[0, 0, 0, 0, 100],
+                                    bits_per_frame=[8, 8, 8, 8, 8])
+
+    def test_relocate_tile(self):
+        assert relocate_tile('CIB_R19C125:CIB_LR', 6, -1) == 'CIB_R25C124:CIB_LR'
+        assert relocate_tile('MIB_R18C126', 1, 0) == 'MIB_R19C126'
+
+    def test_find_offsets(self):
+        offsets = find_offsets(['CIB_R1C5:CIB_LR', 'CIB_R2C5:CIB_LR'], 2, self.tile_index)
+        assert offsets == [(0, 0), (2, 0)]
+        with self.assertRaises(ValueError):
+            find_offsets(['CIB_R1C5:CIB_LR', 'CIB_R1C9:CIB_PLL'], 2, self.tile_index)
+
+    def test_relocate_config(self):
+        config = "\n".join([".tile A_R1C1:T", "arc: X Y", "", ".tile B_R2C2:U", "enum: Z 1", ""])
+        assert relocate_config(config, ['A_R1C1:T'], 3, 0) == ".tile A_R4C1:T\narc: X Y"
+
+    def test_compose(self):
+        layout = GenomeLayout(self.tile_index.regions(['CIB_R1C5:CIB_LR', 'CIB_R2C5:CIB_LR']))
+        multiplex = MultiplexLayout(layout, 2, tile_index=self.tile_index)
+        assert multiplex.windows[1] == ['CIB_R3C5:CIB_LR', 'CIB_R4C5:CIB_LR']
+
+        genomes = [np.array([0xFF, 0x00], dtype=np.uint8), np.array([0x0F, 0xF0], dtype=np.uint8)]
+        cram_bits = multiplex.compose(genomes)
+        assert np.array_equal(np.packbits(cram_bits[:4, :8], axis=1).ravel(), [0xFF, 0x00, 0x0F, 0xF0])
+
+    def test_too_many_windows(self):
+        # Every window needs an analog channel of its own
+        layout = GenomeLayout(self.tile_index.regions(['CIB_R1C5:CIB_LR']))
+        with self.assertRaises(ValueError):
+            MultiplexLayout(layout, 7, tile_index=self.tile_index)
+
+    def test_demux(self):
+        readings = np.array([[0, 0, 0, 1024, 1024, 1024]])
+        windows = demux_readings(readings, 2)
+        assert windows[0][0] == 0 and windows[1][0] == 1
+
+if __name__ == '__main__':
+    unittest.main()
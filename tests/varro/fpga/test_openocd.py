@@ -0,0 +1,67 @@
+import os
+import time
+import socket
+import tempfile
+import unittest
+
+from varro.fpga.openocd import OpenocdSession, FakeOpenocdServer
+
+
+class TestOpenocd(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeOpenocdServer()
+        self.session = OpenocdSession(host=self.server.host, port=self.server.port, start_server=False)
+        self.dir = tempfile.TemporaryDirectory()
+        self.svf_file = os.path.join(self.dir.name, '1.svf')
+        open(self.svf_file, 'w').close()
+
+    def tearDown(self):
+        self.session.close()
+        self.server.close()
+        self.dir.cleanup()
+
+    def test_flash(self):
+        self.session.flash(self.svf_file)
+        self.session.flash(self.svf_file)
+        assert len(self.server.commands) == 2
+        assert len(self.server.connections) == 1
+
+    def test_flash_error(self):
+        with self.assertRaises(RuntimeError):
+            self.session.flash(os.path.join(self.dir.name, 'missing.svf'))
+
+    def test_reconnect(self):
+        self.session.flash(self.svf_file)
+        self.server.drop_connections()
+        self.session.flash(self.svf_file)
+        assert self.session.reconnects == 1
+
+    def test_slow_flash(self):
+        # Commands may take longer than connecting
+        self.server.flash_time = 0.3
+        session = OpenocdSession(host=self.server.host, port=self.server.port, start_server=False,
+                                 connect_timeout=0.1)
+        session.flash(self.svf_file)
+        session.close()
+        assert len(self.server.commands) == 1 and session.reconnects == 0
+
+    def test_command_timeout(self):
+        # A command that timed out is not sent again while openocd may still run it
+        self.server.flash_time = 0.3
+        session = OpenocdSession(host=self.server.host, port=self.server.port, start_server=False,
+                                 command_timeout=0.1)
+        with self.assertRaises(socket.timeout):
+            session.flash(self.svf_file)
+        session.close()
+        time.sleep(0.3)
+        assert len(self.server.commands) == 1
+
+    def test_benchmark(self):
+        n = 200
+        start_time = time.time()
+        for _ in range(n):
+            self.session.flash(self.svf_file)
+        print('{:.0f} flashes/s'.format(n / (time.time() - start_time)))
+
+if __name__ == '__main__':
+    unittest.main()
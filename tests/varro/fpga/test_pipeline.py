@@ -0,0 +1,69 @@
+import time
+import threading
+import unittest
+
+from varro.fpga.pipeline import EvaluationPipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.slots_in_use = set()
+        self.board = None
+
+    def build(self, item, slot):
+        with self.lock:
+            assert slot not in self.slots_in_use
+            self.slots_in_use.add(slot)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.001)
+        with self.lock:
+            self.in_flight -= 1
+        return (item, slot)
+
+    def flash(self, artifact):
+        item, slot = artifact
+        with self.lock:
+            self.slots_in_use.remove(slot)
+        self.board = item
+
+    def measure(self, item):
+        assert self.board == item
+        return item * item
+
+    def test_results_in_order(self):
+        pipeline = EvaluationPipeline(self.build, self.flash, self.measure, lookahead=3)
+        assert pipeline.run(range(50)) == [i * i for i in range(50)]
+        assert self.max_in_flight <= 3
+        assert pipeline.stage_times['build'] > 0
+        pipeline.close()
+
+    def test_build_error(self):
+        def build(item, slot):
+            if item == 5:
+                raise ValueError('Cannot build')
+            return self.build(item, slot)
+
+        pipeline = EvaluationPipeline(build, self.flash, self.measure, lookahead=2)
+        with self.assertRaises(ValueError):
+            pipeline.run(range(10))
+        # No build of the failed run is still writing its slot
+        assert self.in_flight == 0
+        pipeline.close()
+
+    def test_measure_error(self):
+        # Builds in flight when measuring fails are done before run returns
+        def measure(item):
+            raise ValueError('Cannot measure')
+
+        pipeline = EvaluationPipeline(self.build, self.flash, measure, lookahead=3)
+        with self.assertRaises(ValueError):
+            pipeline.run(range(10))
+        assert self.in_flight == 0
+        pipeline.close()
+
+if __name__ == '__main__':
+    unittest.main()
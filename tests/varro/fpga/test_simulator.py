@@ -0,0 +1,96 @@
+import time
+import unittest
+import numpy as np
+
+from varro.arduino.protocol import NUM_CHANNELS
+from varro.fpga.simulator import normalize_wire, parse_word, parse_config, Netlist, FpgaSimulator, MAX_READING
+
+# Two input pins drive the first two LUTs of a PLC tile, which compute AND and XOR
+# (the XOR through its flip-flop) and drive the two output pins
+SYNTHETIC_CFG = "\n".join([
+    ".tile MIB_R18C126:PICR1_DQS3",
+    "enum: PIOD.BASE_TYPE INPUT_LVCMOS33",
+    "",
+    ".tile MIB_R19C126:PICR2",
+    "enum: PIOD.BASE_TYPE INPUT_LVCMOS33",
+    "",
+    ".tile R20C125:PLC2",
+    "arc: A0 N2E1_JPADDID_PIO",
+    "arc: B0 N1E1_JPADDID_PIO",
+    "arc: A1 N2E1_JPADDID_PIO",
+    "arc: B1 N1E1_JPADDID_PIO",
+    "word: SLICEA.K0.INIT 1000100010001000",
+    "word: SLICEA.K1.INIT 0110011001100110",
+    "enum: SLICEA.MODE LOGIC",
+    "unknown: F2B0",
+    "",
+    ".tile MIB_R38C126:PICR0",
+    "enum: PIOA.BASE_TYPE OUTPUT_LVCMOS33",
+    "arc: JPADDOA_PIO N18W1_F0",
+    "",
+    ".tile MIB_R39C126:PICR1_DQS0",
+    "enum: PIOA.BASE_TYPE OUTPUT_LVCMOS33",
+    "arc: JPADDOA_PIO N19W1_Q1",
+    ""])
+
+
+class TestSimulator(unittest.TestCase):
+    def setUp(self):
+        self.netlist = Netlist.from_config(parse_config(SYNTHETIC_CFG))
+
+    def test_normalize_wire(self):
+        assert normalize_wire(19, 125, 'N1_V02S0701') == 'R18C125_V02S0701'
+        assert normalize_wire(19, 125, 'S2W3_H06W0003') == 'R21C122_H06W0003'
+        assert normalize_wire(19, 125, 'A0') == 'R19C125_A0'
+        assert normalize_wire(19, 125, 'G_VPFN0000') == 'G_VPFN0000'
+
+    def test_parse_config(self):
+        tiles = parse_config(SYNTHETIC_CFG)
+        plc = tiles['R20C125:PLC2']
+        assert plc['arcs'][0] == ('A0', 'N2E1_JPADDID_PIO')
+        assert plc['enums'] == {'SLICEA.MODE': 'LOGIC'}
+        assert plc['unknown'] == ['F2B0']
+        # Words are printed most significant bit first
+        np.testing.assert_array_equal(parse_word('0001'), [True, False, False, False])
+        assert self.netlist.inputs == ['R18C126_JPADDID_PIO', 'R19C126_JPADDID_PIO']
+        assert self.netlist.outputs == ['R38C126_JPADDOA_PIO', 'R39C126_JPADDOA_PIO']
+
+    def test_evaluate(self):
+        outputs = self.netlist.evaluate_words([0, 1, 2, 3])
+        np.testing.assert_array_equal(outputs, [[0, 0], [0, 1], [0, 1], [1, 0]])
+
+        # Samples that do not fill whole bit plane words
+        words = np.random.randint(0, 4, size=1001)
+        a, b = words & 1, words >> 1 & 1
+        np.testing.assert_array_equal(self.netlist.evaluate_words(words), np.stack([a & b, a ^ b], axis=1))
+
+    def test_loop(self):
+        # An OR of an input with its own output reads low where the loop closes
+        config = "\n".join([".tile R1C1:PLC2",
+                            "arc: A0 F0",
+                            "arc: B0 JIN",
+                            "word: SLICEA.K0.INIT 1110111011101110"])
+        netlist = Netlist.from_config(parse_config(config), inputs=['R1C1_JIN'], outputs=['R1C1_F0'])
+        np.testing.assert_array_equal(netlist.evaluate_words([0, 1]), [[0], [1]])
+
+    def test_measure(self):
+        # The chip is only needed to load genomes, so it is skipped here
+        simulator = FpgaSimulator.__new__(FpgaSimulator)
+        simulator.netlist = self.netlist
+        simulator.channels = None
+        readings = simulator.measure([0, 1, 2, 3])
+        assert readings.shape == (4, NUM_CHANNELS)
+        np.testing.assert_array_equal(readings[:, 2:4], readings[:, :2])
+        np.testing.assert_array_equal(readings[:, :2], np.array([[0, 0], [0, 1], [0, 1], [1, 0]]) * MAX_READING)
+        np.testing.assert_allclose(simulator.evaluate([0, 3]), [0, MAX_READING / 2 / 1024])
+
+    def test_throughput(self):
+        words = np.random.randint(0, 4, size=4096)
+        start = time.time()
+        for _ in range(100):
+            self.netlist.evaluate_words(words)
+        print("{:.0f} evaluations of {} samples per second".format(100 / (time.time() - start), len(words)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import os
+import json
+import tempfile
+
+from varro.fpga.tile_index import TileIndex
+
+
+TILEGRID = {
+    'CIB_R19C125:CIB_LR': {'type': 'CIB_LR', 'start_frame': 100, 'cols': 10, 'start_bit': 40, 'rows': 20},
+    'CIB_R25C125:CIB_LR': {'type': 'CIB_LR', 'start_frame': 100, 'cols': 10, 'start_bit': 60, 'rows': 20},
+    'MIB_R10C126:BANKREF2': {'type': 'BANKREF2', 'start_frame': 0, 'cols': 4, 'start_bit': 0, 'rows': 8},
+}
+
+
+class TestTileIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database = os.path.join(self.tmpdir.name, 'db')
+        os.makedirs(os.path.join(database, 'ECP5', 'TEST-CHIP'))
+        with open(os.path.join(database, 'devices.json'), 'w') as f:
+            json.dump({'families': {'ECP5': {'devices': {'TEST-CHIP': {}}}}}, f)
+        with open(os.path.join(database, 'ECP5', 'TEST-CHIP', 'tilegrid.json'), 'w') as f:
+            json.dump(TILEGRID, f)
+        self.load_args = dict(database=database, chip_name='TEST-CHIP', cache_dir=os.path.join(self.tmpdir.name, 'cache'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookups(self):
+        index = TileIndex.load(**self.load_args)
+        assert index.region('CIB_R25C125:CIB_LR') == ('CIB_R25C125:CIB_LR', 100, 10, 60, 20)
+        assert index.tiles_at(105, 59) == ['CIB_R19C125:CIB_LR']
+        assert index.tiles_at(105, 200) == []
+        assert index.tiles_of_type('CIB_LR') == ['CIB_R19C125:CIB_LR', 'CIB_R25C125:CIB_LR']
+        assert list(index.tiles_in_frames([3, 50])) == [2]
+
+    def test_cache(self):
+        TileIndex.load(**self.load_args)
+        os.remove(os.path.join(self.load_args['database'], 'devices.json'))
+        index = TileIndex.load(**self.load_args)
+        assert index.regions() == TileIndex(**{key: getattr(index, key) for key in
+            ['names', 'types', 'frame_offset', 'num_frames', 'bit_offset', 'bits_per_frame']}).regions()
+        assert len(index) == 3
+
+if __name__ == '__main__':
+    unittest.main()
@@ -75,7 +75,12 @@ def main():
             novelty_metric=args.novelty_metric,
             halloffamesize=args.halloffamesize,
             earlystop=args.earlystop,
-            ckpt_dir=checkpoint_dir)
+            ckpt_dir=checkpoint_dir,
+            fpga_tiles=args.fpga_tiles,
+            fpga_boards=args.fpga_boards,
+            fpga_multiplex=args.fpga_multiplex,
+            nn_backend=args.nn_backend,
+            workers=args.workers)
         logger.stop_timer('EXPERIMENT.PY Fitting complete')
 
     else:
@@ -92,7 +97,9 @@ def main():
                         strategy=args.strategy,
                         input_data=args.input_data,
                         ckpt=ckpt,
-                        save_dir=save_dir)
+                        save_dir=save_dir,
+                        fpga_tiles=args.fpga_tiles,
+                        nn_backend=args.nn_backend)
 
             logger.stop_timer('EXPERIMENT.PY Making predictions using the best individual from each generation')
 
@@ -107,7 +114,9 @@ def main():
                     strategy=args.strategy,
                     input_data=args.input_data,
                     ckpt=args.ckpt,
-                    save_dir=save_dir)
+                    save_dir=save_dir,
+                    fpga_tiles=args.fpga_tiles,
+                    nn_backend=args.nn_backend)
 
             logger.stop_timer('EXPERIMENT.PY Making a single prediction')
 
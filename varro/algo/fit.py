@@ -29,7 +29,12 @@ def fit(model_type,
         halloffamesize=None,
         earlystop=False,
         grid_search=False,
-        ckpt_dir=None):
+        ckpt_dir=None,
+        fpga_tiles=None,
+        fpga_boards=None,
+        fpga_multiplex=1,
+        nn_backend='keras',
+        workers=1):
     """Control center to call other modules to execute the optimization
 
     Args:
@@ -50,6 +55,11 @@ def fit(model_type,
         halloffamesize (float): Percentage of individuals in population we store in the HallOfFame / Archive
         grid_search (bool): Whether grid search will be in effect
         ckpt_dir (bool): Directory to save checkpoints in
+        fpga_tiles (str): Name of the set of FPGA tiles to evolve, the whole CRAM if None
+        fpga_boards (str): Registry of the FPGA boards to evaluate on, a single board if None
+        fpga_multiplex (int): Number of individuals evaluated at once on one FPGA image
+        nn_backend (str): Backend that evaluates neural networks, 'keras' or 'numpy'
+        workers (int): Number of worker processes that calculate fitness
 
     Returns:
         fittest_ind_score: Scalar of the best individual in the population's fitness score
@@ -70,10 +80,17 @@ def fit(model_type,
     # 2. Choose Target Platform
     logger.log("Loading target platform...")
     if model_type == 'nn':
-        from varro.algo.models import ModelNN as Model  # Import here so we don't load tensorflow if not needed
+        from varro.algo.models import ModelNN as Model
+        model = Model(problem, backend=nn_backend)
     elif model_type == 'fpga':
         from varro.algo.models import ModelFPGA as Model
-    model = Model(problem)
+        model = Model(problem, tiles=fpga_tiles, boards=fpga_boards, multiplex=fpga_multiplex)
+    elif model_type == 'fpga_sim':
+        from varro.algo.models import ModelFPGASim as Model
+        model = Model(problem, tiles=fpga_tiles)
+
+    if workers > 1 and model_type != 'nn':
+        raise ValueError('Worker processes can only evaluate neural networks')
 
     logger.stop_timer('FIT.PY Loading target platform')
     logger.start_timer()
@@ -93,7 +110,8 @@ def fit(model_type,
             ckpt=ckpt,
             halloffamesize=halloffamesize,
             earlystop=earlystop,
-            ckpt_dir=ckpt_dir
+            ckpt_dir=ckpt_dir,
+            workers=workers
         )
 
     # 3. Set Strategy
@@ -2,49 +2,307 @@
 This module contains the FPGA model class.
 """
 
-import numbers
+import atexit
+from os.path import join
 import numpy as np
 
-from varro.algo.models import Model
+from varro.algo.models import Model, MemberModel
+from varro.fpga.genome import GenomeLayout
 
 
 class ModelFPGA(Model):
-    FPGA_BITSTREAM_SHAPE = (13294, 1136)
+    batched = True
+
+    def __init__(self, problem, tiles=None, template=None, boards=None, multiplex=1):
+        """FPGA architecture wrapper class
+
+        Args:
+            problem (Problem): The problem the FPGA is evolved for
+            tiles (str): Name of the set of tiles in varro.fpga.tiles.TILE_SETS to evolve,
+                the whole CRAM is evolved if None
+            template (np.ndarray of bools): CRAM bits outside the evolved tiles
+            boards (str): Registry of a farm of boards to evaluate on (see
+                BoardFarm.from_registry), a single board if None
+            multiplex (int): Number of individuals placed in disjoint windows of one
+                FPGA image and evaluated at once, needs tiles and a single board
+
+        """
+        if boards is not None and multiplex > 1:
+            raise ValueError('Multiplexing individuals is not supported on a farm of boards')
 
-    def __init__(self, problem):
-        """FPGA architecture wrapper class"""
         self.name = 'fpga'
+        # One FPGA workspace is reused by every individual
+        self.config = None
+        # Bitstream writers and files of the slots of the evaluation pipeline
+        self.slots = None
+        self.pipeline = None
+        self.bitstream_cache = None
+        # Cache key of the bitstream flashed by the pipeline
+        self.flashed_key = None
+
+        self.farm = None
+        if boards is not None:
+            from varro.fpga.farm import BoardFarm
+            self.farm = BoardFarm.from_registry(boards)
+
+        if tiles is None:
+            self.genome_layout = GenomeLayout()
+        else:
+            from varro.fpga.tile_index import TileIndex
+            from varro.fpga.tiles import TILE_SETS
+            self.genome_layout = GenomeLayout(TileIndex.load().regions(TILE_SETS[tiles]), template=template)
+
+        self.multiplex = None
+        self.multiplex_config = None
+        if multiplex > 1:
+            from varro.fpga.multiplex import MultiplexLayout
+            from varro.fpga.tiles import TILE_SET_IO_TILES, SIMPLE_STEP_CFG
+            if tiles is None:
+                raise ValueError('Multiplexing individuals needs a set of tiles to evolve')
+            self.multiplex = MultiplexLayout(self.genome_layout, multiplex,
+                                             io_tiles=TILE_SET_IO_TILES[tiles],
+                                             fixed_config=SIMPLE_STEP_CFG)
 
     def load_parameters(self, parameters):
         """Loads an array of parameters into this model.
 
         Args:
-            parameters (np.ndarray of floats): The new values for the parameters
-                - e.g. [[0, 1, 0, 1, ..., 0],
-                        [1, 0, 1, 1, ..., 1],
-                        ...
-                        [0, 0, 1, 0, ..., 0]]
+            parameters (np.ndarray of uint8): The bit-packed genome, 8 CRAM bits per byte
+                - e.g. [0b01010011, 0b11101001, ..., 0b00100110]
 
         """
-        from varro.fpga.interface import FpgaConfig
-        reshaped_parameters = parameters.reshape(self.FPGA_BITSTREAM_SHAPE)
-        self.config = FpgaConfig(reshaped_parameters)
+        self.load_config()
+        self.flashed_key = None
+        self.config.load_fpga(self.genome_layout.to_packed_cram(parameters))
 
-    def predict(self, X, problem=None):
-        """Evaluates the model on given data."""
+    def load_config(self):
+        """Creates the FPGA workspace on first use"""
+        if self.config is None:
+            from varro.fpga.bitstream_cache import BitstreamCache
+            from varro.fpga.interface import FpgaConfig
+            self.bitstream_cache = BitstreamCache()
+            self.config = FpgaConfig(bitstream_cache=self.bitstream_cache)
+
+    def build_bitstream(self, parameters, slot):
+        """Writes the bitstream of a genome to the files of a pipeline slot,
+        unless the bitstream is cached.
+
+        Returns:
+            (base file name, cache key) of the bitstream
+        """
+        slot = self.slots[slot]
+        cram = self.genome_layout.to_packed_cram(parameters)
+        key = self.bitstream_cache.key(cram)
+        if key == slot['key']:
+            return slot['file_base_name'], key
+
+        file_base_name = self.bitstream_cache.lookup(key, slot['file_base_name'])
+        if file_base_name is None:
+            slot['writer'].load(cram)
+            bit, svf = slot['writer'].write(slot['file_base_name'])
+            self.bitstream_cache.store(key, bit, svf)
+            file_base_name = slot['file_base_name']
+        slot['key'] = key
+        return file_base_name, key
+
+    def flash_bitstream(self, bitstream):
+        """Flashes a bitstream built by build_bitstream, unless it is already on the FPGA"""
+        from varro.fpga.flash import flash_ecp5
+        file_base_name, key = bitstream
+        if key != self.flashed_key:
+            flash_ecp5(file_base_name)
+            self.flashed_key = key
+            # The workspace no longer knows what is on the FPGA
+            self.config.flashed = False
+
+    def fitness_pipeline(self, measure, lookahead=2):
+        """Returns a pipeline that evaluates genomes, building the bitstreams
+        of the next individuals while the current one is flashed and measured
+
+        Args:
+            measure (callable): measure(genome) returns the fitness of a genome
+                once it is flashed
+            lookahead (int): Number of bitstreams built ahead
+
+        """
+        from varro.fpga.bitstream import BitstreamWriter
+        from varro.fpga.pipeline import EvaluationPipeline
+
+        self.load_config()
+        if self.pipeline is None or self.pipeline.lookahead != lookahead:
+            self.slots = [{'writer': BitstreamWriter(),
+                           'file_base_name': join(self.config.basedir, 'slot{}'.format(slot)),
+                           'key': None} for slot in range(lookahead + 1)]
+            self.pipeline = EvaluationPipeline(build=self.build_bitstream,
+                                               flash=self.flash_bitstream,
+                                               measure=measure,
+                                               lookahead=lookahead)
+        self.pipeline.measure = measure
+        return self.pipeline
+
+    def evaluate_on_farm(self, genomes, fitness_score):
+        """Evaluates genomes in parallel on the boards of the farm
+
+        Args:
+            genomes (list): Bit-packed genomes
+            fitness_score (callable): fitness_score(model) returns the fitness of a
+                model whose configuration is loaded
+
+        Returns:
+            The fitness scores of the genomes, in order
+        """
+        from varro.fpga.farm import BoardModel
+
+        def evaluate(board, genome):
+            board.load(self.genome_layout.to_packed_cram(genome))
+            return fitness_score(BoardModel(self, board))
+
+        return self.farm.map(evaluate, genomes)
+
+    def evaluate_multiplexed(self, genomes, fitness_score):
+        """Evaluates genomes k at a time, in the windows of one FPGA image
+
+        Args:
+            genomes (list): Bit-packed genomes
+            fitness_score (callable): fitness_score(model) returns the fitness of a
+                model whose configuration is loaded
+
+        Returns:
+            The fitness scores of the genomes, in order
+        """
+        from varro.fpga.multiplex import demux_readings
+        if self.multiplex_config is None:
+            from varro.fpga.interface import FpgaConfig
+            self.multiplex_config = FpgaConfig(tiles=self.multiplex.tiles,
+                                               fixed_config=self.multiplex.fixed_config)
+
+        k = self.multiplex.k
+        fitness_scores = []
+        for start in range(0, len(genomes), k):
+            self.multiplex_config.load_fpga(self.multiplex.compose(genomes[start:start + k]))
+            # Every window is measured in the same pass over the data
+            predictions = {}
+            def measure(X, problem):
+                if 'windows' not in predictions:
+                    readings = self.multiplex_config.measure(self.quantize(X, problem))
+                    predictions['windows'] = demux_readings(readings, k)
+                return predictions['windows']
+            fitness_scores += [fitness_score(MemberModel(measure, window))
+                               for window in range(len(genomes[start:start + k]))]
+        return fitness_scores
+
+    def evaluate_population(self, genomes, fitness_score):
+        """Evaluates genomes on the farm, in multiplexed images, or through the
+        bitstream pipeline of a single board
+
+        Args:
+            genomes (list): Bit-packed genomes
+            fitness_score (callable): fitness_score(model) returns the fitness of a
+                model whose configuration is loaded
+
+        Returns:
+            The fitness scores of the genomes, in order
+        """
+        if self.farm is not None:
+            fitness_scores = self.evaluate_on_farm(genomes, fitness_score)
+        elif self.multiplex is not None:
+            fitness_scores = self.evaluate_multiplexed(genomes, fitness_score)
+        else:
+            fitness_scores = self.fitness_pipeline(measure=lambda genome: fitness_score(self)).run(genomes)
+        self.log_stats()
+        return fitness_scores
+
+    def log_stats(self):
+        """Logs the time spent in each stage of the pipeline, the bitstream cache
+        hit rate and the throughput of every board of the farm"""
+        if self.pipeline is not None:
+            self.pipeline.log_times()
+        if self.bitstream_cache is not None:
+            self.bitstream_cache.log_stats()
+        if self.farm is not None:
+            self.farm.log_stats()
+
+    def quantize(self, X, problem=None):
+        """Quantizes inputs into port words, so every sample is sent to the FPGA in one write.
+
+        Each of the d features of a sample gets NUM_PORTS // d bits of the word.
+        Floats are scaled from the problem's range (or [0, 1]) to that width.
+        Booleans (and 0/1 integers) drive every port of their feature high or
+        low, like they drove the pins before; other integers are taken as
+        already quantized.
+
+        Raises:
+            ValueError if there are more features than ports
+        """
+        from varro.arduino.protocol import NUM_PORTS, pack_words
         X = np.asarray(X)
-        if isinstance(X[0], numbers.Real) and not isinstance(X[0], numbers.Integral):
-            if problem is not None:
-                X -= problem.minimum
-                X *= 255.0 / (problem.maximum - problem.minimum)
-            X = X.astype(int)
+        X = X.reshape(len(X), -1)
+        if X.shape[1] > NUM_PORTS:
+            raise ValueError('{} features do not fit in {} ports'.format(X.shape[1], NUM_PORTS))
+        width = NUM_PORTS // X.shape[1]
+        levels = 2 ** width - 1
+        if np.issubdtype(X.dtype, np.floating):
+            if problem is not None and problem.minimum is not None:
+                X = (X - problem.minimum) / (problem.maximum - problem.minimum)
+            X = np.rint(np.clip(X, 0, 1) * levels)
+        elif X.dtype == bool or (X.size and X.min() >= 0 and X.max() <= 1):
+            X = X.astype(np.int64) * levels
+        return pack_words(np.clip(X, 0, levels), width)
 
-        y = self.config.evaluate(X)
+    def predict(self, X, problem=None):
+        """Evaluates the model on given data."""
+        y = self.config.evaluate(self.quantize(X, problem))
         #TODO: scale y if necessary
-        #if isinstance(X[0], numbers.Real) and not isinstance(X[0], numbers.Integral):
         return y
 
-
     @property
     def parameters_shape(self):
-        return self.FPGA_BITSTREAM_SHAPE
+        return self.genome_layout.parameters_shape
+
+
+class ModelFPGASim(ModelFPGA):
+    def __init__(self, problem, tiles=None, template=None):
+        """FPGA model evaluated by a software simulation of the evolved tiles,
+        for development and tests without a board (see varro.fpga.simulator)
+
+        Args:
+            problem (Problem): The problem the FPGA is evolved for
+            tiles (str): Name of the set of tiles in varro.fpga.tiles.TILE_SETS to evolve,
+                the whole CRAM is evolved if None
+            template (np.ndarray of bools): CRAM bits outside the evolved tiles
+
+        """
+        super().__init__(problem, tiles=tiles, template=template)
+        self.name = 'fpga_sim'
+
+    def load_config(self):
+        """Creates the simulator on first use"""
+        if self.config is None:
+            from varro.fpga.simulator import FpgaSimulator
+            from varro.fpga.tiles import SIMPLE_STEP_TILES
+            tiles = self.genome_layout.tiles
+            self.config = FpgaSimulator(tiles=SIMPLE_STEP_TILES if tiles is None else tiles)
+            atexit.register(self.close)
+
+    def close(self):
+        """Returns the simulator's chip to its pool"""
+        if self.config is not None:
+            self.config.close()
+            self.config = None
+
+    def evaluate_population(self, genomes, fitness_score):
+        """Evaluates genomes one after the other in the simulator
+
+        Args:
+            genomes (list): Bit-packed genomes
+            fitness_score (callable): fitness_score(model) returns the fitness of a
+                model whose configuration is loaded
+
+        Returns:
+            The fitness scores of the genomes, in order
+        """
+        fitness_scores = []
+        for genome in genomes:
+            self.load_parameters(genome)
+            fitness_scores.append(fitness_score(self))
+        return fitness_scores
@@ -4,6 +4,9 @@ This module contains classes for defining each type of model.
 
 
 class Model:
+    # Whether the model evaluates a whole population at once with evaluate_population
+    batched = False
+
     def __init__(self, problem):
         """Wrapper class for different types of models."""
         self.name = 'Model'
@@ -25,3 +28,20 @@ class Model:
     @property
     def parameters_shape(self):
         pass
+
+
+class MemberModel:
+    def __init__(self, measure, member):
+        """View of one member of a batch of models that are evaluated at once,
+        e.g. a window of a multiplexed FPGA image or an individual of a population
+
+        Args:
+            measure (callable): measure(X, problem) returns the predictions of every member
+            member (int): Index of the member
+
+        """
+        self.measure = measure
+        self.member = member
+
+    def predict(self, X, problem=None):
+        return self.measure(X, problem)[self.member]
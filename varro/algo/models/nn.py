@@ -4,60 +4,149 @@ This module contains classes for defining each type of model.
 
 import os
 import numpy as np
+from scipy.special import expit
 
-from varro.algo.models import Model
+from varro.algo.models import Model, MemberModel
 from varro.algo.problems import Problem
 
 
+def softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+# NumPy versions of the Keras activations used by the architectures
+ACTIVATIONS = {
+    'sigmoid': expit,
+    'tanh': np.tanh,
+    'softmax': softmax,
+    'linear': lambda x: x,
+}
+
+
+def layer_spec(problem):
+    """Returns the (units in, units out, activation) of each dense layer of
+    the architecture for a problem"""
+    if problem.approx_type == Problem.CLASSIFICATION:
+        if problem.name == 'mnist':
+            # Smaller Architecture (the old one had 128 then 32 sigmoid units)
+            units = [(32, 'sigmoid'), (problem.output_dim, 'softmax')]
+        else:
+            # LAST LAYER:
+            # Problem-specific - if y is [0, 1], use sigmoid
+            units = [(12, 'sigmoid'), (4, 'sigmoid'), (problem.output_dim, 'sigmoid')]
+
+    elif problem.approx_type == Problem.REGRESSION:
+        # LAST LAYER:
+        # Problem-specific - if y is [-1, 1], use tanh
+        units = [(6, 'tanh'), (4, 'tanh'), (2, 'tanh'), (problem.output_dim, 'tanh')]
+    else:
+        raise ValueError('Unknown approximation type ' + str(problem.approx_type))
+
+    units_in = [problem.input_dim] + [units_out for units_out, _ in units[:-1]]
+    return [(int(u_in), int(u_out), activation) for u_in, (u_out, activation) in zip(units_in, units)]
+
+def num_parameters(layers):
+    """Returns the number of weights and biases of dense layers"""
+    return sum(units_in * units_out + units_out for units_in, units_out, _ in layers)
+
+def forward_population(parameters, X, layers):
+    """Evaluates the dense layers of every individual of a population on the same data
+
+    The genomes are laid out like Keras' get_weights(): the (in, out) kernel
+    then the bias of each layer in turn. Every layer is one batched matrix
+    product with the stacked (pop, in, out) kernels of the whole population.
+
+    Args:
+        parameters (np.ndarray): (pop, num_parameters(layers)) genomes
+        X (np.ndarray): (N, ...) inputs, flattened to (N, in) of the first layer
+        layers (list): (units in, units out, activation) of every layer
+
+    Returns:
+        (pop, N, out) np.ndarray of float32, the outputs of every individual
+    """
+    parameters = np.asarray(parameters, dtype=np.float32)
+    parameters = parameters.reshape(len(parameters), -1)
+    pop = len(parameters)
+    # Keras computes in float32
+    outputs = np.asarray(X, dtype=np.float32).reshape(-1, layers[0][0])
+
+    idx = 0
+    for units_in, units_out, activation in layers:
+        kernels = parameters[:, idx:idx + units_in * units_out].reshape(pop, units_in, units_out)
+        idx += units_in * units_out
+        biases = parameters[:, idx:idx + units_out].reshape(pop, 1, units_out)
+        idx += units_out
+        # The first layer sees the same data for every individual. The product
+        # of every individual is computed on its own, so its predictions do
+        # not depend on the rest of the population
+        outputs = np.matmul(outputs, kernels)
+        outputs = ACTIVATIONS[activation](outputs + biases)
+    return outputs
+
+
 class ModelNN(Model):
-    def __init__(self, problem):
+    def __init__(self, problem, backend='keras'):
         """Neural network architecture wrapper class specific to a problem
 
+        The Keras model is only built when it is first used, so the numpy
+        backend never imports Keras or TensorFlow.
+
         Args:
             problem (str): String specifying the type of problem we're dealing with
+            backend (str): 'keras' to predict with Keras, 'numpy' to predict with
+                forward_population
 
         """
-        from keras.layers import Dense, BatchNormalization
-        from keras.models import Sequential
-        # Suppress Tensorflow / Keras warnings
-        os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+        if backend not in ('keras', 'numpy'):
+            raise ValueError('Unknown NN backend ' + str(backend))
 
         self.name = 'nn'
+        self.backend = backend
+        self.layers = layer_spec(problem)
+        self._model = None
+        self.parameters = None
 
-        self.model = Sequential()
-        if problem.approx_type == Problem.CLASSIFICATION:
-            if problem.name == 'mnist':
-                # Old architecture
-                # self.model.add(Dense(128, input_dim=problem.input_dim, activation='sigmoid'))
-                # self.model.add(Dense(32, input_dim=problem.input_dim, activation='sigmoid'))
-
-                # Smaller Architecture
-                self.model.add(Dense(32, input_dim=problem.input_dim, activation='sigmoid'))
-
-                # LAST LAYER:
-                # Problem-specific - if y is [0, 1], use sigmoid
-                self.model.add(Dense(problem.output_dim, activation='softmax'))
-            else:
-                self.model.add(Dense(12, input_dim=problem.input_dim, activation='sigmoid'))
-                self.model.add(Dense(4, activation='sigmoid'))
-
-                # LAST LAYER:
-                # Problem-specific - if y is [0, 1], use sigmoid
-                self.model.add(Dense(problem.output_dim, activation='sigmoid'))
+        # Set the number of parameters we can change in the architecture
+        self.num_parameters_alterable = num_parameters(self.layers)
 
-        elif problem.approx_type == Problem.REGRESSION:
-            self.model.add(Dense(6, input_dim=problem.input_dim, activation='tanh'))
-            self.model.add(Dense(4, activation='tanh'))
-            self.model.add(Dense(2, activation='tanh'))
+    def __getstate__(self):
+        # The Keras model does not pickle, it is built again on first use
+        state = dict(self.__dict__)
+        state['_model'] = None
+        return state
 
-            # LAST LAYER:
-            # Problem-specific - if y is [-1, 1], use tanh
-            self.model.add(Dense(problem.output_dim, activation='tanh'))
-        else:
-            raise ValueError('Unknown approximation type ' + str(problem.approx_type))
-
-        # Set the number of parameters we can change in the architecture
-        self.num_parameters_alterable = np.sum([np.prod(layer.shape) for layer in self.model.get_weights()])
+    @property
+    def model(self):
+        """The Keras model, built on first use"""
+        if self._model is None:
+            from keras.layers import Dense
+            from keras.models import Sequential
+            # Suppress Tensorflow / Keras warnings
+            os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+            self._model = Sequential()
+            for idx, (units_in, units_out, activation) in enumerate(self.layers):
+                if idx == 0:
+                    self._model.add(Dense(units_out, input_dim=units_in, activation=activation))
+                else:
+                    self._model.add(Dense(units_out, activation=activation))
+            if self.parameters is not None:
+                self._model.set_weights(self.weights(self.parameters))
+        return self._model
+
+    def weights(self, parameters):
+        """Slices parameters into the kernel and bias of every layer, like Keras' get_weights()"""
+        # Pull out the numbers from the individual and
+        # load them as the shape from the model's parameters
+        ind_idx = 0
+        new_parameters = []
+        for units_in, units_out, _ in self.layers:
+            for shape in ((units_in, units_out), (units_out,)):
+                # Number of parameters we'll take from the individual for this layer
+                num_parameters_taken = int(np.prod(shape))
+                new_parameters.append(parameters[ind_idx:ind_idx+num_parameters_taken].reshape(shape))
+                ind_idx += num_parameters_taken
+        return new_parameters
 
     def load_parameters(self, parameters):
         """Loads an array of parameters into this model.
@@ -67,23 +156,53 @@ class ModelNN(Model):
                 - e.g. [0.93, 0.85, 0.24, ..., 0.19]
 
         """
-        # Pull out the numbers from the individual and
-        # load them as the shape from the model's parameters
-        ind_idx = 0
-        new_parameters = []
-        for idx, layer in enumerate(self.model.get_weights()):
-            # Number of parameters we'll take from the individual for this layer
-            num_parameters_taken = np.prod(layer.shape)
-            new_parameters.append(parameters[ind_idx:ind_idx+num_parameters_taken].reshape(layer.shape))
-            ind_idx += num_parameters_taken
-
-        # Set Weights using individual
-        self.model.set_weights(new_parameters)
+        self.parameters = np.asarray(parameters)
+        if self.backend == 'keras':
+            # Set Weights using individual
+            self.model.set_weights(self.weights(self.parameters))
 
     def predict(self, X, problem=None):
         """Evaluates the model on given data."""
+        if self.backend == 'numpy':
+            if self.parameters is None:
+                raise ValueError('The numpy backend predicts once parameters are loaded')
+            return forward_population(self.parameters[None], X, self.layers)[0]
         return self.model.predict(X)
 
+    def predict_population(self, population, X):
+        """Evaluates the model with the parameters of every individual of a population at once
+
+        Returns:
+            (pop, N, out) np.ndarray, the predictions of every individual
+        """
+        return forward_population(np.stack(population), X, self.layers)
+
+    @property
+    def batched(self):
+        """Only the numpy backend evaluates whole populations at once, Keras
+        models are evaluated one individual at a time"""
+        return self.backend == 'numpy'
+
+    def evaluate_population(self, genomes, fitness_score):
+        """Evaluates genomes with one batched NumPy forward pass for the whole population
+
+        Args:
+            genomes (list): Parameters of the individuals
+            fitness_score (callable): fitness_score(model) returns the fitness of a
+                model whose parameters are loaded
+
+        Returns:
+            The fitness scores of the genomes, in order
+        """
+        predictions = {}
+        def measure(X, problem):
+            # Data of a different generation is evaluated again
+            if predictions.get('X') is not X:
+                predictions['X'] = X
+                predictions['population'] = self.predict_population(genomes, X)
+            return predictions['population']
+        return [fitness_score(MemberModel(measure, member)) for member in range(len(genomes))]
+
     @property
     def parameters_shape(self):
         return self.num_parameters_alterable
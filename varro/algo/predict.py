@@ -15,7 +15,9 @@ def predict(model_type,
             strategy,
             input_data,
             ckpt,
-            save_dir):
+            save_dir,
+            fpga_tiles=None,
+            nn_backend='keras'):
     """Predicts the output from loading the model saved in checkpoint
     and saves y_pred into same path as input_data but with a _y_pred in the name
 
@@ -27,6 +29,8 @@ def predict(model_type,
         input_data (str): Path to the .npy that stores the np.ndarray to use as Input data for model
         ckpt (str): Location of checkpoint to load the population
         save_dir (str): Location of where to store the predictions
+        fpga_tiles (str): Name of the set of FPGA tiles that were evolved, the whole CRAM if None
+        nn_backend (str): Backend that evaluates neural networks, 'keras' or 'numpy'
 
     """
 
@@ -46,10 +50,14 @@ def predict(model_type,
     # 1. Choose Target Platform
     logger.log("Loading target platform...")
     if model_type == 'nn':
-        from varro.algo.models import ModelNN as Model  # Import here so we don't load tensorflow if not needed
+        from varro.algo.models import ModelNN as Model
+        model = Model(problem, backend=nn_backend)
     elif model_type == 'fpga':
         from varro.algo.models import ModelFPGA as Model
-    model = Model(problem)
+        model = Model(problem, tiles=fpga_tiles)
+    elif model_type == 'fpga_sim':
+        from varro.algo.models import ModelFPGASim as Model
+        model = Model(problem, tiles=fpga_tiles)
 
     logger.stop_timer('PREDICT.PY Choosing target platform')
     logger.start_timer()
@@ -60,8 +68,7 @@ def predict(model_type,
         from varro.fpga.config import bit_to_cram
 
         logger.start_timer()
-        predict_ind = bit_to_cram(ckpt)
-        parameters = bit_to_cram(ckpt)
+        predict_ind = parameters = model.genome_layout.from_cram(bit_to_cram(ckpt))
         
         logger.stop_timer('PREDICT.PY Loading data from bit file')
         logger.start_timer()
@@ -2,17 +2,73 @@
 This module contains a function that returns the training set for mnist
 """
 
+import os
+import urllib.request
 import numpy as np
 import random
 
+from varro.util.util import make_path
+from varro.util.variables import MNIST_URL, MNIST_DATA_PATH
 from varro.algo.problems import Problem
 
 # Percentage of total mnist train data
 # we will use for a single generation training
 TRAIN_SIZE = 0.2
+# Seed of the permutation the training set is cached in
+SHUFFLE_SEED = 100
+# Arrays of the memory-mapped cache, flat uint8 images and uint8 labels
+CACHE_ARRAYS = ('X_train', 'y_train', 'X_test', 'y_test')
+
+def load_mnist(data_path=MNIST_DATA_PATH, url=MNIST_URL):
+    """Loads MNIST without Keras, downloading its npz file first if it is missing
+
+    Returns:
+        (X_train, y_train), (X_test, y_test) like keras.datasets.mnist.load_data()
+    """
+    if not os.path.isfile(data_path):
+        make_path(os.path.dirname(data_path))
+        # Download next to the final file, so an interrupted download is not mistaken for it
+        urllib.request.urlretrieve(url, data_path + '.part')
+        os.replace(data_path + '.part', data_path)
+    with np.load(data_path) as data:
+        return (data['x_train'], data['y_train']), (data['x_test'], data['y_test'])
+
+def cache_path(data_path, name):
+    """Returns the path of an array of the cache of an MNIST npz file"""
+    return os.path.join(os.path.dirname(data_path), 'cache', '{}.npy'.format(name))
+
+def load_mnist_cache(data_path=MNIST_DATA_PATH, url=MNIST_URL):
+    """Memory-maps MNIST from a cache of flat uint8 .npy arrays, building the
+    cache from the npz file if it is missing or older than the npz file
+
+    The training set is cached in a fixed shuffled order, so random
+    minibatches are contiguous slices of it (see ProblemMNIST.reset_train_set).
+
+    Returns:
+        dict of CACHE_ARRAYS names to read-only memory-mapped arrays
+    """
+    paths = {name: cache_path(data_path, name) for name in CACHE_ARRAYS}
+    if not all(os.path.isfile(path) for path in paths.values()) or \
+            (os.path.isfile(data_path) and
+             min(os.path.getmtime(path) for path in paths.values()) < os.path.getmtime(data_path)):
+        (X_train, y_train), (X_test, y_test) = load_mnist(data_path, url)
+        permutation = np.random.RandomState(SHUFFLE_SEED).permutation(len(X_train))
+        arrays = {'X_train': X_train.reshape(len(X_train), -1)[permutation],
+                  'y_train': y_train[permutation],
+                  'X_test': X_test.reshape(len(X_test), -1),
+                  'y_test': y_test}
+        make_path(os.path.dirname(paths['X_train']))
+        for name in CACHE_ARRAYS:
+            # Written next to the final file, so a partial cache is never loaded
+            with open(paths[name] + '.part', 'wb') as f:
+                np.save(f, np.ascontiguousarray(arrays[name], dtype=np.uint8))
+            os.replace(paths[name] + '.part', paths[name])
+
+    return {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
 
 class ProblemMNIST(Problem):
-    def __init__(self):
+    def __init__(self, data_path=MNIST_DATA_PATH):
         # Set seed
         random.seed(100)
 
@@ -21,15 +77,15 @@ class ProblemMNIST(Problem):
         self.minimum = None
         self.maximum = None
 
-        # Set the X_train and y_train for function to approximate
-        from keras.datasets import mnist
-
-        # Load the MNIST dataset
-        (self.full_X_train, self.full_y_train), (self.X_test, self.y_test) = mnist.load_data()
+        # Memory-map the MNIST dataset, its images flattened into 784 dimension vectors
+        cache = load_mnist_cache(data_path)
+        self.full_X_train, self.full_y_train = cache['X_train'], cache['y_train']
+        self.X_test, self.y_test = cache['X_test'], cache['y_test']
 
-        # Flatten the MNIST images into a 784 dimension vector
-        self.full_X_train = np.array([x.flatten() for x in self.full_X_train])
-        self.X_test = np.array([x.flatten() for x in self.X_test])
+        # Start of the next minibatch in the shuffled training set,
+        # and the number of minibatches left in the current pass over it
+        self.train_offset = 0
+        self.train_batches_left = 0
         self.reset_train_set()
 
         # Set the input output dimensions for NN
@@ -41,8 +97,21 @@ class ProblemMNIST(Problem):
         for the function specified to approximate
 
         """
-        # Get a random set of training
-        # set indices from mnist training data
-        train_idxs = np.random.choice(np.arange(len(self.full_X_train)), size=int(len(self.full_X_train)*TRAIN_SIZE))
+        size = int(len(self.full_X_train)*TRAIN_SIZE)
+        if self.train_batches_left == 0:
+            # Every pass over the training set starts at a random offset, so
+            # its minibatches differ from those of the previous passes
+            self.train_offset = np.random.randint(len(self.full_X_train))
+            self.train_batches_left = max(len(self.full_X_train) // size, 1)
+        self.train_batches_left -= 1
 
-        self.X_train, self.y_train = self.full_X_train[train_idxs], self.full_y_train[train_idxs]
+        # Take the next slice of the shuffled training set, which is
+        # a view of the cache unless it wraps around its end
+        start, stop = self.train_offset, self.train_offset + size
+        if stop <= len(self.full_X_train):
+            self.X_train, self.y_train = self.full_X_train[start:stop], self.full_y_train[start:stop]
+        else:
+            stop -= len(self.full_X_train)
+            self.X_train = np.concatenate([self.full_X_train[start:], self.full_X_train[:stop]])
+            self.y_train = np.concatenate([self.full_y_train[start:], self.full_y_train[:stop]])
+        self.train_offset = stop % len(self.full_X_train)
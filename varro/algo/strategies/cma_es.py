@@ -13,6 +13,7 @@ from deap import base, creator, tools
 from collections import namedtuple
 
 from varro.algo.strategies.sga import StrategySGA
+from varro.algo.strategies.es.individual import ArrayIndividual
 
 
 class StrategyCMAES(StrategySGA):
@@ -54,7 +55,7 @@ class StrategyCMAES(StrategySGA):
                     del self.__novelty_score
 
         creator.create("NoveltyMax", Novelty, weights=(1.0,)) # Just Novelty
-        creator.create("Individual", np.ndarray, fitness=creator.NoveltyMax)
+        creator.create("Individual", ArrayIndividual, fitness=creator.NoveltyMax)
 
 
     def init_toolbox(self):
@@ -76,22 +77,25 @@ class StrategyCMAES(StrategySGA):
             pop (list): An iterable of Individual(np.ndarrays) that represent the individuals
             k: The nearest k neighbors will be used for novelty calculation
         """
+        # The genomes of the population are rows of the arena
+        genomes = self.arena.features(pop)
+
         # Init BallTree to find k-Nearest Neighbors
         if self.novelty_metric == 'wasserstein':
-            tree = BallTree(np.asarray(pop), metric='pyfunc', func=wasserstein_distance)
+            tree = BallTree(genomes, metric='pyfunc', func=wasserstein_distance)
         else:
-            tree = BallTree(np.asarray(pop), metric=self.novelty_metric)
+            tree = BallTree(genomes, metric=self.novelty_metric)
 
-        for ind in pop:
+        # Get the k-nearest neighbors of
+        # every individual at once
+        dist, ind_idxs = tree.query(genomes, k=k)
 
-            # Get the k-nearest neighbors of
-            # the individual
-            dist, ind_idxs = tree.query(ind.reshape(1, -1), k=k)
+        for ind, ind_dist in zip(pop, dist):
 
             # Ignore first value as it'll be 0 since
             # there's an instance of the same vector in
             # population
-            ind.fitness.novelty_score = np.mean(dist.flatten()[1:])
+            ind.fitness.novelty_score = np.mean(ind_dist[1:])
 
 
     def evaluate(self, pop):
@@ -0,0 +1,98 @@
+"""
+This module contains the contiguous storage for the genomes of a population
+"""
+
+import copy
+import numpy as np
+
+
+class PopulationArena:
+    def __init__(self, ind_class):
+        """Keeps the genomes of a population in a single preallocated 2d array
+
+        Every individual is a row view into the arena. The arena holds twice
+        as many rows as there are individuals: the rows of the current
+        population (the parents) and the rows offspring are written to
+        when they are altered, which swap roles every generation.
+
+        Args:
+            ind_class (type): The class of individuals (creator.Individual)
+        """
+        self.ind_class = ind_class
+        self.buffer = None
+        self.free_rows = []
+
+    def adopt(self, pop):
+        """Copies a population into the arena, allocating the arena on first use
+
+        Args:
+            pop (list): An iterable of Individual(np.ndarrays) e.g. freshly
+                initialized or loaded from a checkpoint
+
+        Returns:
+            List of the same individuals backed by rows of the arena
+        """
+        if self.buffer is None:
+            self.buffer = np.empty((2 * len(pop),) + pop[0].shape, dtype=pop[0].dtype)
+        self.free_rows = list(range(len(self.buffer)))
+        return [self.store(ind) for ind in pop]
+
+    def row(self, ind):
+        """Returns the arena row an individual is a view of, or -1 if it is not
+        backed by the arena (e.g. a hall of fame copy or an unpickled individual)"""
+        row = getattr(ind, 'arena_row', -1)
+        if self.buffer is None or not 0 <= row < len(self.buffer):
+            return -1
+        # Copies keep the row id of the individual they were copied from
+        if ind.__array_interface__['data'][0] != self.buffer[row].__array_interface__['data'][0]:
+            return -1
+        return row
+
+    def rows(self, pop):
+        """Returns the arena row each individual is a view of, -1 for those that are not"""
+        return np.fromiter((self.row(ind) for ind in pop), dtype=np.intp, count=len(pop))
+
+    def matrix(self, pop):
+        """Returns the genomes of a population as a (len(pop), genome) array"""
+        rows = self.rows(pop)
+        if (rows >= 0).all():
+            return self.buffer[rows]
+        return np.stack([np.asarray(ind) for ind in pop])
+
+    def features(self, pop):
+        """Returns the (len(pop), features) rows distances between the genomes of a
+        population are measured on, one feature per CRAM bit of bit-packed genomes"""
+        genomes = self.matrix(pop).reshape(len(pop), -1)
+        if genomes.dtype == np.uint8:
+            # Every flipped bit is one unit apart, wherever it sits in its byte
+            return np.unpackbits(genomes, axis=1)
+        return genomes
+
+    def recycle(self, pop):
+        """Frees every row that is not used by the individuals of pop
+
+        Call with the current population before generating offspring.
+        """
+        used = np.zeros(len(self.buffer), dtype=bool)
+        rows = self.rows(pop)
+        used[rows[rows >= 0]] = True
+        self.free_rows = list(np.flatnonzero(~used))
+
+    def materialize(self, ind):
+        """Returns an individual that owns a writeable row of the arena.
+
+        Offspring that still share their parent's row (see clone_individual)
+        are copied into a free row, any other individual is returned as is.
+        """
+        if ind.flags.writeable:
+            return ind
+        return self.store(ind)
+
+    def store(self, ind):
+        """Copies an individual into a free row of the arena"""
+        row = self.free_rows.pop()
+        self.buffer[row] = ind
+        new_ind = self.ind_class(self.buffer[row])
+        new_ind.__dict__.update(copy.deepcopy(ind.__dict__))
+        new_ind.arena_row = row
+        return new_ind
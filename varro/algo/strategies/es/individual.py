@@ -0,0 +1,56 @@
+"""
+This module contains the numpy array base class for individuals
+"""
+
+import copy
+import numpy as np
+
+
+class ArrayIndividual(np.ndarray):
+    """Base class for individuals that are stored as numpy arrays.
+
+    deap.creator swaps np.ndarray for a subclass that builds and pickles
+    every individual through a python list, which for FPGA genomes means
+    millions of numpy scalars per individual. This class wraps an existing
+    array without copying it and pickles the raw buffer instead.
+    """
+
+    def __new__(cls, iterable):
+        if isinstance(iterable, np.ndarray):
+            return np.asarray(iterable).view(cls)
+        return np.array(list(iterable)).view(cls)
+
+    def __deepcopy__(self, memo):
+        """Deep copies the array and its attributes (e.g. fitness)."""
+        copy_ = np.ndarray.copy(self)
+        copy_.__dict__.update(copy.deepcopy(self.__dict__, memo))
+        return copy_
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __reduce__(self):
+        return (self.__class__, (np.asarray(self),), self.__dict__)
+
+
+def clone_individual(ind):
+    """Clones an individual without copying its genome.
+
+    The clone is a read-only view of the parent's genome with its own copy
+    of the fitness, so selecting and keeping individuals is close to
+    zero-copy. Call materialize before altering the clone.
+    """
+    clone = type(ind)(ind)
+    clone.__dict__.update(copy.deepcopy(ind.__dict__))
+    clone.flags.writeable = False
+    return clone
+
+def materialize(ind):
+    """Returns an individual that owns a writeable copy of its genome.
+
+    Individuals that still share their parent's genome are copied (copy-on-write),
+    any other individual is returned as is.
+    """
+    if ind.flags.writeable:
+        return ind
+    return copy.deepcopy(ind)
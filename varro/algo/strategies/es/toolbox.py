@@ -9,13 +9,16 @@ import time
 from dowel import logger
 from deap import base, creator, tools
 
+from varro.algo.strategies.es.individual import clone_individual, materialize
+
 def es_toolbox(strategy_name,
                i_shape,
                evaluate,
                model_type,
                imutpb=None,
                imutmu=None,
-               imutsigma=None):
+               imutsigma=None,
+               genome_layout=None):
     """Initializes and configures the DEAP toolbox for evolving the parameters of a model.
 
     Args:
@@ -27,6 +30,7 @@ def es_toolbox(strategy_name,
         imutpb (float): Mutation probability for each individual's attribute
         imutmu (float): Mean parameter for the Gaussian Distribution we're mutating an attribute from
         imutsigma (float): Sigma parameter for the Gaussian Distribution we're mutating an attribute from
+        genome_layout (GenomeLayout): Layout of the CRAM bits in an FPGA individual
 
     Returns:
         toolbox (deap.base.Toolbox): Configured DEAP Toolbox for the algorithm.
@@ -98,19 +102,24 @@ def es_toolbox(strategy_name,
 
         logger.start_timer()
 
-        # ATTRIBUTE
-        toolbox.register("attribute", np.random.choice, [False, True])
-        size = np.prod(i_shape)
+        from varro.fpga.genome import GenomeLayout, sample_flip_indices, flip_bits
+        if genome_layout is None:
+            genome_layout = GenomeLayout()
 
-        logger.stop_timer('TOOLBOX.PY register("attribute")')
-        logger.start_timer()
+        # Individuals are bit-packed genomes, every byte of
+        # an individual holds 8 CRAM bits (see init_population)
+        num_bits = genome_layout.num_bits
 
 
         # MUTATION
         def mutate_individual(ind):
-            idx = np.argwhere(np.random.choice([False, True], size, p=[1 - imutpb, imutpb]))
-            ind[idx] = np.invert(ind[idx])
-            return ind
+            """Flips each bit of the individual with probability imutpb in-place
+
+            Returns:
+                A tuple of the mutated individual, like DEAP's mutation operators
+            """
+            flip_bits(ind, sample_flip_indices(num_bits, imutpb))
+            return ind,
         toolbox.register("mutate", mutate_individual)
 
         logger.stop_timer('TOOLBOX.PY register("mutate")')
@@ -119,7 +128,7 @@ def es_toolbox(strategy_name,
 
         # POPULATION
         def init_population(ind_class, n):
-            pop = np.random.choice([False, True], size=(n, size))
+            pop = genome_layout.random(n)
             return [ind_class(ind) for ind in pop]
         toolbox.register("population",
                          init_population,
@@ -130,13 +139,24 @@ def es_toolbox(strategy_name,
 
 
         # MATING
+        # Tiles are located once here, so mating never touches pytrellis
         from varro.fpga.cross_over import cross_over
-        toolbox.register("mate", cross_over)
+        tile_regions = None
+        if genome_layout.tiles is None:
+            from varro.fpga.tile_index import TileIndex
+            tile_regions = TileIndex.load().regions()
+        toolbox.register("mate", cross_over, genome_layout=genome_layout, tile_regions=tile_regions)
 
         logger.stop_timer('TOOLBOX.PY register("mate")')
         logger.start_timer()
 
 
+    # CLONING
+    # Offspring share their parent's genome until they are altered
+    toolbox.register("clone", clone_individual)
+    toolbox.register("materialize", materialize)
+
+
     # SELECTION METHOD
     logger.start_timer()
     if strategy_name == 'nsr-es':
@@ -13,6 +13,7 @@ from collections import namedtuple
 from varro.algo.strategies.strategy import Strategy
 from varro.algo.strategies.sga import StrategySGA
 from varro.algo.strategies.ns_es import StrategyNSES
+from varro.algo.strategies.es.individual import ArrayIndividual
 
 
 OBJECTIVES = ['rmse', 'mae', 'wasserstein']
@@ -59,7 +60,7 @@ class StrategyMOGA(StrategySGA):
                     del self.__fitness_scores
 
         creator.create("FitnessMulti", Fitness, weights=tuple(-1.0 for _ in objectives)) # Weights for each objective
-        creator.create("Individual", np.ndarray, fitness=creator.FitnessMulti)
+        creator.create("Individual", ArrayIndividual, fitness=creator.FitnessMulti)
 
 
     def load_es_vars(self):
@@ -89,15 +90,13 @@ class StrategyMOGA(StrategySGA):
         # that have been mutated / the offspring after crossover with fitness deleted)
         invalid_inds = [ind for ind in pop if not ind.fitness.valid or self.curr_gen == 0]
 
-        # Get fitness score for each individual with
-        # invalid fitness score in population
-        for ind in invalid_inds:
-
-            # Load Weights into model using individual
-            self.model.load_parameters(ind)
-
-            # Calculate the Fitness score of the individual
-            ind.fitness.fitness_scores = tuple(self.fitness_score(reg_metric=objective) for objective in self.objectives)
+        # Get fitness scores for each individual with invalid fitness score in
+        # population, in a pool of worker processes, all at once if the model
+        # can (batched forward passes, overlapped or shared FPGA flashes) or
+        # one after the other
+        fitness_scores = self.evaluate_fitness(invalid_inds, tuple(self.objectives))
+        for ind, fitness_score in zip(invalid_inds, fitness_scores):
+            ind.fitness.fitness_scores = fitness_score
 
         return len(invalid_inds)
 
@@ -12,6 +12,7 @@ from collections import namedtuple
 
 from varro.algo.strategies.strategy import Strategy
 from varro.algo.strategies.ns_es import StrategyNSES
+from varro.algo.strategies.es.individual import ArrayIndividual
 
 
 class StrategyNSRES(StrategyNSES):
@@ -69,7 +70,7 @@ class StrategyNSRES(StrategyNSES):
                     del self.__novelty_score
 
         creator.create("FitnessMulti", Fitness, weights=(-1.0, 1.0,)) # Both Fitness and Novelty
-        creator.create("Individual", np.ndarray, fitness=creator.FitnessMulti)
+        creator.create("Individual", ArrayIndividual, fitness=creator.FitnessMulti)
 
 
     def init_toolbox(self):
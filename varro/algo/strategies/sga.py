@@ -10,6 +10,7 @@ from deap import base, creator, tools
 from dowel import logger
 
 from varro.algo.strategies.strategy import Strategy
+from varro.algo.strategies.es.individual import ArrayIndividual
 
 
 class StrategySGA(Strategy):
@@ -52,7 +53,7 @@ class StrategySGA(Strategy):
                     del self.__fitness_score
 
         creator.create("FitnessMin", Fitness, weights=(-1.0,)) # Just Fitness
-        creator.create("Individual", np.ndarray, fitness=creator.FitnessMin)
+        creator.create("Individual", ArrayIndividual, fitness=creator.FitnessMin)
 
         logger.stop_timer('SGA.PY Initializing fitness and individuals')
         logger.start_timer()
@@ -83,7 +84,7 @@ class StrategySGA(Strategy):
                 cp = pickle.load(cp_file)
 
             self.rndstate = random.seed(cp["rndstate"])
-            self.pop = cp["pop"]
+            self.pop = self.arena.adopt(cp["pop"])
             self.curr_gen = int(cp["curr_gen"])
             self.halloffame = cp["halloffame"]
             self.logbook = cp["logbook"]
@@ -91,7 +92,7 @@ class StrategySGA(Strategy):
         else:
             # Start a new evolution
             self.rndstate = random.seed(100) # Set seed
-            self.pop = self.toolbox.population(n=self.popsize)
+            self.pop = self.arena.adopt(self.toolbox.population(n=self.popsize))
             self.curr_gen = 0
             self.halloffame = tools.HallOfFame(maxsize=int(self.halloffamesize*self.popsize), similar=np.array_equal)
             self.logbook = tools.Logbook()
@@ -139,15 +140,13 @@ class StrategySGA(Strategy):
         # that have been mutated / the offspring after crossover with fitness deleted)
         invalid_inds = [ind for ind in pop if not ind.fitness.valid or self.curr_gen == 0]
 
-        # Get fitness score for each individual with
-        # invalid fitness score in population
-        for ind in invalid_inds:
-
-            # Load Weights into model using individual
-            self.model.load_parameters(ind)
-
-            # Calculate the Fitness score of the individual
-            ind.fitness.fitness_score = self.fitness_score()
+        # Get fitness score for each individual with invalid fitness score in
+        # population, in a pool of worker processes, all at once if the model
+        # can (batched forward passes, overlapped or shared FPGA flashes) or
+        # one after the other
+        fitness_scores = self.evaluate_fitness(invalid_inds, ('rmse',))
+        for ind, fitness_score in zip(invalid_inds, fitness_scores):
+            ind.fitness.fitness_score = fitness_score[0]
 
         logger.stop_timer('SGA.PY Computing fitness')
 
@@ -205,12 +204,17 @@ class StrategySGA(Strategy):
             A Tuple of (Non-alterable offspring, Alterable offspring)
 
         """
+        # Rows of the arena that no longer hold a
+        # parent are reused for altered offspring
+        self.arena.recycle(self.pop)
+
         # Keep the elite individuals for next generation
         # without mutation or cross over
         elite_num = int(self.elitesize*self.popsize)
         elite = self.toolbox.select_elite(self.pop, k=elite_num)
 
-        # Clone the selected individuals
+        # Clone the selected individuals, clones share
+        # their parent's genome until they are altered
         non_alterable_elite_offspring = list(map(self.toolbox.clone, elite))
 
         # Choose the rest of the individuals
@@ -12,7 +12,49 @@ from math import sqrt
 from deap import base, creator, tools
 
 from varro.algo.problems import Problem
+from varro.algo.workers import evaluate_genomes, individual_seed
 from varro.algo.strategies.es.toolbox import es_toolbox
+from varro.algo.strategies.es.arena import PopulationArena
+
+
+def fitness_score(problem, model, reg_metric='rmse'):
+    """Calculates the fitness score of a model (after loading parameters in
+    the model) on a problem
+
+    Args:
+        problem (Problem): The problem, whose training set the model is measured on
+        model (Model): The model to measure
+        reg_metric (str): The regression metric to be used to measure how fit a model is [Minimization Objective]
+
+    Returns:
+        Returns the fitness score of the model w.r.t. the problem specified
+        CLASSIFICATION fitness score: Accuracy
+        REGRESSION fitness score: Root Mean Squared Error
+    """
+    # Predict labels
+    y_pred = np.array(model.predict(problem.X_train, problem=problem))
+
+    if problem.approx_type == Problem.CLASSIFICATION:
+        if problem.name == 'mnist':
+            categorical_accuracy = accuracy_score(y_true=problem.y_train,
+                                                  y_pred=np.argmax(y_pred, axis=-1))
+        else:
+            categorical_accuracy = accuracy_score(y_true=problem.y_train,
+                                                  y_pred=(np.array(y_pred) > 0.5).astype(float))
+        return -categorical_accuracy
+
+    elif problem.approx_type == Problem.REGRESSION:
+        if reg_metric == 'rmse':
+            return sqrt(mean_squared_error(problem.y_train, y_pred))
+        elif reg_metric == 'mae':
+            return mean_absolute_error(problem.y_train, y_pred)
+        elif reg_metric == 'wasserstein':
+            return wasserstein_distance(problem.y_train, y_pred)
+        else:
+            raise ValueError('Unknown reg metric ' + str(reg_metric))
+
+    else:
+        raise ValueError('Unknown approximation type ' + str(problem.approx_type))
 
 
 class Strategy(ABC):
@@ -32,8 +74,13 @@ class Strategy(ABC):
                  halloffamesize,
                  novelty_metric,
                  earlystop,
-                 ckpt_dir):
-        """This class defines the strategy and the methods that come with that strategy."""
+                 ckpt_dir,
+                 workers=1):
+        """This class defines the strategy and the methods that come with that strategy.
+
+        With more than one worker, fitness is calculated in a pool of that
+        many processes (see varro.algo.workers).
+        """
         self.name = name
         self.cxpb = cxpb
         self.mutpb = mutpb
@@ -48,6 +95,8 @@ class Strategy(ABC):
         self.earlystop = earlystop
         self.noveltymetric = novelty_metric
         self.ckpt_dir = ckpt_dir
+        self.workers = workers
+        self.pool = None
 
         # Storing model and problem
         self.model = model
@@ -128,45 +177,70 @@ class Strategy(ABC):
                                   model_type='nn' if type(self.model).__name__ == 'ModelNN' else 'fpga',
                                   imutpb=self.imutpb,
                                   imutmu=self.imutmu,
-                                  imutsigma=self.imutsigma)
+                                  imutsigma=self.imutsigma,
+                                  genome_layout=getattr(self.model, 'genome_layout', None))
+
+        # Keep the genomes of the population in one contiguous
+        # arena, offspring are copied into it when altered
+        self.arena = PopulationArena(creator.Individual)
+        self.toolbox.register("materialize", self.arena.materialize)
 
 
-    def fitness_score(self, reg_metric='rmse'):
+    def fitness_score(self, reg_metric='rmse', model=None):
         """Calculates the fitness score for a particular
         model configuration (after loading parameters in the model) on the problem specified
 
         Args:
             reg_metric (str): The regression metric to be used to measure how fit a model is [Minimization Objective]
+            model (Model): The model to measure, self.model if None
 
         Returns:
             Returns the fitness score of the model w.r.t. the problem specified
             CLASSIFICATION fitness score: Accuracy
             REGRESSION fitness score: Root Mean Squared Error
         """
-        # Predict labels
-        y_pred = np.array(self.model.predict(self.problem.X_train, problem=self.problem))
-
-        if self.problem.approx_type == Problem.CLASSIFICATION:
-            if self.problem.name == 'mnist':
-                categorical_accuracy = accuracy_score(y_true=self.problem.y_train,
-                                                      y_pred=np.argmax(y_pred, axis=-1))
-            else:
-                categorical_accuracy = accuracy_score(y_true=self.problem.y_train,
-                                                      y_pred=(np.array(y_pred) > 0.5).astype(float))
-            return -categorical_accuracy
-
-        elif self.problem.approx_type == Problem.REGRESSION:
-            if reg_metric == 'rmse':
-                return sqrt(mean_squared_error(self.problem.y_train, y_pred))
-            elif reg_metric == 'mae':
-                return mean_absolute_error(self.problem.y_train, y_pred)
-            elif reg_metric == 'wasserstein':
-                return wasserstein_distance(self.problem.y_train, y_pred)
-            else:
-                raise ValueError('Unknown reg metric ' + str(reg_metric))
+        if model is None:
+            model = self.model
+        return fitness_score(self.problem, model, reg_metric)
 
-        else:
-            raise ValueError('Unknown approximation type ' + str(self.problem.approx_type))
+
+    def evaluate_fitness(self, inds, reg_metrics):
+        """Calculates the fitness scores of individuals, in the pool of worker
+        processes if there is more than one worker
+
+        Whichever path is taken, the RNG streams of random and np.random an
+        individual is scored with only depend on the generation and its index
+        (see individual_seed), so the scores of models that draw random numbers
+        do not depend on the number of workers either.
+
+        Args:
+            inds (list): The individuals to evaluate
+            reg_metrics (tuple of str): The regression metrics to score with
+
+        Returns:
+            List of the tuples of fitness scores of the individuals, in order
+        """
+        if self.workers > 1:
+            return self.evaluate_in_pool(inds, reg_metrics)
+        seeds = [individual_seed(self.curr_gen, index) for index in range(len(inds))]
+        return evaluate_genomes(self.model, self.problem, inds, reg_metrics, seeds)
+
+
+    def evaluate_in_pool(self, inds, reg_metrics):
+        """Calculates the fitness scores of individuals in the pool of worker
+        processes, starting the pool on first use
+
+        Args:
+            inds (list): The individuals to evaluate
+            reg_metrics (tuple of str): The regression metrics to score with
+
+        Returns:
+            List of the tuples of fitness scores of the individuals, in order
+        """
+        if self.pool is None:
+            from varro.algo.workers import FitnessPool
+            self.pool = FitnessPool(self.model, self.workers)
+        return self.pool.evaluate(inds, self.problem, reg_metrics, generation=self.curr_gen)
 
 
     def mate(self, pop):
@@ -181,9 +255,14 @@ class Strategy(ABC):
         # e.g. if pop = [ind1, ind2, ind3, ind4],
         # we are doing 2-point crossover between
         # ind1, ind3 and ind2, ind4
-        for child1, child2 in zip(pop[::2], pop[1::2]):
+        for idx, (child1, child2) in enumerate(zip(pop[::2], pop[1::2])):
             if random.random() < self.cxpb:
 
+                # Offspring share their parent's genome
+                # until they are altered, so copy it first
+                child1 = pop[2*idx] = self.toolbox.materialize(child1)
+                child2 = pop[2*idx+1] = self.toolbox.materialize(child2)
+
                 # In-place Crossover
                 self.toolbox.mate(child1, child2)
 
@@ -202,9 +281,13 @@ class Strategy(ABC):
             pop (list: Individual): List of individuals to be mutated
         """
         # Apply mutation
-        for mutant in pop:
+        for idx, mutant in enumerate(pop):
             if random.random() < self.mutpb:
 
+                # Offspring share their parent's genome
+                # until they are altered, so copy it first
+                mutant = pop[idx] = self.toolbox.materialize(mutant)
+
                 # In-place Mutation
                 self.toolbox.mutate(mutant)
 
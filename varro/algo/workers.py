@@ -0,0 +1,199 @@
+"""
+This module evaluates the fitness of individuals in a pool of worker processes
+"""
+
+import atexit
+import random
+import multiprocessing
+import numpy as np
+
+# State of a worker process: its model and the shared memory blocks it attached to
+_worker = {}
+
+
+class SharedArray:
+    def __init__(self, array):
+        """Copy of an array in a block of shared memory that workers attach to by name
+
+        Args:
+            array (np.ndarray): The array to share
+        """
+        from multiprocessing import shared_memory
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)
+        self.array[...] = array
+
+    @property
+    def spec(self):
+        """Returns the (block name, shape, dtype) workers attach with"""
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        """Frees the block of shared memory"""
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+def attach(spec, role):
+    """Returns the array of a SharedArray in a worker, attaching to its block once
+
+    Args:
+        spec (tuple): The SharedArray's spec
+        role (str): What the array holds, e.g. 'X_train', the block of the
+            previous array with the same role is closed
+    """
+    from multiprocessing import resource_tracker, shared_memory
+    name, shape, dtype = spec
+    blocks = _worker['blocks']
+    if role not in blocks or blocks[role].name != name:
+        if role in blocks:
+            blocks[role].close()
+        blocks[role] = shared_memory.SharedMemory(name=name)
+        # The block belongs to the parent process, which unlinks it
+        resource_tracker.unregister(blocks[role]._name, 'shared_memory')
+    return np.ndarray(shape, dtype=dtype, buffer=blocks[role].buf)
+
+def individual_seed(generation, index):
+    """Returns the seed of the RNG stream of the index-th individual evaluated in a generation"""
+    return int(np.random.SeedSequence([generation, index]).generate_state(1)[0])
+
+
+class SharedProblem:
+    def __init__(self, attributes, X_train, y_train):
+        """Stands in for a problem in a worker, its training set in shared memory
+
+        Args:
+            attributes (dict): name, approx_type, input_dim, output_dim, minimum and maximum
+            X_train (np.ndarray): Training inputs
+            y_train (np.ndarray): Training outputs
+        """
+        self.__dict__.update(attributes)
+        self.X_train = X_train
+        self.y_train = y_train
+
+
+def init_worker(model):
+    """Keeps the model a worker evaluates with for the whole run"""
+    _worker['model'] = model
+    _worker['blocks'] = {}
+
+def evaluate_chunk(genomes_spec, start, stop, data_spec, attributes, reg_metrics, seeds):
+    """Evaluates the genomes [start, stop) of a shared array of genomes in a worker
+
+    Returns:
+        List of the tuples of fitness scores of the genomes, one score per metric
+    """
+    # Models may keep the genome they load, so it is copied out of the block
+    genomes = attach(genomes_spec, 'genomes')[start:stop].copy()
+    problem = SharedProblem(attributes, attach(data_spec[0], 'X_train'), attach(data_spec[1], 'y_train'))
+    return evaluate_genomes(_worker['model'], problem, genomes, reg_metrics, seeds)
+
+def evaluate_genomes(model, problem, genomes, reg_metrics, seeds):
+    """Evaluates genomes one after the other, or all at once if the model can,
+    seeding random and np.random with an individual's seed before scoring it.
+    The states of random and np.random are restored afterwards.
+
+    Returns:
+        List of the tuples of fitness scores of the genomes, one score per metric
+    """
+    random_state, np_random_state = random.getstate(), np.random.get_state()
+    try:
+        return score_genomes(model, problem, genomes, reg_metrics, seeds)
+    finally:
+        random.setstate(random_state)
+        np.random.set_state(np_random_state)
+
+def score_genomes(model, problem, genomes, reg_metrics, seeds):
+    from varro.algo.strategies.strategy import fitness_score
+    seeds = iter(seeds)
+
+    def score(model):
+        seed = next(seeds)
+        random.seed(seed)
+        np.random.seed(seed)
+        return tuple(fitness_score(problem, model, reg_metric) for reg_metric in reg_metrics)
+
+    if getattr(model, 'batched', False):
+        return model.evaluate_population(list(genomes), score)
+
+    scores = []
+    for genome in genomes:
+        model.load_parameters(genome)
+        scores.append(score(model))
+    return scores
+
+
+class FitnessPool:
+    def __init__(self, model, workers):
+        """Pool of worker processes that each keep a warm copy of a model
+
+        The training set and the genomes to evaluate are shared with the
+        workers through shared memory, every worker evaluates a contiguous
+        chunk of the genomes and only the scores are sent back.
+
+        Args:
+            model (Model): The model to evaluate with, must be picklable
+            workers (int): Number of worker processes
+        """
+        self.workers = workers
+        self.pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(model,))
+        # Training set currently shared, and the arrays it was copied from
+        self.data = None
+        self.data_source = None
+        atexit.register(self.close)
+
+    def share_data(self, problem):
+        """Shares the problem's training set, unless it is already shared"""
+        if self.data_source is not None and \
+                self.data_source[0] is problem.X_train and self.data_source[1] is problem.y_train:
+            return
+        if self.data is not None:
+            for shared in self.data:
+                shared.close()
+        self.data = (SharedArray(np.asarray(problem.X_train)), SharedArray(np.asarray(problem.y_train)))
+        self.data_source = (problem.X_train, problem.y_train)
+
+    def evaluate(self, genomes, problem, reg_metrics, generation):
+        """Evaluates genomes in the workers
+
+        Args:
+            genomes (list): The genomes to evaluate
+            problem (Problem): The problem, whose training set they are evaluated on
+            reg_metrics (tuple of str): The regression metrics to score with
+            generation (int): The current generation, which the RNG streams of
+                the individuals are derived from
+
+        Returns:
+            List of the tuples of fitness scores of the genomes, in order
+        """
+        if len(genomes) == 0:
+            return []
+        self.share_data(problem)
+        attributes = {'name': problem.name, 'approx_type': problem.approx_type,
+                      'input_dim': problem.input_dim, 'output_dim': problem.output_dim,
+                      'minimum': getattr(problem, 'minimum', None), 'maximum': getattr(problem, 'maximum', None)}
+        seeds = [individual_seed(generation, index) for index in range(len(genomes))]
+
+        shared_genomes = SharedArray(np.stack(genomes))
+        try:
+            chunks = np.array_split(np.arange(len(genomes)), min(self.workers, len(genomes)))
+            results = [self.pool.apply_async(evaluate_chunk,
+                                             (shared_genomes.spec, chunk[0], chunk[-1] + 1,
+                                              (self.data[0].spec, self.data[1].spec), attributes,
+                                              reg_metrics, seeds[chunk[0]:chunk[-1] + 1]))
+                       for chunk in chunks]
+            return [scores for result in results for scores in result.get()]
+        finally:
+            shared_genomes.close()
+
+    def close(self):
+        """Stops the workers and frees the shared memory"""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.data is not None:
+            for shared in self.data:
+                shared.close()
+            self.data = None
@@ -1,22 +1,109 @@
+import os
+import threading
 import numpy as np
 import serial
-from time import sleep
-from varro.util.variables import ARDUINO_PORT
+from time import sleep, time
+from varro.util.variables import ARDUINO_PORT, ARDUINO_BAUD_RATE, ARDUINO_BATCH_BAUD_RATE, ARDUINO_RESET_TIME
+from varro.arduino.protocol import ArduinoLink
 
+# USB vendor ids of Arduino boards
+ARDUINO_VIDS = (0x2341, 0x2A03)
 
-def initialize_connection():
-    ard = serial.Serial(ARDUINO_PORT,9600,timeout=5)
-    sleep(2) # wait for the Arduino to initialize
-    ard.flush()
 
-    return ard
+def find_arduino_ports():
+    """Returns the serial ports of the connected Arduinos.
 
-arduino = initialize_connection() # This has to be here
+    The VARRO_ARDUINO_PORTS environment variable (comma separated) takes
+    precedence, then USB devices with an Arduino vendor id, then ARDUINO_PORT.
+    """
+    ports = os.environ.get('VARRO_ARDUINO_PORTS')
+    if ports:
+        return [port.strip() for port in ports.split(',') if port.strip()]
+    from serial.tools import list_ports
+    ports = sorted(info.device for info in list_ports.comports() if info.vid in ARDUINO_VIDS)
+    return ports if ports else [ARDUINO_PORT]
 
-def evaluate_arduino(datum):
-    send([datum])
+
+class Connection:
+    def __init__(self, port, reset_time=ARDUINO_RESET_TIME, baud_rate=ARDUINO_BATCH_BAUD_RATE):
+        """Serial connection to an Arduino, which resets when the port is opened
+
+        Opening returns right away; the wait for the reset to finish happens
+        on first use, so it overlaps with whatever runs in between.
+        """
+        self.port = port
+        self.baud_rate = baud_rate
+        self.serial = serial.Serial(port, baud_rate, timeout=5)
+        self.ready_at = time() + reset_time
+        self.ready = False
+        self.lock = threading.Lock()
+        self._link = ArduinoLink(self.serial)
+
+    def wait_ready(self):
+        with self.lock:
+            if not self.ready:
+                sleep(max(0.0, self.ready_at - time())) # wait for the Arduino to initialize
+                self.serial.reset_input_buffer()
+                self.ready = True
+
+    @property
+    def link(self):
+        self.wait_ready()
+        return self._link
+
+    def close(self):
+        self.serial.close()
+
+# Open connections, by port
+_connections = {}
+_connections_lock = threading.Lock()
+
+def connect(port=None, reset_time=ARDUINO_RESET_TIME, baud_rate=ARDUINO_BATCH_BAUD_RATE):
+    """Opens (or returns the open) connection to an Arduino, without waiting for its reset.
+
+    Args:
+        port (str): Serial port, the first discovered Arduino if None
+        reset_time (float): Seconds the Arduino takes to reset after the port is opened
+        baud_rate (int): Baud rate of the sketch, the port is opened again if it differs
+
+    """
+    if port is None:
+        port = find_arduino_ports()[0]
+    with _connections_lock:
+        if port in _connections and _connections[port].baud_rate != baud_rate:
+            _connections.pop(port).close()
+        if port not in _connections:
+            _connections[port] = Connection(port, reset_time, baud_rate)
+        return _connections[port]
+
+def disconnect(port=None):
+    """Closes the connection to a port, or every connection if port is None"""
+    with _connections_lock:
+        ports = list(_connections) if port is None else [port]
+        for port in ports:
+            if port in _connections:
+                _connections.pop(port).close()
+
+def initialize_connection(port=None):
+    connection = connect(port, baud_rate=ARDUINO_BAUD_RATE)
+    connection.wait_ready()
+    return connection.serial
+
+def evaluate_arduino_batch(data, port=None):
+    """Evaluates a batch of inputs with the fpga-batch-comm sketch,
+    returning the mean ADC reading of every input scaled to [0, 1)"""
+    return connect(port).link.evaluate(data).mean(axis=1) / 1024
+
+def evaluate_arduino_words(words, port=None):
+    """Evaluates a batch of port words (see protocol.pack_words) with the
+    fpga-batch-comm sketch, returning the mean ADC reading of every word scaled to [0, 1)"""
+    return connect(port).link.evaluate_words(words).mean(axis=1) / 1024
+
+def evaluate_arduino(datum, port=None):
+    arduino = initialize_connection(port)
+    send(arduino, [datum])
     sleep(0.05)
-    return_value = receive()
+    return_value = receive(arduino)
     return_value = return_value.decode("utf-8")
     if return_value[-1] == ';':
         return_value = return_value[:-1]
@@ -33,22 +120,23 @@ def send_char(arduino, val):
 
     return retval
 
-def send(val):
+def send(arduino, val):
     # TODO: Flush arduino serial buffer before recieve is called
     for c in val:
         send_char(arduino, c)
 
-def receive():
+def receive(arduino):
     msg = arduino.read(arduino.in_waiting)
     return msg
 
 if __name__=="__main__":
     val = 1
+    arduino = initialize_connection()
 
     while True:
         # Serial write section
         arduino.flush()
-        send(arduino, 0)
+        send(arduino, [0])
         sleep(0.96)
         msg = receive(arduino)
         # Serial read section
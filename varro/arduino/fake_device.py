@@ -0,0 +1,102 @@
+"""
+This module emulates an Arduino running the fpga-batch-comm sketch on a pseudo terminal
+"""
+
+import os
+import tty
+import threading
+import numpy as np
+
+from varro.arduino.protocol import encode_frame, read_frame, ProtocolError, \
+                                   MSG_EVALUATE, MSG_EVALUATE_WORDS, MSG_READINGS, MSG_ERROR, ERROR_CRC, ERROR_TYPE, \
+                                   ERROR_LENGTH, MAX_BATCH, NUM_CHANNELS
+
+
+def step_readings(inputs):
+    """Reads 1023 on every channel for inputs of 1 and 0 otherwise, like a
+    board whose outputs follow the digital pins driven by the inputs"""
+    return np.repeat((np.asarray(inputs) == 1)[:, None] * 1023, NUM_CHANNELS, axis=1)
+
+def word_readings(words):
+    """Reads the top 10 of the 12 bits of a word on every channel, like a
+    board that converts the port word back to an analog voltage"""
+    return np.repeat((np.asarray(words) >> 2)[:, None], NUM_CHANNELS, axis=1)
+
+class FdPort:
+    """Minimal serial-port-like wrapper of a file descriptor"""
+    def __init__(self, fd):
+        self.fd = fd
+
+    def read(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = os.read(self.fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def write(self, data):
+        os.write(self.fd, data)
+
+
+class FakeArduino:
+    def __init__(self, respond=step_readings, respond_words=word_readings):
+        """Fake Arduino on a pseudo terminal, whose port can be opened with pyserial
+
+        Args:
+            respond (callable): respond(inputs) returns the (N, NUM_CHANNELS) readings of N input bytes
+            respond_words (callable): respond_words(words) returns the (N, NUM_CHANNELS)
+                readings of N port words
+
+        """
+        self.respond = respond
+        self.respond_words = respond_words
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.device = FdPort(self.master)
+        self.frames = 0
+        # Corrupts the CRC of the next response if set, to test retries
+        self.corrupt_next = False
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                msg_type, payload = read_frame(self.device)
+            except ProtocolError:
+                self.device.write(encode_frame(MSG_ERROR, bytes([ERROR_CRC])))
+                continue
+            except OSError:
+                return
+            self.frames += 1
+
+            if msg_type == MSG_EVALUATE:
+                inputs = np.frombuffer(payload, dtype=np.uint8)
+                respond = self.respond
+            elif msg_type == MSG_EVALUATE_WORDS:
+                inputs = np.frombuffer(payload, dtype='<u2')
+                respond = self.respond_words
+            else:
+                self.device.write(encode_frame(MSG_ERROR, bytes([ERROR_TYPE])))
+                continue
+
+            if len(inputs) > MAX_BATCH:
+                response = encode_frame(MSG_ERROR, bytes([ERROR_LENGTH]))
+            else:
+                readings = np.asarray(respond(inputs), dtype='<u2')
+                response = encode_frame(MSG_READINGS, readings.tobytes())
+
+            if self.corrupt_next:
+                self.corrupt_next = False
+                response = response[:-1] + bytes([response[-1] ^ 0xFF])
+            try:
+                self.device.write(response)
+            except OSError:
+                return
+
+    def close(self):
+        os.close(self.slave)
+        os.close(self.master)
@@ -0,0 +1,178 @@
+// Evaluates batches of inputs sent in frames of the protocol in varro/arduino/protocol.py:
+//   SYNC | type | payload length (u16) | payload | CRC-16/CCITT (u16), little endian
+// A MSG_EVALUATE payload holds one input byte per sample, driving every
+// digital port high for 1 and low otherwise. A MSG_EVALUATE_WORDS payload
+// holds one u16 word per sample, bit i driving digitalPorts[i]. Both are
+// answered with a MSG_READINGS payload of 6 u16 ADC readings per sample.
+
+const long BAUD_RATE = 115200;
+
+const uint8_t SYNC = 0xA5;
+const uint8_t MSG_EVALUATE = 0x01;
+const uint8_t MSG_EVALUATE_WORDS = 0x02;
+const uint8_t MSG_READINGS = 0x81;
+const uint8_t MSG_ERROR = 0xFF;
+
+const uint8_t ERROR_CRC = 0x01;
+const uint8_t ERROR_LENGTH = 0x02;
+const uint8_t ERROR_TYPE = 0x03;
+
+const int NUM_CHANNELS = 6;
+const int NUM_PORTS = 12;
+const int MAX_BATCH = 256;
+
+int analogPorts[] = {A0, A1, A2, A3, A4, A5};
+int digitalPorts[] = {2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13};
+
+// PIO controllers of the digital ports, looked up once so that a word is
+// latched with a single ODSR write per controller
+const int MAX_CONTROLLERS = 4;
+Pio *controllers[MAX_CONTROLLERS];
+uint32_t controllerMasks[MAX_CONTROLLERS];
+int numControllers = 0;
+int portController[NUM_PORTS];
+uint32_t portMask[NUM_PORTS];
+
+uint8_t inputs[MAX_BATCH * 2];
+uint16_t readings[MAX_BATCH * NUM_CHANNELS];
+
+uint16_t crc16(uint16_t crc, const uint8_t *data, size_t len)
+{
+    for (size_t i = 0; i < len; i++) {
+        crc ^= (uint16_t)data[i] << 8;
+        for (int b = 0; b < 8; b++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+        }
+    }
+    return crc;
+}
+
+void sendFrame(uint8_t type, const uint8_t *payload, uint16_t len)
+{
+    uint8_t header[4] = {SYNC, type, (uint8_t)(len & 0xFF), (uint8_t)(len >> 8)};
+    uint16_t crc = crc16(0xFFFF, header + 1, 3);
+    crc = crc16(crc, payload, len);
+    uint8_t trailer[2] = {(uint8_t)(crc & 0xFF), (uint8_t)(crc >> 8)};
+
+    Serial.write(header, 4);
+    Serial.write(payload, len);
+    Serial.write(trailer, 2);
+    Serial.flush();
+}
+
+void sendError(uint8_t code)
+{
+    sendFrame(MSG_ERROR, &code, 1);
+}
+
+void setupPortWords()
+{
+    for (int i = 0; i < NUM_PORTS; i++) {
+        Pio *pio = g_APinDescription[digitalPorts[i]].pPort;
+        uint32_t mask = g_APinDescription[digitalPorts[i]].ulPin;
+        int c = 0;
+        while (c < numControllers && controllers[c] != pio) {
+            c++;
+        }
+        if (c == numControllers) {
+            controllers[c] = pio;
+            controllerMasks[c] = 0;
+            numControllers++;
+        }
+        controllerMasks[c] |= mask;
+        portController[i] = c;
+        portMask[i] = mask;
+    }
+    // Only the digital ports are affected by ODSR writes
+    for (int c = 0; c < numControllers; c++) {
+        controllers[c]->PIO_OWDR = 0xFFFFFFFF;
+        controllers[c]->PIO_OWER = controllerMasks[c];
+    }
+}
+
+void writePortWord(uint16_t word)
+{
+    uint32_t values[MAX_CONTROLLERS] = {0};
+    for (int i = 0; i < NUM_PORTS; i++) {
+        if (word & (1 << i)) {
+            values[portController[i]] |= portMask[i];
+        }
+    }
+    for (int c = 0; c < numControllers; c++) {
+        controllers[c]->PIO_ODSR = values[c];
+    }
+}
+
+void readChannels(uint16_t *out)
+{
+    for (int i = 0; i < NUM_CHANNELS; i++) {
+        out[i] = analogRead(analogPorts[i]);
+    }
+}
+
+void setup()
+{
+    Serial.begin(BAUD_RATE);
+    Serial.setTimeout(100);
+    for (int port : analogPorts) {
+        pinMode(port, INPUT);
+    }
+    for (int port : digitalPorts) {
+        pinMode(port, OUTPUT);
+    }
+    setupPortWords();
+}
+
+void loop()
+{
+    // Wait for the start of a frame
+    if (Serial.read() != SYNC) {
+        return;
+    }
+
+    uint8_t header[3];
+    if (Serial.readBytes(header, 3) != 3) {
+        return;
+    }
+    uint8_t type = header[0];
+    uint16_t len = header[1] | (header[2] << 8);
+    if (len > MAX_BATCH * 2) {
+        sendError(ERROR_LENGTH);
+        return;
+    }
+
+    uint8_t trailer[2];
+    if (Serial.readBytes(inputs, len) != len || Serial.readBytes(trailer, 2) != 2) {
+        sendError(ERROR_CRC);
+        return;
+    }
+    uint16_t crc = crc16(crc16(0xFFFF, header, 3), inputs, len);
+    if (crc != (trailer[0] | (trailer[1] << 8))) {
+        sendError(ERROR_CRC);
+        return;
+    }
+    if (type == MSG_EVALUATE && len <= MAX_BATCH) {
+        for (int sample = 0; sample < len; sample++) {
+            bool high = inputs[sample] == 1;
+            for (int port : digitalPorts) {
+                digitalWrite(port, high ? HIGH : LOW);
+            }
+            readChannels(readings + sample * NUM_CHANNELS);
+        }
+    } else if (type == MSG_EVALUATE_WORDS && len % 2 == 0) {
+        len /= 2;
+        for (int sample = 0; sample < len; sample++) {
+            writePortWord(inputs[2 * sample] | (inputs[2 * sample + 1] << 8));
+            readChannels(readings + sample * NUM_CHANNELS);
+        }
+    } else if (type == MSG_EVALUATE || type == MSG_EVALUATE_WORDS) {
+        sendError(ERROR_LENGTH);
+        return;
+    } else {
+        sendError(ERROR_TYPE);
+        return;
+    }
+
+    // The Due is little endian, so the readings are sent as they are in memory
+    sendFrame(MSG_READINGS, (const uint8_t *)readings, len * NUM_CHANNELS * 2);
+}
@@ -0,0 +1,155 @@
+"""
+This module implements the framed binary protocol spoken by the fpga-batch-comm sketch.
+
+Every message is a frame of
+    SYNC (1 byte) | type (1 byte) | payload length (u16) | payload | CRC (u16)
+with little endian integers. The CRC is CRC-16/CCITT (binascii.crc_hqx,
+initial value 0xFFFF) over the type, length and payload bytes.
+
+The host sends a MSG_EVALUATE frame with one input byte per sample (driving
+every digital port high for 1, low otherwise), or a MSG_EVALUATE_WORDS frame
+with one u16 word per sample (bit i driving digital port i). The Arduino
+answers with a MSG_READINGS frame holding NUM_CHANNELS u16 ADC readings per
+sample, or a MSG_ERROR frame with an error code.
+"""
+
+import struct
+import binascii
+import numpy as np
+
+SYNC = 0xA5
+MSG_EVALUATE = 0x01
+MSG_EVALUATE_WORDS = 0x02
+MSG_READINGS = 0x81
+MSG_ERROR = 0xFF
+
+ERROR_CRC = 0x01
+ERROR_LENGTH = 0x02
+ERROR_TYPE = 0x03
+
+# Number of analog channels read per sample
+NUM_CHANNELS = 6
+# Number of digital ports driven by a word, i.e. bits per word
+NUM_PORTS = 12
+# Largest batch of samples the firmware buffers in one frame
+MAX_BATCH = 256
+
+HEADER = struct.Struct('<BBH')
+CRC = struct.Struct('<H')
+
+
+class ProtocolError(Exception):
+    """Raised when a frame is corrupt, or the Arduino reports an error"""
+    pass
+
+def crc16(data):
+    """CRC-16/CCITT of data, as computed by the firmware"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+def encode_frame(msg_type, payload=b''):
+    """Returns the bytes of a frame"""
+    header = HEADER.pack(SYNC, msg_type, len(payload))
+    return header + payload + CRC.pack(crc16(header[1:] + payload))
+
+def read_exactly(port, size):
+    data = port.read(size)
+    if len(data) != size:
+        raise ProtocolError('Timed out after {} of {} bytes'.format(len(data), size))
+    return data
+
+def read_frame(port):
+    """Reads the next frame from a serial port, skipping bytes before its SYNC byte
+
+    Returns:
+        (type, payload) of the frame
+    """
+    while True:
+        sync = read_exactly(port, 1)
+        if sync[0] == SYNC:
+            break
+    header = read_exactly(port, HEADER.size - 1)
+    msg_type, length = struct.unpack('<BH', header)
+    payload = read_exactly(port, length)
+    crc, = CRC.unpack(read_exactly(port, CRC.size))
+    if crc != crc16(header + payload):
+        raise ProtocolError('CRC mismatch')
+    return msg_type, payload
+
+def encode_inputs(inputs):
+    """Returns the payload of a MSG_EVALUATE frame, one byte per sample"""
+    return np.asarray(inputs, dtype=np.uint8).tobytes()
+
+def pack_words(samples, width):
+    """Packs samples of one or more features into port words, feature j in bits
+    [j * width, (j + 1) * width) of the word
+
+    Args:
+        samples (np.ndarray of ints): (N,) or (N, d) values in [0, 2**width)
+        width (int): Bits per feature, with d * width <= NUM_PORTS
+
+    Returns:
+        np.ndarray of N uint16 words
+    """
+    samples = np.asarray(samples, dtype=np.uint16).reshape(len(samples), -1)
+    if samples.shape[1] * width > NUM_PORTS:
+        raise ValueError('{} features of {} bits do not fit in {} ports'.format(
+            samples.shape[1], width, NUM_PORTS))
+    shifts = (np.arange(samples.shape[1]) * width).astype(np.uint16)
+    return np.bitwise_or.reduce(samples << shifts, axis=1).astype(np.uint16)
+
+def encode_words(words):
+    """Returns the payload of a MSG_EVALUATE_WORDS frame, one u16 word per sample"""
+    return np.asarray(words, dtype='<u2').tobytes()
+
+def decode_readings(payload):
+    """Returns the ADC readings of a MSG_READINGS payload, as an (N, NUM_CHANNELS) array"""
+    return np.frombuffer(payload, dtype='<u2').reshape(-1, NUM_CHANNELS)
+
+
+class ArduinoLink:
+    def __init__(self, port, max_retries=3):
+        """Evaluates batches of inputs over a serial port
+
+        Args:
+            port (serial.Serial): Open serial port of the Arduino
+            max_retries (int): Number of times a corrupt batch is sent again
+
+        """
+        self.port = port
+        self.max_retries = max_retries
+
+    def evaluate_batch(self, inputs, msg_type=MSG_EVALUATE):
+        """Sends up to MAX_BATCH inputs (bytes for MSG_EVALUATE, port words
+        for MSG_EVALUATE_WORDS) in one frame and returns their readings"""
+        if msg_type == MSG_EVALUATE_WORDS:
+            request = encode_frame(msg_type, encode_words(inputs))
+        else:
+            request = encode_frame(msg_type, encode_inputs(inputs))
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.port.write(request)
+                self.port.flush()
+                msg_type, payload = read_frame(self.port)
+                if msg_type == MSG_ERROR:
+                    raise ProtocolError('Arduino error {}'.format(payload[0] if payload else None))
+                if msg_type != MSG_READINGS or len(payload) != len(inputs) * NUM_CHANNELS * 2:
+                    raise ProtocolError('Unexpected response of type {}'.format(msg_type))
+                return decode_readings(payload)
+            except ProtocolError:
+                if attempt == self.max_retries:
+                    raise
+                # Drop the rest of the corrupt frame before retrying
+                self.port.reset_input_buffer()
+
+    def evaluate(self, inputs, msg_type=MSG_EVALUATE):
+        """Returns the (N, NUM_CHANNELS) ADC readings of N inputs, sent in batches of MAX_BATCH"""
+        inputs = np.asarray(inputs)
+        readings = [self.evaluate_batch(inputs[start:start + MAX_BATCH], msg_type)
+                    for start in range(0, len(inputs), MAX_BATCH)]
+        if not readings:
+            return np.empty((0, NUM_CHANNELS), dtype=np.uint16)
+        return np.concatenate(readings)
+
+    def evaluate_words(self, words):
+        """Returns the (N, NUM_CHANNELS) ADC readings of N port words"""
+        return self.evaluate(words, MSG_EVALUATE_WORDS)
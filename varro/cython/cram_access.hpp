@@ -0,0 +1,19 @@
+// Access to the C++ CRAM behind a pytrellis.CRAM python object,
+// so whole frames can be copied without a python call per bit
+#ifndef VARRO_CRAM_ACCESS_HPP
+#define VARRO_CRAM_ACCESS_HPP
+
+#include <boost/python.hpp>
+#include "CRAM.hpp"
+
+// Returns the Trellis::CRAM wrapped by a pytrellis.CRAM (e.g. chip.cram)
+inline Trellis::CRAM *cram_from_python(PyObject *obj) {
+    return &boost::python::extract<Trellis::CRAM &>(obj)();
+}
+
+// Returns the bits of one frame, which are stored contiguously
+inline char *cram_frame(Trellis::CRAM *cram, int frame) {
+    return &cram->bit(frame, 0);
+}
+
+#endif
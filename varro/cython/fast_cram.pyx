@@ -1,19 +1,101 @@
+# distutils: language = c++
+"""
+Bulk copies between numpy arrays and pytrellis CRAMs.
+
+Every function takes the CRAM of a pytrellis chip (chip.cram) and copies
+whole frames at the C++ level, instead of making a python call per bit.
+"""
+
 import cython
-cimport numpy as npx
 import numpy as np
-import pytrellis
+from libc.string cimport memcpy
+
+
+cdef extern from "CRAM.hpp" namespace "Trellis":
+    cdef cppclass CRAM:
+        int frames()
+        int bits()
+
+cdef extern from "cram_access.hpp":
+    CRAM *cram_from_python(object cram) except +
+    char *cram_frame(CRAM *cram, int frame)
+
+
+cdef CRAM *checked_cram(object cram, tuple shape, int bits_per_column) except NULL:
+    cdef CRAM *c = cram_from_python(cram)
+    expected = (c.frames(), (c.bits() + bits_per_column - 1) // bits_per_column)
+    if shape != expected:
+        raise ValueError('Expected an array of shape {}, got {}'.format(expected, shape))
+    return c
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def load_cram_fast(cram, config_data):
+    """Copies a 2d array of CRAM bits (frames x bits) into a CRAM."""
+    cdef unsigned char[:, ::1] data = np.ascontiguousarray(config_data, dtype=bool).view(np.uint8)
+    cdef CRAM *c = checked_cram(cram, (data.shape[0], data.shape[1]), 1)
+    cdef int i
+    for i in range(c.frames()):
+        memcpy(cram_frame(c, i), &data[i, 0], c.bits())
 
-DTYPE = np.bool
-ctypedef npx.npy_bool DTYPE_t
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def load_cram_packed(cram, packed_data):
+    """Copies a 2d array of bit-packed CRAM frames (np.packbits(..., axis=1)) into a CRAM."""
+    cdef unsigned char[:, ::1] data = np.ascontiguousarray(packed_data, dtype=np.uint8)
+    cdef CRAM *c = checked_cram(cram, (data.shape[0], data.shape[1]), 8)
+    cdef int i, j, bits = c.bits()
+    cdef char *frame
+    for i in range(c.frames()):
+        frame = cram_frame(c, i)
+        for j in range(bits):
+            frame[j] = (data[i, j >> 3] >> (7 - (j & 7))) & 1
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-def load_cram_fast(cram, npx.ndarray[DTYPE_t, ndim=2] config_data):
-    cdef int frames = cram.frames()
-    cdef int bits_per_frame = cram.bits()
-    
-    for i in range(frames):
-        for j in range(bits_per_frame):
-            cram.set_bit(i, j, bool(config_data[i,j]))
+def load_cram_frames(cram, packed_data, frames):
+    """Copies only the given frames of a 2d array of bit-packed CRAM frames into a CRAM."""
+    cdef unsigned char[:, ::1] data = np.ascontiguousarray(packed_data, dtype=np.uint8)
+    frames = np.ascontiguousarray(frames, dtype=np.int_)
+    cdef long[::1] frame_idxs = frames
+    cdef CRAM *c = checked_cram(cram, (data.shape[0], data.shape[1]), 8)
+    cdef int i, j, bits = c.bits()
+    cdef long k
+    cdef char *frame
+    # Bounds are not checked in the loop, so check the frames first
+    if frame_idxs.shape[0] and (np.min(frames) < 0 or np.max(frames) >= c.frames()):
+        raise IndexError('Frames must be in [0, {}), got {} to {}'.format(c.frames(), np.min(frames), np.max(frames)))
+    for k in range(frame_idxs.shape[0]):
+        i = frame_idxs[k]
+        frame = cram_frame(c, i)
+        for j in range(bits):
+            frame[j] = (data[i, j >> 3] >> (7 - (j & 7))) & 1
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def dump_cram(cram):
+    """Returns the bits of a CRAM as a 2d array of bools (frames x bits)."""
+    cdef CRAM *c = cram_from_python(cram)
+    out = np.empty((c.frames(), c.bits()), dtype=np.uint8)
+    cdef unsigned char[:, ::1] data = out
+    cdef int i
+    for i in range(c.frames()):
+        memcpy(&data[i, 0], cram_frame(c, i), c.bits())
+    return out.view(bool)
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def dump_cram_packed(cram):
+    """Returns the bits of a CRAM as a 2d array of bit-packed frames, 8 bits per byte."""
+    cdef CRAM *c = cram_from_python(cram)
+    cdef int bits = c.bits()
+    out = np.zeros((c.frames(), (bits + 7) // 8), dtype=np.uint8)
+    cdef unsigned char[:, ::1] data = out
+    cdef int i, j
+    cdef char *frame
+    for i in range(c.frames()):
+        frame = cram_frame(c, i)
+        for j in range(bits):
+            if frame[j]:
+                data[i, j >> 3] |= 0x80 >> (j & 7)
+    return out
@@ -1,8 +1,28 @@
+import os
 from distutils.core import setup
+from distutils.extension import Extension
 from Cython.Build import cythonize
 import numpy
 
+# fast_cram copies frames straight into the C++ CRAM of pytrellis chips,
+# so it is built against the prjtrellis headers and libtrellis
+TRELLIS_SRC = os.environ.get('TRELLIS_SRC', os.path.abspath('../../../prjtrellis'))
+TRELLIS_PREFIX = os.environ.get('TRELLIS_PREFIX', os.path.expanduser('~/sft'))
+BOOST_PYTHON = os.environ.get('BOOST_PYTHON', 'boost_python37')
+TRELLIS_LIB_DIR = os.path.join(TRELLIS_PREFIX, 'lib', 'trellis')
+
+extension = Extension('fast_cram',
+                      sources=['fast_cram.pyx'],
+                      language='c++',
+                      include_dirs=[numpy.get_include(),
+                                    os.path.dirname(os.path.abspath(__file__)),
+                                    os.path.join(TRELLIS_SRC, 'libtrellis', 'include')],
+                      library_dirs=[TRELLIS_LIB_DIR],
+                      runtime_library_dirs=[TRELLIS_LIB_DIR],
+                      libraries=['trellis', BOOST_PYTHON],
+                      extra_compile_args=['-std=c++14'])
+
 setup(name='Fast CRAM loading',
-        ext_modules=cythonize("fast_cram.pyx", compiler_directives={'language_level' : "3"}),
+        ext_modules=cythonize([extension], compiler_directives={'language_level' : "3"}),
         include_dirs=[numpy.get_include()]
     )
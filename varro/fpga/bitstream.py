@@ -0,0 +1,73 @@
+"""
+This module serializes chips straight to bitstreams, without a textual .config
+"""
+
+import numpy as np
+import pytrellis
+
+from varro.cython.fast_cram import load_cram_frames
+from varro.util.variables import FPGA_BITSTREAM_SHAPE
+from varro.fpga.chip import get_chip_pool
+from varro.fpga.flash import bitstream_to_svf
+from varro.fpga.tile_index import TileIndex
+from varro.fpga.tiles import SIMPLE_STEP_TILES, SIMPLE_STEP_CFG
+
+
+def tile_mask(regions):
+    """Returns the bit-packed CRAM mask of the bits that belong to the given tile regions"""
+    mask = np.zeros(FPGA_BITSTREAM_SHAPE, dtype=bool)
+    for _, frame_offset, num_frames, bit_offset, bits_per_frame in regions:
+        mask[frame_offset:frame_offset + num_frames, bit_offset:bit_offset + bits_per_frame] = True
+    return np.packbits(mask, axis=1)
+
+
+class BitstreamWriter:
+    def __init__(self, tiles=SIMPLE_STEP_TILES, fixed_config=SIMPLE_STEP_CFG):
+        """Writes bitstreams of evolved tiles on top of a template of fixed tiles
+
+        This produces the same image as writing the evolved tiles and the fixed
+        config to a .config file and running ecppack on it, but the template
+        chip comes from a shared pool and only the frames that change are
+        copied into it.
+
+        Args:
+            tiles (list of str): Names of the evolved tiles
+            fixed_config (str): Config of the fixed tiles, in the .config format
+
+        """
+        self.chip_pool = get_chip_pool(fixed_config)
+        self.chip = self.chip_pool.acquire()
+        self.template = self.chip_pool.template
+        self.mask = tile_mask(TileIndex.load().regions(tiles))
+        self.image = self.template.copy()
+
+    def load(self, cram):
+        """Copies the evolved tiles of a bit-packed CRAM into the image
+
+        Returns:
+            The indices of the frames of the image that changed
+        """
+        image = (self.template & ~self.mask) | (cram & self.mask)
+        frames = np.flatnonzero((image != self.image).any(axis=1))
+        self.image[frames] = image[frames]
+        load_cram_frames(self.chip.cram, self.image, frames)
+        return frames
+
+    def write(self, file_base_name):
+        """Writes the image to file_base_name.bit and file_base_name.svf
+
+        Returns:
+            The (bit, svf) payloads written, as bytes
+        """
+        bitstream = pytrellis.Bitstream.serialise_chip(self.chip)
+        bitstream.write_bit(file_base_name + ".bit")
+        with open(file_base_name + ".bit", "rb") as f:
+            bit = f.read()
+        svf = bitstream_to_svf(bit, self.chip.info.idcode).encode()
+        with open(file_base_name + ".svf", "wb") as f:
+            f.write(svf)
+        return bit, svf
+
+    def close(self):
+        """Returns the chip to its pool"""
+        self.chip_pool.release(self.chip)
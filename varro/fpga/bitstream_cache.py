@@ -0,0 +1,143 @@
+"""
+This module caches finished bitstreams of repeated CRAM images
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from dowel import logger
+
+from varro.util.util import make_path
+from varro.util.variables import FPGA_BITSTREAM_CACHE_SIZE, FPGA_BITSTREAM_CACHE_BYTES
+
+
+class BitstreamCache:
+    def __init__(self, max_entries=FPGA_BITSTREAM_CACHE_SIZE, cache_dir=None,
+                 max_bytes=FPGA_BITSTREAM_CACHE_BYTES):
+        """Least recently used cache of .bit/.svf payloads, keyed by a hash of the CRAM image
+
+        Elites, unmutated clones and hall of fame members load the same CRAM
+        image again, so their bitstreams can be flashed without being built.
+
+        Args:
+            max_entries (int): Maximum number of cached bitstreams
+            cache_dir (str): Directory to keep the payloads in, e.g. on a tmpfs.
+                Payloads are kept in memory if None
+            max_bytes (int): Maximum size of the payloads kept in memory, each
+                bitstream of a whole chip takes several MB
+
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            make_path(cache_dir)
+        # Maps keys to (bit, svf) payloads, or to None if the payload is on disk
+        self.entries = OrderedDict()
+        # Size of the payloads kept in memory
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(cram):
+        """Returns the cache key of a bit-packed CRAM image"""
+        data = np.ascontiguousarray(cram).view(np.uint8)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def file_base_name(self, key):
+        """Returns the base file name of a payload on disk"""
+        return os.path.join(self.cache_dir, key)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, key, file_base_name):
+        """Finds the bitstream of a key and writes it to file_base_name.bit and
+        file_base_name.svf.
+
+        Payloads on disk are copied too: another thread may evict them before
+        the bitstream is flashed, but never the files of file_base_name.
+
+        Returns:
+            file_base_name if the bitstream is cached, None otherwise
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                payload = self.entries[key]
+            elif self.cache_dir is not None and os.path.isfile(self.file_base_name(key) + ".svf"):
+                # Left on disk by an earlier run
+                self.entries[key] = payload = None
+                self.evict()
+            else:
+                self.misses += 1
+                return None
+            if payload is None:
+                # Read while holding the lock, which eviction needs too
+                try:
+                    payload = read_payload(self.file_base_name(key))
+                except OSError:
+                    del self.entries[key]
+                    self.misses += 1
+                    return None
+            self.hits += 1
+
+        write_payload(file_base_name, *payload)
+        return file_base_name
+
+    def store(self, key, bit, svf):
+        """Caches the .bit and .svf payloads of a key"""
+        if self.cache_dir is not None:
+            write_payload(self.file_base_name(key), bit, svf)
+            payload = None
+        else:
+            payload = (bit, svf)
+            if payload_size(payload) > self.max_bytes:
+                return
+        with self.lock:
+            self.bytes -= payload_size(self.entries.get(key))
+            self.entries[key] = payload
+            self.entries.move_to_end(key)
+            self.bytes += payload_size(payload)
+            self.evict()
+
+    def evict(self):
+        """Drops the least recently used entries beyond max_entries or max_bytes"""
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            key, payload = self.entries.popitem(last=False)
+            self.bytes -= payload_size(payload)
+            if payload is None:
+                for extension in (".bit", ".svf"):
+                    try:
+                        os.remove(self.file_base_name(key) + extension)
+                    except OSError:
+                        pass
+
+    def log_stats(self):
+        logger.log('BITSTREAM_CACHE.PY hits: {} | misses: {} | hit rate: {:.2%}'.format(
+            self.hits, self.misses, self.hit_rate))
+
+def payload_size(payload):
+    """Returns the bytes a cached payload takes in memory, 0 if it is on disk (or None)"""
+    return 0 if payload is None else len(payload[0]) + len(payload[1])
+
+def read_payload(file_base_name):
+    """Returns the (bit, svf) payloads of file_base_name.bit and file_base_name.svf"""
+    with open(file_base_name + ".bit", "rb") as f:
+        bit = f.read()
+    with open(file_base_name + ".svf", "rb") as f:
+        svf = f.read()
+    return bit, svf
+
+def write_payload(file_base_name, bit, svf):
+    """Writes a bitstream's payloads to file_base_name.bit and file_base_name.svf"""
+    with open(file_base_name + ".bit", "wb") as f:
+        f.write(bit)
+    with open(file_base_name + ".svf", "wb") as f:
+        f.write(svf)
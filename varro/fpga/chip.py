@@ -0,0 +1,88 @@
+"""
+This module loads the prjtrellis database once and pools reusable chips
+"""
+
+import threading
+from contextlib import contextmanager
+import pytrellis
+
+from varro.cython.fast_cram import dump_cram_packed, load_cram_packed
+from varro.util.variables import PRJTRELLIS_DATABASE, CHIP_NAME, CHIP_COMMENT
+
+_database_lock = threading.Lock()
+_database_loaded = False
+
+def load_database(database=PRJTRELLIS_DATABASE):
+    """Loads the prjtrellis database, once per process"""
+    global _database_loaded
+    with _database_lock:
+        if not _database_loaded:
+            pytrellis.load_database(database)
+            _database_loaded = True
+
+
+class ChipPool:
+    def __init__(self, chip_name=CHIP_NAME, fixed_config=None):
+        """Pool of reusable chips, reset to a template CRAM when they are acquired
+
+        Resetting a chip is a bulk CRAM copy, which is much cheaper than
+        building a new chip (and parsing its fixed config) per individual.
+
+        Args:
+            chip_name (str): Name of the chip, e.g. 'LFE5UM5G-85F'
+            fixed_config (str): Config of the fixed tiles, in the .config format,
+                every chip starts out empty if None
+
+        """
+        self.chip_name = chip_name
+        self.fixed_config = fixed_config
+        self.free = []
+        self.lock = threading.Lock()
+        # Bit-packed CRAM of a freshly built chip
+        self.template = None
+
+    def new_chip(self):
+        load_database()
+        if self.fixed_config is None:
+            return pytrellis.Chip(self.chip_name)
+        config = "\n".join([".device {}".format(self.chip_name), "", CHIP_COMMENT, "", self.fixed_config])
+        return pytrellis.ChipConfig.from_string(config).to_chip()
+
+    def acquire(self):
+        """Returns a chip whose CRAM is the template"""
+        with self.lock:
+            chip = self.free.pop() if self.free else None
+        if chip is not None:
+            load_cram_packed(chip.cram, self.template)
+            return chip
+
+        chip = self.new_chip()
+        with self.lock:
+            if self.template is None:
+                self.template = dump_cram_packed(chip.cram)
+        return chip
+
+    def release(self, chip):
+        """Returns a chip to the pool"""
+        with self.lock:
+            self.free.append(chip)
+
+    @contextmanager
+    def chip(self):
+        """Context manager that acquires a chip and releases it afterwards"""
+        chip = self.acquire()
+        try:
+            yield chip
+        finally:
+            self.release(chip)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_chip_pool(fixed_config=None, chip_name=CHIP_NAME):
+    """Returns the process-wide pool of chips with the given fixed config"""
+    with _pools_lock:
+        key = (chip_name, fixed_config)
+        if key not in _pools:
+            _pools[key] = ChipPool(chip_name, fixed_config)
+        return _pools[key]
@@ -3,14 +3,14 @@ This module contains FPGA utility functions.
 """
 
 import os
-from os.path import join
+import atexit
 import shutil
-import numpy as np
-import pytrellis
+import tempfile
+import itertools
+import threading
 
 from varro.util.util import make_path
-from varro.util.variables import FPGA_CONFIG_DIR
-from varro.util.variables import FPGA_BITSTREAM_SHAPE
+from varro.util.variables import FPGA_CONFIG_DIR, FPGA_RAM_DIR
 
 
 def get_config_dir():
@@ -25,29 +25,31 @@ def clean_config_dir():
     elif os.path.exists(configdir):
         os.remove(configdir)
 
-def is_int(str):
-    """Determines if a number is an integer."""
-    try:
-        int(str)
-        return True
-    except ValueError:
-        return False
+def get_workspace_root():
+    """Returns the directory that holds the workspaces: a tmpfs if there is one,
+    the config folder otherwise."""
+    if os.path.isdir(FPGA_RAM_DIR) and os.access(FPGA_RAM_DIR, os.W_OK):
+        return FPGA_RAM_DIR
+    return get_config_dir()
 
-def get_max_id():
-    """Finds the maximum id in the config folder."""
-    max_id = 0
-    for filename in os.listdir(get_config_dir()):
-        if is_int(filename):
-            file_id = int(filename)
-            if file_id > max_id:
-                max_id = file_id
-    return max_id
+def make_workspace():
+    """Creates a private directory for the config files of one worker.
+
+    Workspaces are unique across threads and processes, and are removed
+    when the process exits.
+    """
+    workspace = tempfile.mkdtemp(prefix='varro-{}-'.format(os.getpid()), dir=get_workspace_root())
+    atexit.register(shutil.rmtree, workspace, ignore_errors=True)
+    return workspace
+
+# Ids handed out by get_new_id in this process
+_ids = itertools.count(1)
+_ids_lock = threading.Lock()
 
 def get_new_id():
-    """Generates a new id for a new bitstream."""
-    new_id = get_max_id() + 1
-    make_path(join(get_config_dir(), str(new_id)))
-    return new_id
+    """Generates a new id for a new bitstream, unique within this process."""
+    with _ids_lock:
+        return next(_ids)
 
 def bit_to_cram(filename):
     """Take a .bit file and return the CRAM array."""
@@ -56,15 +58,14 @@ def bit_to_cram(filename):
 
 def load_bit_to_chip(filename):
     """Take a .bit file and return the deserialized chip."""
-    pytrellis.load_database("../prjtrellis-db")
+    # Imported here so the workspace helpers work without pytrellis
+    import pytrellis
+    from varro.fpga.chip import load_database
+    load_database()
     bs = pytrellis.Bitstream.read_bit(filename)
     return bs.deserialise_chip()
 
 def chip_to_cram(chip):
     """Take a pytrellis chip object and return the CRAM array."""
-    cram_bits = np.empty(FPGA_BITSTREAM_SHAPE, dtype=np.bool)
-    for i in range(chip.cram.frames()):
-        for j in range(chip.cram.bits()):
-            cram_bits[i][j] = chip.cram.bit(i, j)
-
-    return cram_bits
+    from varro.cython.fast_cram import dump_cram
+    return dump_cram(chip.cram)
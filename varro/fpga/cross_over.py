@@ -3,46 +3,85 @@ This module defines the mating protocol to be used for FPGA evolutionary algos
 """
 
 import numpy as np
-import pytrellis
 
-from varro.fpga.interface import FpgaConfig
-from varro.util.variables import FPGA_BITSTREAM_SHAPE
+from varro.fpga.genome import GenomeLayout
+from varro.util.variables import FPGA_PACKED_BITSTREAM_SHAPE
 
 
-def cross_over(ind1, ind2):
+def cross_over(ind1, ind2, genome_layout=None, tile_regions=None):
     """Performing cross-overs that preserve wire configs
-    """
 
-    # Load individuals into FpgaConfig
-    ind1_config, ind2_config = FpgaConfig(config_data=ind1.reshape(FPGA_BITSTREAM_SHAPE)), FpgaConfig(config_data=ind2.reshape(FPGA_BITSTREAM_SHAPE))
+    Two-point crossover over the list of tiles: every tile between the two
+    points is swapped as a whole between the individuals. Tiles are located
+    with a precomputed index, so mating works on the bit-packed genomes
+    directly and never touches pytrellis or the board.
 
-    # Cross-over
-    point_1_idx, point_2_idx = sorted(np.random.choice(np.arange(0, len(ind1_config.chip.get_all_tiles())), size=2, replace=False))
-    for idx in range(point_1_idx, point_2_idx):
-        ind1_config.chip.swap_tiles(ind1_config.chip.get_all_tiles()[int(idx)].info.name, ind2_config.chip)
+    Args:
+        ind1 (toolbox.Individual): First individual, modified in-place
+        ind2 (toolbox.Individual): Second individual, modified in-place
+        genome_layout (GenomeLayout): Layout of the CRAM bits in the individuals
+        tile_regions (list): Tuples (name, frame_offset, num_frames, bit_offset, bits_per_frame)
+            of every tile of the chip, needed when the genome holds the whole CRAM
 
-    # Convert the cross-overed chips to individuals
-    child1, child2 = replace_ind_values(ind1, ind1_config.chip), replace_ind_values(ind2, ind2_config.chip)
+    Returns:
+        The two children
+    """
+    if genome_layout is None:
+        genome_layout = GenomeLayout()
 
-    return child1, child2
+    if genome_layout.tiles is not None:
+        # The genome holds the masked tiles one after the other,
+        # so a range of tiles is a contiguous range of genome bits
+        point_1_idx, point_2_idx = sorted(np.random.choice(len(genome_layout.tiles), size=2, replace=False))
+        swap_bits(ind1, ind2,
+                  genome_layout.tile_bounds[point_1_idx],
+                  genome_layout.tile_bounds[point_2_idx])
+    else:
+        # The genome holds the whole CRAM frame by frame,
+        # so every tile is a rectangle of frames and bits
+        frames1 = ind1.reshape(FPGA_PACKED_BITSTREAM_SHAPE)
+        frames2 = ind2.reshape(FPGA_PACKED_BITSTREAM_SHAPE)
+        point_1_idx, point_2_idx = sorted(np.random.choice(len(tile_regions), size=2, replace=False))
+        for _, frame_offset, num_frames, bit_offset, bits_per_frame in tile_regions[point_1_idx:point_2_idx]:
+            frames = slice(frame_offset, frame_offset + num_frames)
+            swap_bits(frames1[frames], frames2[frames], bit_offset, bit_offset + bits_per_frame)
 
-def replace_ind_values(ind, ind_chip):
-    """Convert ind list values with new cram from the altered ind_chip
+    return ind1, ind2
 
-    Args:
-        ind (toolbox.Individual): Individual to be modified
-        ind_chip (Chip): Chip that had gone through cross_over
+def swap_bits(packed1, packed2, start, stop):
+    """Swaps bits [start, stop) along the last axis of two bit-packed arrays in-place
 
-    Returns:
-        Individual with new values from CRAM after cross over
+    Args:
+        packed1 (np.ndarray of uint8): Bit-packed bits, e.g. a genome or rows of CRAM frames
+        packed2 (np.ndarray of uint8): Bit-packed bits of the same shape
+        start (int): First bit to swap
+        stop (int): Bit after the last bit to swap
     """
-    ind_bits = np.empty(FPGA_BITSTREAM_SHAPE)
-    for i in range(ind_chip.cram.frames()):
-        for j in range(ind_chip.cram.bits()):
-            ind_bits[i][j] = ind_chip.cram.bit(i, j)
+    if start >= stop:
+        return
+
+    first_byte, last_byte = start >> 3, (stop - 1) >> 3
+    head_mask = 0xFF >> (start & 7)
+    tail_mask = (0xFF00 >> (((stop - 1) & 7) + 1)) & 0xFF
+
+    # Slices rather than indices, so 1d genomes give views too
+    head = slice(first_byte, first_byte + 1)
+    tail = slice(last_byte, last_byte + 1)
+    if first_byte == last_byte:
+        swap_masked(packed1[..., head], packed2[..., head], head_mask & tail_mask)
+        return
+
+    swap_masked(packed1[..., head], packed2[..., head], head_mask)
+    swap_masked(packed1[..., tail], packed2[..., tail], tail_mask)
 
-    ind_bits = ind_bits.flatten()
-    for idx in range(len(ind)):
-        ind[idx] = ind_bits[idx]
+    # Whole bytes in between
+    middle = slice(first_byte + 1, last_byte)
+    middle_bytes = packed1[..., middle].copy()
+    packed1[..., middle] = packed2[..., middle]
+    packed2[..., middle] = middle_bytes
 
-    return ind
+def swap_masked(bytes1, bytes2, mask):
+    """Swaps the bits selected by mask between two arrays of bytes in-place"""
+    diff = (bytes1 ^ bytes2) & np.uint8(mask)
+    bytes1 ^= diff
+    bytes2 ^= diff
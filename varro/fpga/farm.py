@@ -0,0 +1,282 @@
+"""
+This module spreads FPGA evaluations over a farm of ECP5 + Arduino boards
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+import numpy as np
+from dowel import logger
+
+from varro.fpga.flash import CFG_FILE
+from varro.fpga.openocd import TCL_PORT
+
+
+class Board:
+    def __init__(self, name, arduino_port, openocd_cfg=CFG_FILE, openocd_commands=(),
+                 tcl_port=TCL_PORT, bitstream_cache=None):
+        """An ECP5 and the Arduino that measures it
+
+        Args:
+            name (str): Name of the board in the farm
+            arduino_port (str): Serial port of the Arduino
+            openocd_cfg (str): openocd config file of the board
+            openocd_commands (list of str): openocd commands that select this board's
+                JTAG adapter, e.g. ['adapter serial FT4232H-1']
+            tcl_port (int): openocd TCL port, unique per board
+            bitstream_cache (BitstreamCache): Cache of finished bitstreams, may be
+                shared between boards
+
+        """
+        from varro.arduino.communication import connect
+        from varro.fpga.bitstream import BitstreamWriter
+        from varro.fpga.config import make_workspace
+        from varro.fpga.openocd import OpenocdSession
+
+        self.name = name
+        self.arduino = connect(arduino_port)
+        self.session = OpenocdSession(openocd_cfg, port=tcl_port, commands=openocd_commands)
+        self.writer = BitstreamWriter()
+        self.bitstream_cache = bitstream_cache
+        self.file_base_name = os.path.join(make_workspace(), name)
+        self.flashed = False
+
+    def load(self, cram):
+        """Flashes a bit-packed CRAM, unless its evolved tiles are already on the board"""
+        if len(self.writer.load(cram)) == 0 and self.flashed:
+            return
+
+        file_base_name = None
+        if self.bitstream_cache is not None:
+            key = self.bitstream_cache.key(cram)
+            file_base_name = self.bitstream_cache.lookup(key, self.file_base_name)
+        if file_base_name is None:
+            bit, svf = self.writer.write(self.file_base_name)
+            if self.bitstream_cache is not None:
+                self.bitstream_cache.store(key, bit, svf)
+            file_base_name = self.file_base_name
+        self.session.flash(file_base_name + ".svf")
+        self.flashed = True
+
+    def evaluate(self, words):
+        """Returns the mean ADC reading of every port word, scaled to [0, 1)"""
+        return self.arduino.link.evaluate_words(words).mean(axis=1) / 1024
+
+    def health_check(self):
+        """Returns whether the programmer and the Arduino both answer"""
+        try:
+            self.session.command("version")
+            self.arduino.link.evaluate_words([0])
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        self.session.close()
+        self.writer.close()
+
+
+class SimulatedBoard:
+    def __init__(self, name, respond=None, flash_time=0.0, evaluate_time=0.0, fail_after=None):
+        """Local stand-in for a Board, for testing farms without hardware
+
+        Args:
+            name (str): Name of the board in the farm
+            respond (callable): respond(cram, words) returns the readings in [0, 1) of
+                port words on a board loaded with cram, a fixed function of both if None
+            flash_time (float): Seconds each load takes
+            evaluate_time (float): Seconds each evaluation takes
+            fail_after (int): Number of evaluations after which the board breaks down
+
+        """
+        self.name = name
+        self.respond = respond if respond is not None else simulated_response
+        self.flash_time = flash_time
+        self.evaluate_time = evaluate_time
+        self.fail_after = fail_after
+        self.cram = None
+        self.evaluations = 0
+
+    def load(self, cram):
+        time.sleep(self.flash_time)
+        self.cram = np.array(cram, copy=True)
+
+    def evaluate(self, words):
+        if self.fail_after is not None and self.evaluations >= self.fail_after:
+            raise RuntimeError('Board {} is down'.format(self.name))
+        time.sleep(self.evaluate_time)
+        self.evaluations += 1
+        return self.respond(self.cram, np.asarray(words))
+
+    def health_check(self):
+        return self.fail_after is None or self.evaluations < self.fail_after
+
+    def close(self):
+        pass
+
+def simulated_response(cram, words):
+    """Readings of a simulated board: a fixed function of its CRAM and the port words"""
+    seed = int(np.bitwise_xor.reduce(np.asarray(cram, dtype=np.uint8).ravel())) + 1
+    return ((words.astype(np.int64) * seed) % 1024) / 1024
+
+
+class BoardModel:
+    def __init__(self, model, board):
+        """View of a model that predicts on one board of a farm"""
+        self.model = model
+        self.board = board
+
+    def predict(self, X, problem=None):
+        return self.board.evaluate(self.model.quantize(X, problem))
+
+
+class BoardFarm:
+    def __init__(self, boards, queue_size=2, max_failures=3):
+        """Registry of boards, and a scheduler that spreads evaluations over them
+
+        Every board has a worker thread fed by its own queue of at most
+        queue_size items. A board whose evaluation fails and whose health check
+        then fails (or that fails max_failures times in a row) is removed, and
+        its queued items are evaluated on the remaining boards.
+
+        Args:
+            boards (list): Boards (or SimulatedBoards) with distinct names
+            queue_size (int): Maximum number of items queued per board
+            max_failures (int): Consecutive failures after which a board is removed
+
+        """
+        self.queue_size = queue_size
+        self.max_failures = max_failures
+        self.boards = {}
+        self.queues = {}
+        self.stats = {}
+        self.results = queue.Queue()
+        for board in boards:
+            self.add_board(board)
+
+    @classmethod
+    def from_registry(cls, registry, **kwargs):
+        """Builds a farm from a JSON registry file, or 'sim:N' for N simulated boards
+
+        The registry holds a list of Board arguments, e.g.
+            [{"name": "board0", "arduino_port": "/dev/ttyACM0",
+              "openocd_commands": ["adapter serial FT0"], "tcl_port": 6666}, ...]
+        """
+        if registry.startswith('sim:'):
+            return cls([SimulatedBoard('sim{}'.format(i)) for i in range(int(registry[4:]))], **kwargs)
+
+        from varro.fpga.bitstream_cache import BitstreamCache
+        with open(registry) as f:
+            board_args = json.load(f)
+        bitstream_cache = BitstreamCache()
+        return cls([Board(bitstream_cache=bitstream_cache, **args) for args in board_args], **kwargs)
+
+    def add_board(self, board):
+        """Registers a board and starts its worker"""
+        if board.name in self.boards:
+            raise ValueError('Board {} is already in the farm'.format(board.name))
+        self.boards[board.name] = board
+        self.queues[board.name] = queue.Queue(maxsize=self.queue_size)
+        self.stats[board.name] = {'evaluated': 0, 'busy': 0.0, 'failures': 0}
+        threading.Thread(target=self.work, args=(board, self.queues[board.name]), daemon=True).start()
+
+    def remove_board(self, name):
+        """Unregisters a board and stops its worker
+
+        Returns:
+            The items still queued on the board
+        """
+        board = self.boards.pop(name)
+        board_queue = self.queues.pop(name)
+        requeued = []
+        while True:
+            try:
+                requeued.append(board_queue.get_nowait())
+            except queue.Empty:
+                break
+        # The worker closes the board once it is done with its current item
+        board_queue.put(None)
+        logger.log('FARM.PY Removed board {}'.format(name))
+        return requeued
+
+    def work(self, board, board_queue):
+        while True:
+            task = board_queue.get()
+            if task is None:
+                board.close()
+                return
+            idx, item, func = task
+            start_time = time.perf_counter()
+            try:
+                result = func(board, item)
+                error, healthy = None, True
+            except Exception as e:
+                result, error = None, e
+                # Checked here, as the board's session and link are only used by its worker
+                healthy = board.health_check()
+            self.results.put((board.name, idx, item, result, error, healthy, time.perf_counter() - start_time))
+
+    def map(self, func, items):
+        """Evaluates func(board, item) for every item on the boards of the farm
+
+        Returns:
+            The results, in the order of items
+        """
+        pending = deque(enumerate(items))
+        results = [None] * len(pending)
+        remaining = len(pending)
+        in_flight = {name: 0 for name in self.boards}
+
+        while remaining:
+            if not self.boards:
+                raise RuntimeError('No healthy boards left in the farm')
+
+            # Fill the queues of the least loaded boards first
+            for name in sorted(self.boards, key=lambda name: in_flight[name]):
+                while pending and in_flight[name] < self.queue_size:
+                    idx, item = pending.popleft()
+                    self.queues[name].put((idx, item, func))
+                    in_flight[name] += 1
+
+            name, idx, item, result, error, healthy, busy = self.results.get()
+            if name not in self.boards:
+                # Finished on a board that was removed meanwhile
+                if error is not None:
+                    pending.appendleft((idx, item))
+                else:
+                    results[idx] = result
+                    remaining -= 1
+                continue
+
+            in_flight[name] -= 1
+            stats = self.stats[name]
+            if error is None:
+                results[idx] = result
+                remaining -= 1
+                stats['evaluated'] += 1
+                stats['busy'] += busy
+                stats['failures'] = 0
+                continue
+
+            stats['failures'] += 1
+            pending.appendleft((idx, item))
+            logger.log('FARM.PY Board {} failed: {}'.format(name, error))
+            if stats['failures'] >= self.max_failures or not healthy:
+                for idx, item, _ in self.remove_board(name):
+                    pending.appendleft((idx, item))
+
+        return results
+
+    def log_stats(self):
+        """Logs the number of evaluations and throughput of every board"""
+        for name, stats in sorted(self.stats.items()):
+            throughput = stats['evaluated'] / stats['busy'] if stats['busy'] else 0.0
+            logger.log('FARM.PY {} | evaluated: {} | {:.2f} individuals/s{}'.format(
+                name, stats['evaluated'], throughput, '' if name in self.boards else ' | removed'))
+
+    def close(self):
+        for name in list(self.boards):
+            self.remove_board(name)
@@ -3,12 +3,27 @@ This module handles flashing of a bitstream file to the FPGA.
 """
 
 import os
+import atexit
+import numpy as np
 
 CFG_FILE = "~/sft/share/trellis/misc/openocd/ecp5-evn.cfg"
 
 
+# The openocd session shared by every flash in this process, started on first use
+_session = None
+
 def flash_ecp5(file_base_name):
-    """Flashes a bitstream file to the ECP5 fpga. For best performance, use a file in ramdisk."""
+    """Flashes a bitstream's .svf file to the ECP5 fpga through a persistent openocd session.
+    For best performance, use a file in ramdisk."""
+    global _session
+    if _session is None:
+        from varro.fpga.openocd import OpenocdSession
+        _session = OpenocdSession(CFG_FILE)
+        atexit.register(_session.close)
+    _session.flash(file_base_name + ".svf")
+
+def flash_ecp5_once(file_base_name):
+    """Flashes a bitstream file to the ECP5 fpga with a new openocd process."""
     # os.system("openocd log_output /dev/null")
     err = os.system("openocd -f {0} -c \"transport select jtag; init; svf {1}.svf; exit\" >/dev/null 2>&1".format(CFG_FILE, file_base_name))
     if err:
@@ -22,3 +37,80 @@ def config_to_bitstream(file_base_name):
 def flash_config_file(file_base_name):
     config_to_bitstream(file_base_name)
     flash_ecp5(file_base_name)
+
+# Table of every byte with its bits in reverse order
+REVERSED_BITS = np.packbits(np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)[:, ::-1], axis=1).ravel()
+
+# Bytes of bitstream data per SDR command of an SVF file
+SVF_ROW_BYTES = 8000
+
+def bitstream_to_svf(bitstream, idcode):
+    """Returns the SVF commands that load a bitstream into the SRAM of an ECP5 over JTAG,
+    the same as `ecppack --svf` writes.
+
+    Args:
+        bitstream (bytes): Contents of a .bit file
+        idcode (int): JTAG IDCODE of the chip, e.g. 0x81113043 for a LFE5UM5G-85F
+
+    """
+    data = np.frombuffer(bitstream, dtype=np.uint8)
+    lines = ["HDR\t0;",
+             "HIR\t0;",
+             "TDR\t0;",
+             "TIR\t0;",
+             "ENDDR\tDRPAUSE;",
+             "ENDIR\tIRPAUSE;",
+             "STATE\tIDLE;",
+             "SIR\t8\tTDI  (E0);",
+             "SDR\t32\tTDI  (00000000)",
+             "\t\tTDO  ({:08X})".format(idcode),
+             "\t\tMASK (FFFFFFFF);",
+             "",
+             "SIR\t8\tTDI  (1C);",
+             "SDR\t510\tTDI  (3FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF",
+             "\t\t\tFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF);",
+             "",
+             "SIR\t8\tTDI  (C6);",
+             "SDR\t8\tTDI  (00);",
+             "RUNTEST\tIDLE\t2 TCK\t1.00E-02 SEC;",
+             "",
+             "SIR\t8\tTDI  (3C);",
+             "SDR\t32\tTDI  (00000000)",
+             "\t\tTDO  (00000000)",
+             "\t\tMASK (0000B000);",
+             "",
+             "SIR\t8\tTDI  (46);",
+             "SDR\t8\tTDI  (01);",
+             "RUNTEST\tIDLE\t2 TCK\t1.00E-02 SEC;",
+             "",
+             "SIR\t8\tTDI  (7A);",
+             "RUNTEST\tIDLE\t2 TCK\t1.00E-02 SEC;"]
+
+    # Every row is shifted in last byte first, with the bits of each byte reversed
+    for start in range(0, len(data), SVF_ROW_BYTES):
+        row = REVERSED_BITS[data[start:start + SVF_ROW_BYTES]][::-1].tobytes().hex().upper()
+        hex_lines = [row[i:i + 64] for i in range(0, len(row), 64)]
+        lines.append("SDR\t{}\tTDI  ({}".format(4 * len(row), "\n\t\t\t".join(hex_lines)) + ");")
+
+    lines += ["",
+              "SIR\t8\tTDI  (FF);",
+              "RUNTEST\tIDLE\t100 TCK\t1.00E-02 SEC;",
+              "",
+              "SIR\t8\tTDI  (C0);",
+              "RUNTEST\tIDLE\t2 TCK\t1.00E-03 SEC;",
+              "SDR\t32\tTDI  (00000000)",
+              "\t\tTDO  (00000000)",
+              "\t\tMASK (FFFFFFFF);",
+              "",
+              "SIR\t8\tTDI  (26);",
+              "RUNTEST\tIDLE\t2 TCK\t2.00E-01 SEC;",
+              "",
+              "SIR\t8\tTDI  (FF);",
+              "RUNTEST\tIDLE\t2 TCK\t1.00E-03 SEC;",
+              "",
+              "SIR\t8\tTDI  (3C);",
+              "SDR\t32\tTDI  (00000000)",
+              "\t\tTDO  (00000100)",
+              "\t\tMASK (00002100);",
+              ""]
+    return "\n".join(lines)
@@ -0,0 +1,179 @@
+"""
+This module contains the bit-packed genome representation of FPGA individuals
+"""
+
+import numpy as np
+
+from varro.util.variables import FPGA_BITSTREAM_SHAPE, FPGA_PACKED_BITSTREAM_SHAPE
+
+
+def pack_cram(cram_bits):
+    """Packs a 2d array of CRAM bits into a flat genome of 8 bits per byte.
+
+    Every frame of the CRAM is packed into its own row of bytes, so frame
+    boundaries stay byte aligned inside the genome.
+
+    Args:
+        cram_bits (np.ndarray of bools): CRAM bits of shape FPGA_BITSTREAM_SHAPE
+
+    Returns:
+        np.ndarray of uint8 with np.prod(FPGA_PACKED_BITSTREAM_SHAPE) bytes
+    """
+    cram_bits = np.asarray(cram_bits, dtype=bool).reshape(FPGA_BITSTREAM_SHAPE)
+    return np.packbits(cram_bits, axis=1).ravel()
+
+def unpack_genome(genome):
+    """Unpacks a bit-packed genome into a 2d array of CRAM bits.
+
+    Args:
+        genome (np.ndarray of uint8): Bit-packed genome
+
+    Returns:
+        np.ndarray of bools of shape FPGA_BITSTREAM_SHAPE
+    """
+    packed = np.asarray(genome, dtype=np.uint8).reshape(FPGA_PACKED_BITSTREAM_SHAPE)
+    return np.unpackbits(packed, axis=1).view(bool)
+
+def as_cram_bits(config_data):
+    """Returns config data as a 2d array of CRAM bits.
+
+    Accepts both bit-packed genomes (uint8) and unpacked CRAM bits, e.g.
+    individuals from checkpoints written before genomes were packed.
+    """
+    config_data = np.asarray(config_data)
+    if config_data.dtype == np.uint8:
+        return unpack_genome(config_data)
+    return config_data.reshape(FPGA_BITSTREAM_SHAPE).astype(bool, copy=False)
+
+def as_packed_cram(config_data):
+    """Returns config data as a 2d array of bit-packed CRAM frames.
+
+    Bit-packed genomes are only reshaped, so no copy is made for them.
+    """
+    config_data = np.asarray(config_data)
+    if config_data.dtype == np.uint8:
+        return config_data.reshape(FPGA_PACKED_BITSTREAM_SHAPE)
+    return np.packbits(config_data.reshape(FPGA_BITSTREAM_SHAPE).astype(bool, copy=False), axis=1)
+
+def random_genomes(n):
+    """Generates n uniformly random bit-packed genomes, one per row."""
+    return np.random.randint(0, 256, size=(n, np.prod(FPGA_PACKED_BITSTREAM_SHAPE)), dtype=np.uint8)
+
+def sample_flip_indices(num_bits, indpb):
+    """Samples the bits to flip when every bit flips independently with probability indpb.
+
+    The number of flips is drawn from a binomial distribution and only that
+    many positions are sampled, so the cost scales with the number of flipped
+    bits instead of the size of the genome.
+
+    Args:
+        num_bits (int): Number of bits in the genome
+        indpb (float): Probability of flipping each bit
+
+    Returns:
+        Sorted np.ndarray of the unique bit positions to flip
+    """
+    if indpb > 0.1:
+        # Most bits get sampled anyway, a dense draw is cheaper
+        return np.flatnonzero(np.random.random(num_bits) < indpb)
+
+    num_flips = np.random.binomial(num_bits, indpb)
+    idx = np.unique(np.random.randint(0, num_bits, size=num_flips))
+    while len(idx) < num_flips:
+        # Replace positions that were drawn more than once
+        idx = np.union1d(idx, np.random.randint(0, num_bits, size=num_flips - len(idx)))
+    return idx
+
+def flip_bits(genome, idx):
+    """Flips the bits at positions idx of a bit-packed genome in-place."""
+    idx = np.asarray(idx, dtype=np.int64)
+    np.bitwise_xor.at(genome, idx >> 3, (0x80 >> (idx & 7)).astype(np.uint8))
+
+
+class GenomeLayout:
+    def __init__(self, regions=None, template=None):
+        """Describes which CRAM bits an FPGA genome holds and how they map onto the CRAM
+
+        Without regions the genome holds the whole CRAM, packed frame by frame.
+        With regions it only holds the bits of those tiles, tile after tile,
+        and is scattered into a fixed template CRAM when it is loaded.
+
+        fit.py passes no template, so to_cram leaves every bit outside the
+        tiles zero rather than setting it to the SIMPLE_STEP base image. The
+        flashed image is unaffected: BitstreamWriter only takes the evolved
+        tiles from a CRAM and lays them over the fixed config of its chip pool.
+
+        Args:
+            regions (list): Tuples (name, frame_offset, num_frames, bit_offset, bits_per_frame)
+                of the CRAM rectangle of every tile to evolve, or None for the whole CRAM
+            template (np.ndarray of bools): CRAM bits outside the evolved tiles,
+                all zeros if None
+        """
+        self.regions = regions
+        if regions is None:
+            self.tiles = None
+            self.cram_idx = None
+            self.tile_bounds = None
+            self.num_bits = int(np.prod(FPGA_BITSTREAM_SHAPE))
+            return
+
+        self.tiles = [region[0] for region in regions]
+        self.template = np.zeros(FPGA_BITSTREAM_SHAPE, dtype=bool) if template is None \
+            else np.asarray(template, dtype=bool).reshape(FPGA_BITSTREAM_SHAPE)
+
+        # Flat CRAM index of every evolved bit, tile after tile
+        tile_idxs = []
+        for name, frame_offset, num_frames, bit_offset, bits_per_frame in regions:
+            frames = np.arange(frame_offset, frame_offset + num_frames)
+            bits = np.arange(bit_offset, bit_offset + bits_per_frame)
+            tile_idxs.append((frames[:, None] * FPGA_BITSTREAM_SHAPE[1] + bits[None, :]).ravel())
+
+        # Tiles may share CRAM bits, a shared bit belongs to the first tile holding it
+        all_idxs = np.concatenate(tile_idxs)
+        _, first = np.unique(all_idxs, return_index=True)
+        keep = np.zeros(len(all_idxs), dtype=bool)
+        keep[first] = True
+        self.cram_idx = all_idxs[keep]
+
+        # Genome bits [tile_bounds[i], tile_bounds[i+1]) belong to tile i
+        tile_ends = np.cumsum([len(idx) for idx in tile_idxs])
+        self.tile_bounds = np.concatenate(([0], np.cumsum(keep)[tile_ends - 1]))
+        self.num_bits = len(self.cram_idx)
+
+    @property
+    def parameters_shape(self):
+        """Shape of a bit-packed genome"""
+        if self.cram_idx is None:
+            return FPGA_PACKED_BITSTREAM_SHAPE
+        return (-(-self.num_bits // 8),)
+
+    def random(self, n):
+        """Generates n uniformly random bit-packed genomes, one per row."""
+        if self.cram_idx is None:
+            return random_genomes(n)
+        genomes = np.random.randint(0, 256, size=(n,) + self.parameters_shape, dtype=np.uint8)
+        # Keep the padding bits of the last byte cleared
+        genomes[:, -1] &= np.uint8((0xFF00 >> (self.num_bits - 8 * (self.parameters_shape[0] - 1))) & 0xFF)
+        return genomes
+
+    def to_cram(self, genome):
+        """Scatters a bit-packed genome into a 2d array of CRAM bits."""
+        if self.cram_idx is None:
+            return as_cram_bits(genome)
+        cram_bits = self.template.copy()
+        cram_bits.reshape(-1)[self.cram_idx] = np.unpackbits(np.asarray(genome, dtype=np.uint8),
+                                                              count=self.num_bits).view(bool)
+        return cram_bits
+
+    def to_packed_cram(self, genome):
+        """Scatters a bit-packed genome into a 2d array of bit-packed CRAM frames."""
+        if self.cram_idx is None:
+            return as_packed_cram(genome)
+        return np.packbits(self.to_cram(genome), axis=1)
+
+    def from_cram(self, cram_bits):
+        """Gathers the evolved bits of a 2d array of CRAM bits into a bit-packed genome."""
+        if self.cram_idx is None:
+            return pack_cram(cram_bits)
+        cram_bits = np.asarray(cram_bits, dtype=bool).reshape(-1)
+        return np.packbits(cram_bits[self.cram_idx])
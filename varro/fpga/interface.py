@@ -4,31 +4,66 @@ This module handles communication of data to the FPGA
 
 import os
 from os.path import join
-import pytrellis
+import numpy as np
 from dowel import logger
 
-from varro.cython.fast_cram import load_cram_fast
-from varro.util.variables import PRJTRELLIS_DATABASE, CHIP_NAME, CHIP_COMMENT
-from varro.fpga.config import get_new_id, get_config_dir, clean_config_dir
-from varro.fpga.flash import flash_config_file
-from varro.arduino.communication import evaluate_arduino
-
-pytrellis.load_database(PRJTRELLIS_DATABASE)
+from varro.cython.fast_cram import load_cram_frames
+from varro.util.variables import CHIP_COMMENT
+from varro.util.variables import FPGA_PACKED_BITSTREAM_SHAPE
+from varro.fpga.config import get_new_id, make_workspace
+from varro.fpga.flash import flash_ecp5
+from varro.fpga.bitstream import BitstreamWriter
+from varro.fpga.chip import get_chip_pool
+from varro.fpga.genome import as_packed_cram
+from varro.fpga.tile_index import TileIndex
+from varro.fpga.tiles import SIMPLE_STEP_TILES, SIMPLE_STEP_CFG
+from varro.arduino.communication import connect
 
 
 class FpgaConfig:
-    def __init__(self, config_data=None):
-        """This class handles flashing and evaluating the FPGA bitstream"""
-        self.chip = pytrellis.Chip(CHIP_NAME)
-        clean_config_dir()
+    def __init__(self, config_data=None, bitstream_cache=None, tiles=SIMPLE_STEP_TILES,
+                 fixed_config=SIMPLE_STEP_CFG):
+        """This class handles flashing and evaluating the FPGA bitstream
+
+        An FpgaConfig is a long-lived workspace: it remembers the CRAM that is
+        loaded in its chip and the config dumped for every tile, so loading the
+        next individual only touches the frames and tiles that changed. Its
+        files live in a private workspace, in RAM if possible, and are
+        overwritten by every individual.
+
+        Args:
+            config_data (np.ndarray): Config data to load onto the FPGA right away
+            bitstream_cache (BitstreamCache): Cache of finished bitstreams to reuse
+            tiles (list of str): Names of the evolved tiles
+            fixed_config (str): Config of the fixed tiles, in the .config format
+        """
+        # The Arduino is connected to on the first measurement
+        self.chip = get_chip_pool().acquire()
         self.id = get_new_id()
+        self.workspace = make_workspace()
+
+        # Bit-packed copy of the CRAM currently loaded in the chip
+        self.cram = np.zeros(FPGA_PACKED_BITSTREAM_SHAPE, dtype=np.uint8)
+        # Frames and evolved tiles changed by the last load_cram
+        self.dirty_frames = np.arange(FPGA_PACKED_BITSTREAM_SHAPE[0])
+        self.dirty_tiles = set(tiles)
+        self.flashed = False
+
+        self.tile_index = TileIndex.load()
+        self.tiles = {tile.info.name: tile for tile in self.chip.get_all_tiles()
+                      if tile.info.name in set(tiles)}
+        self.tile_configs = {}
+        self.fixed_config = fixed_config
+        self.bitstream_writer = BitstreamWriter(tiles, fixed_config)
+        self.bitstream_cache = bitstream_cache
+
         if config_data is not None:
             self.load_fpga(config_data)
 
     @property
     def basedir(self):
         """Returns this bitstream's directory."""
-        return join(get_config_dir(), str(self.id))
+        return self.workspace
 
     @property
     def base_file_name(self):
@@ -41,9 +76,50 @@ class FpgaConfig:
         return self.base_file_name + ".config"
 
     def load_cram(self, config_data):
-        load_cram_fast(self.chip.cram, config_data)
+        """Loads a bit-packed genome (or 2d array of CRAM bits) into the chip's CRAM
+
+        Only the frames that differ from the currently loaded CRAM are copied.
+
+        Returns:
+            The indices of the frames that changed, also kept in self.dirty_frames
+        """
+        packed = as_packed_cram(config_data)
+        dirty_frames = np.flatnonzero((packed != self.cram).any(axis=1))
+        load_cram_frames(self.chip.cram, packed, dirty_frames)
+        self.cram[dirty_frames] = packed[dirty_frames]
+
+        tile_names = self.tile_index.names[self.tile_index.tiles_in_frames(dirty_frames)]
+        self.dirty_frames = dirty_frames
+        self.dirty_tiles = self.tiles.keys() & set(tile_names.tolist())
+        return dirty_frames
+
+    def tile_config(self, name):
+        """Returns the dumped config of an evolved tile, dumping it again only if it is dirty"""
+        if name in self.dirty_tiles or name not in self.tile_configs:
+            self.tile_configs[name] = self.tiles[name].dump_config()
+        return self.tile_configs[name]
+
+    def write_bitstream(self):
+        """Writes the chip's evolved tiles on top of the fixed tiles as .bit and .svf files,
+        unless the bitstream is cached
+
+        Returns:
+            The base file name of the bitstream to flash
+        """
+        if self.bitstream_cache is not None:
+            key = self.bitstream_cache.key(self.cram)
+            cached = self.bitstream_cache.lookup(key, self.base_file_name)
+            if cached is not None:
+                return cached
+
+        self.bitstream_writer.load(self.cram)
+        bit, svf = self.bitstream_writer.write(self.base_file_name)
+        if self.bitstream_cache is not None:
+            self.bitstream_cache.store(key, bit, svf)
+        return self.base_file_name
 
     def write_config_file(self):
+        """Writes the chip's evolved tiles and the fixed tiles as a .config file, for debugging"""
         with open(self.config_file, "w") as f:
             print(".device {}".format(self.chip.info.name), file=f)
             print("", file=f)
@@ -52,37 +128,40 @@ class FpgaConfig:
             print(CHIP_COMMENT, file=f)
             print("", file=f)
 
-            from varro.fpga.tiles import SIMPLE_STEP_TILES, SIMPLE_STEP_CFG
-            for tile in self.chip.get_all_tiles():
-                if not tile.info.name in SIMPLE_STEP_TILES:
-                    continue
-                config = tile.dump_config()
+            for name in sorted(self.tiles):
+                config = self.tile_config(name)
 #                config = os.linesep.join([line for line in config.splitlines() if "unknown" not in line])
                 if len(config.strip()) > 0:
-                    print(".tile {}".format(tile.info.name), file=f)
+                    print(".tile {}".format(name), file=f)
                     print(config, file=f)
                     print("", file=f)
-            print(SIMPLE_STEP_CFG, file=f)
+            print(self.fixed_config, file=f)
 
     def load_fpga(self, config_data):
-        """Loads a 2d array of configuration data onto to the FPGA"""
-        logger.start_timer() 
+        """Loads a 2d array of configuration data onto to the FPGA
+
+        The config is only rewritten and flashed if an evolved tile changed
+        since the last load.
+        """
+        logger.start_timer()
         self.load_cram(config_data)
-        self.write_config_file()
-        flash_config_file(self.base_file_name)
+        if self.dirty_tiles or not self.flashed:
+            flash_ecp5(self.write_bitstream())
+            self.flashed = True
         logger.stop_timer('INTERFACE.PY load_fpga')
 
-    def evaluate(self, data):
-        """Evaluates given data on the FPGA."""
+    def close(self):
+        """Returns the chips of this workspace to their pools"""
+        get_chip_pool().release(self.chip)
+        self.bitstream_writer.close()
+
+    def measure(self, words):
+        """Returns the (N, NUM_CHANNELS) ADC readings of the FPGA, one port word per sample."""
+        return connect().link.evaluate_words(words)
+
+    def evaluate(self, words):
+        """Evaluates given data on the FPGA, one port word per sample."""
         logger.start_timer()
-        results = []
-        for datum in data:
-            pred = None
-            while pred is None:
-                try:
-                    pred = evaluate_arduino(datum)
-                except (UnicodeDecodeError, ValueError):
-                    pass
-            results.append(pred)    
+        results = self.measure(words).mean(axis=1) / 1024
         logger.stop_timer('INTERFACE.PY Evaluation complete')
         return results
@@ -0,0 +1,144 @@
+"""
+This module places several individuals in disjoint windows of one FPGA image
+"""
+
+import re
+import numpy as np
+
+from varro.arduino.protocol import NUM_CHANNELS
+from varro.util.variables import FPGA_BITSTREAM_SHAPE
+from varro.fpga.tile_index import TileIndex
+
+# Tile names look like CIB_R19C125:CIB_LR, a location followed by the tile type
+TILE_NAME = re.compile(r'^(?P<prefix>.*?R)(?P<row>\d+)C(?P<col>\d+)(?P<suffix>:.*)?$')
+# Largest row and column shift tried when looking for windows
+MAX_SHIFT = 128
+
+
+def relocate_tile(name, drow, dcol):
+    """Returns the name of the tile of the same type drow rows and dcol columns away"""
+    match = TILE_NAME.match(name)
+    if match is None:
+        raise ValueError('Cannot relocate tile ' + str(name))
+    return '{}{}C{}{}'.format(match.group('prefix'), int(match.group('row')) + drow,
+                              int(match.group('col')) + dcol, match.group('suffix') or '')
+
+def relocate_window(tiles, drow, dcol, tile_index):
+    """Relocates a window of tiles, or returns None if a relocated tile does not
+    exist or does not have the same CRAM shape"""
+    relocated = []
+    for name in tiles:
+        new_name = relocate_tile(name, drow, dcol)
+        if new_name not in tile_index.ids:
+            return None
+        _, _, num_frames, _, bits_per_frame = tile_index.region(name)
+        _, _, new_num_frames, _, new_bits_per_frame = tile_index.region(new_name)
+        if (num_frames, bits_per_frame) != (new_num_frames, new_bits_per_frame):
+            return None
+        relocated.append(new_name)
+    return relocated
+
+def find_offsets(tiles, k, tile_index):
+    """Finds k (drow, dcol) shifts, (0, 0) first, that move a window of tiles onto
+    disjoint windows of equivalent tiles, nearest shifts first
+
+    Raises:
+        ValueError if there are fewer than k such windows
+    """
+    used = np.zeros(FPGA_BITSTREAM_SHAPE, dtype=bool)
+
+    def regions(names):
+        return [tile_index.region(name)[1:] for name in names]
+
+    def overlaps(names):
+        return any(used[f:f + nf, b:b + nb].any() for f, nf, b, nb in regions(names))
+
+    offsets = []
+    shifts = sorted(((drow, dcol) for drow in range(-MAX_SHIFT, MAX_SHIFT + 1)
+                     for dcol in range(-MAX_SHIFT, MAX_SHIFT + 1)),
+                    key=lambda shift: (abs(shift[0]) + abs(shift[1]), shift))
+    for drow, dcol in shifts:
+        window = relocate_window(tiles, drow, dcol, tile_index)
+        if window is None or overlaps(window):
+            continue
+        offsets.append((drow, dcol))
+        for f, nf, b, nb in regions(window):
+            used[f:f + nf, b:b + nb] = True
+        if len(offsets) == k:
+            return offsets
+    raise ValueError('Only {} of {} disjoint windows found for tiles {}'.format(len(offsets), k, tiles))
+
+def relocate_config(config, tiles, drow, dcol):
+    """Returns the .tile sections of a config for the given tiles, relocated"""
+    sections = re.split(r'\n(?=\.tile )', config)
+    relocated = []
+    for section in sections:
+        header, _, body = section.strip().partition('\n')
+        if header.startswith('.tile ') and header[len('.tile '):].strip() in tiles:
+            name = header[len('.tile '):].strip()
+            relocated.append('.tile {}\n{}'.format(relocate_tile(name, drow, dcol), body))
+    return '\n\n'.join(relocated)
+
+def demux_readings(readings, k):
+    """Splits the (N, NUM_CHANNELS) ADC readings of a multiplexed image into the
+    predictions of its k windows, each the mean of its own group of channels scaled to [0, 1)"""
+    readings = np.asarray(readings)
+    groups = np.array_split(np.arange(readings.shape[1]), k)
+    return [readings[:, group].mean(axis=1) / 1024 for group in groups]
+
+
+class MultiplexLayout:
+    def __init__(self, genome_layout, k, io_tiles=(), fixed_config='', tile_index=None):
+        """Places the evolved tiles of k genomes in k disjoint windows of one chip image
+
+        Window 0 is where the genome layout's tiles are, the others are the same
+        tiles shifted by whole rows and columns. The I/O tiles of the fixed
+        config are shifted along with their window, so every window drives its
+        own pins, and window w is read on the w-th group of analog channels.
+
+        Args:
+            genome_layout (GenomeLayout): Layout of a genome restricted to tiles
+            k (int): Number of windows, at most NUM_CHANNELS so every window has a channel
+            io_tiles (list of str): Tiles of fixed_config that wire a window to its pins
+            fixed_config (str): Config of the fixed tiles, in the .config format
+            tile_index (TileIndex): Index of the chip's tiles, loaded if None
+
+        """
+        if genome_layout.tiles is None:
+            raise ValueError('Multiplexing needs a genome layout restricted to tiles')
+        if k > NUM_CHANNELS:
+            raise ValueError('{} windows cannot be read on {} analog channels'.format(k, NUM_CHANNELS))
+        if tile_index is None:
+            tile_index = TileIndex.load()
+
+        self.genome_layout = genome_layout
+        self.k = k
+        window = list(genome_layout.tiles) + list(io_tiles)
+        self.offsets = find_offsets(window, k, tile_index)
+        self.windows = [relocate_window(genome_layout.tiles, drow, dcol, tile_index)
+                        for drow, dcol in self.offsets]
+        self.tiles = [name for window_tiles in self.windows for name in window_tiles]
+        self.fixed_config = '\n\n'.join([fixed_config] + [relocate_config(fixed_config, io_tiles, drow, dcol)
+                                                          for drow, dcol in self.offsets[1:]])
+
+        # Flat CRAM index of every genome bit, in every window
+        bounds = genome_layout.tile_bounds
+        self.cram_idx = []
+        for window_tiles in self.windows:
+            shift = np.empty(genome_layout.num_bits, dtype=np.int64)
+            for tile, (name, new_name) in enumerate(zip(genome_layout.tiles, window_tiles)):
+                _, frame_offset, _, bit_offset, _ = tile_index.region(name)
+                _, new_frame_offset, _, new_bit_offset, _ = tile_index.region(new_name)
+                shift[bounds[tile]:bounds[tile + 1]] = (new_frame_offset - frame_offset) * FPGA_BITSTREAM_SHAPE[1] \
+                    + new_bit_offset - bit_offset
+            self.cram_idx.append(genome_layout.cram_idx + shift)
+
+    def compose(self, genomes):
+        """Scatters up to k bit-packed genomes into the windows of one 2d array of CRAM bits"""
+        if len(genomes) > self.k:
+            raise ValueError('{} genomes do not fit in {} windows'.format(len(genomes), self.k))
+        cram_bits = self.genome_layout.template.copy()
+        for cram_idx, genome in zip(self.cram_idx, genomes):
+            cram_bits.reshape(-1)[cram_idx] = np.unpackbits(np.asarray(genome, dtype=np.uint8),
+                                                             count=self.genome_layout.num_bits).view(bool)
+        return cram_bits
@@ -0,0 +1,204 @@
+"""
+This module keeps a persistent openocd session for programming the FPGA over JTAG
+"""
+
+import os
+import time
+import socket
+import subprocess
+import threading
+
+from varro.fpga.flash import CFG_FILE
+
+# Commands and responses on the openocd TCL port are terminated by this byte
+TCL_TERMINATOR = b'\x1a'
+TCL_PORT = 6666
+
+
+class OpenocdSession:
+    def __init__(self, cfg_file=CFG_FILE, host='localhost', port=TCL_PORT, start_server=True,
+                 connect_timeout=10.0, command_timeout=None, commands=()):
+        """A long-lived openocd server, driven over its TCL command port
+
+        Initializing JTAG and reading the board config happen once, when the
+        server starts, instead of once per flashed bitstream. If the connection
+        drops, the session reconnects (restarting the server if it died) and
+        retries the command once. A command that times out is not retried, as
+        openocd may still be running it.
+
+        Args:
+            cfg_file (str): openocd config file of the board
+            host (str): Host of the openocd TCL port
+            port (int): openocd TCL port
+            start_server (bool): Whether to start openocd, or connect to a running server
+            connect_timeout (float): Seconds to wait for the TCL port to accept connections
+            command_timeout (float): Seconds to wait for the response to a command,
+                forever if None, as playing an SVF file takes a while
+            commands (list of str): openocd commands to run before init, e.g. to
+                select one of several JTAG adapters
+
+        """
+        self.cfg_file = os.path.expanduser(cfg_file)
+        self.host = host
+        self.port = port
+        self.start_server = start_server
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.commands = list(commands)
+        self.process = None
+        self.sock = None
+        self.reconnects = 0
+
+    def start(self):
+        """Starts the openocd server if it is not running"""
+        if not self.start_server or (self.process is not None and self.process.poll() is None):
+            return
+        commands = ["tcl_port {}".format(self.port),
+                    "telnet_port disabled",
+                    "gdb_port disabled"] + self.commands + ["transport select jtag", "init"]
+        args = ["openocd", "-f", self.cfg_file]
+        for command in commands:
+            args += ["-c", command]
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def connect(self):
+        """Connects to the TCL port, starting the server first if needed"""
+        self.start()
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                self.sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+                self.sock.settimeout(self.command_timeout)
+                return
+            except OSError:
+                if self.process is not None and self.process.poll() is not None:
+                    raise RuntimeError("openocd exited with code {}".format(self.process.returncode))
+                if time.time() > deadline:
+                    raise RuntimeError("Cannot connect to openocd on {}:{}".format(self.host, self.port))
+                time.sleep(0.05)
+
+    def disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def send(self, command):
+        """Sends a command and returns openocd's response"""
+        if self.sock is None:
+            self.connect()
+        self.sock.sendall(command.encode() + TCL_TERMINATOR)
+        response = b''
+        while not response.endswith(TCL_TERMINATOR):
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("openocd closed the connection")
+            response += chunk
+        return response[:-len(TCL_TERMINATOR)].decode()
+
+    def command(self, command):
+        """Sends a command, reconnecting and retrying once if the connection dropped"""
+        try:
+            return self.send(command)
+        except socket.timeout:
+            # The response would arrive on the next command, so drop the connection
+            self.disconnect()
+            raise
+        except OSError:
+            self.disconnect()
+            self.reconnects += 1
+            return self.send(command)
+
+    def flash(self, svf_file):
+        """Plays an SVF file, e.g. one that loads a bitstream into the FPGA's SRAM"""
+        err = self.command("catch {{svf {} quiet}}".format(os.path.abspath(svf_file)))
+        if err.strip() != "0":
+            raise RuntimeError("Cannot flash ECP5")
+
+    def close(self):
+        """Disconnects, and shuts down the server if this session started it"""
+        if self.sock is not None and self.process is not None:
+            try:
+                self.send("shutdown")
+            except OSError:
+                pass
+        self.disconnect()
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=self.connect_timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+class FakeOpenocdServer:
+    def __init__(self, host='localhost', port=0, flash_time=0.0):
+        """A local stand-in for the openocd TCL port, for testing without a board
+
+        Every command is recorded in self.commands. Flashing (`svf`) succeeds
+        after flash_time seconds if the SVF file exists.
+
+        Args:
+            host (str): Host to listen on
+            port (int): Port to listen on, any free port if 0
+            flash_time (float): Seconds each svf command takes
+
+        """
+        self.flash_time = flash_time
+        self.commands = []
+        self.connections = []
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.host, self.port = self.server.getsockname()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections.append(conn)
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        buffer = b''
+        while True:
+            try:
+                chunk = conn.recv(4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+            while TCL_TERMINATOR in buffer:
+                command, buffer = buffer.split(TCL_TERMINATOR, 1)
+                response = self.respond(command.decode())
+                try:
+                    conn.sendall(response.encode() + TCL_TERMINATOR)
+                except OSError:
+                    return
+
+    def respond(self, command):
+        self.commands.append(command)
+        if command.startswith("catch {svf "):
+            time.sleep(self.flash_time)
+            svf_file = command[len("catch {svf "):].rsplit(" ", 1)[0]
+            return "0" if os.path.isfile(svf_file) else "1"
+        return ""
+
+    def drop_connections(self):
+        """Closes every open connection, like an openocd restart would"""
+        for conn in self.connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+        self.connections = []
+
+    def close(self):
+        self.drop_connections()
+        self.server.close()
@@ -0,0 +1,91 @@
+"""
+This module overlaps building bitstreams with flashing and measuring the FPGA
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from dowel import logger
+
+
+class EvaluationPipeline:
+    def __init__(self, build, flash, measure, lookahead=2):
+        """Evaluates individuals in three stages: build, flash and measure
+
+        While one individual is flashed and measured on the board, a pool of
+        threads builds the bitstreams of the next `lookahead` individuals.
+        Flashing and measuring happen in the calling thread, one individual at
+        a time and in order, so results are the same as evaluating sequentially.
+
+        Args:
+            build (callable): build(item, slot) returns the artifact to flash. Slots
+                range over [0, lookahead], and a slot is never used by two
+                builds that could be in flight at the same time
+            flash (callable): flash(artifact) loads an artifact on the board
+            measure (callable): measure(item) returns the result of an item once
+                it is flashed
+            lookahead (int): Maximum number of builds in flight
+
+        """
+        self.build = build
+        self.flash = flash
+        self.measure = measure
+        self.lookahead = lookahead
+        self.num_slots = lookahead + 1
+        self.executor = ThreadPoolExecutor(max_workers=lookahead)
+        self.lock = threading.Lock()
+        self.stage_times = {'build': 0.0, 'wait': 0.0, 'flash': 0.0, 'measure': 0.0}
+
+    def add_time(self, stage, start_time):
+        with self.lock:
+            self.stage_times[stage] += time.perf_counter() - start_time
+
+    def timed_build(self, item, slot):
+        start_time = time.perf_counter()
+        artifact = self.build(item, slot)
+        self.add_time('build', start_time)
+        return artifact
+
+    def run(self, items):
+        """Evaluates items and returns their results, in order"""
+        items = list(items)
+        results = []
+        pending = deque()
+        next_idx = 0
+        try:
+            for _ in range(len(items)):
+                # Keep the build queue full
+                while next_idx < len(items) and len(pending) < self.lookahead:
+                    pending.append(self.executor.submit(self.timed_build, items[next_idx],
+                                                        next_idx % self.num_slots))
+                    next_idx += 1
+
+                start_time = time.perf_counter()
+                artifact = pending.popleft().result()
+                self.add_time('wait', start_time)
+
+                start_time = time.perf_counter()
+                self.flash(artifact)
+                self.add_time('flash', start_time)
+
+                start_time = time.perf_counter()
+                results.append(self.measure(items[len(results)]))
+                self.add_time('measure', start_time)
+        finally:
+            for future in pending:
+                future.cancel()
+            # Builds that already started cannot be cancelled, and must not write
+            # their slot once the next run reuses it
+            wait(pending)
+        return results
+
+    def log_times(self):
+        """Logs the time spent in each stage since the last call, and resets them"""
+        with self.lock:
+            logger.log('PIPELINE.PY ' + ' | '.join('{}: {:.3f}s'.format(stage, seconds)
+                                                   for stage, seconds in self.stage_times.items()))
+            self.stage_times = {stage: 0.0 for stage in self.stage_times}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
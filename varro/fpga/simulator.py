@@ -0,0 +1,290 @@
+"""
+This module simulates the evolved region of the FPGA in software, so genomes
+can be evaluated without a board, openocd or an Arduino
+"""
+
+import re
+import numpy as np
+
+from varro.arduino.protocol import NUM_PORTS, NUM_CHANNELS
+from varro.util.variables import FPGA_PACKED_BITSTREAM_SHAPE
+from varro.fpga.genome import as_packed_cram
+from varro.fpga.multiplex import TILE_NAME
+from varro.fpga.tile_index import TileIndex
+from varro.fpga.tiles import SIMPLE_STEP_TILES, SIMPLE_STEP_CFG
+
+# Tile-relative wire names may start with the offset of the tile they belong
+# to, e.g. N1_V02S0701 is V02S0701 of the tile one row up
+WIRE_OFFSET = re.compile(r'^(?:(?P<ns>[NS])(?P<drow>\d+))?(?:(?P<ew>[EW])(?P<dcol>\d+))?_(?P<wire>.+)$')
+# LUT words look like SLICEB.K1.INIT, the second LUT of the second slice
+LUT_WORD = re.compile(r'^SLICE(?P<slice>[A-D])\.K(?P<lut>[01])\.INIT$')
+# PIO enums look like PIOD.BASE_TYPE INPUT_LVCMOS33
+PIO_BASE_TYPE = re.compile(r'^PIO(?P<pio>[A-D])\.BASE_TYPE$')
+# Wires between a PIO and the fabric, as named in the prjtrellis database
+PIO_INPUT_WIRE = 'JPADDI{}_PIO'
+PIO_OUTPUT_WIRE = 'JPADDO{}_PIO'
+# Largest ADC reading, given for an output that is high
+MAX_READING = 1023
+
+
+def tile_location(name):
+    """Returns the (row, col) of a tile, e.g. (19, 125) for CIB_R19C125:CIB_LR"""
+    match = TILE_NAME.match(name)
+    if match is None:
+        raise ValueError('Cannot locate tile ' + str(name))
+    return int(match.group('row')), int(match.group('col'))
+
+def normalize_wire(row, col, wire):
+    """Returns the chip-wide name of a wire of the tile at (row, col),
+    e.g. R18C125_V02S0701 for N1_V02S0701 of R19C125. Global wires keep their name."""
+    if wire.startswith('G_'):
+        return wire
+    match = WIRE_OFFSET.match(wire)
+    if match is not None:
+        if match.group('drow'):
+            row += int(match.group('drow')) * (-1 if match.group('ns') == 'N' else 1)
+        if match.group('dcol'):
+            col += int(match.group('dcol')) * (-1 if match.group('ew') == 'W' else 1)
+        wire = match.group('wire')
+    return 'R{}C{}_{}'.format(row, col, wire)
+
+def parse_word(bits):
+    """Returns the bits of a dumped word, which is printed most significant bit first"""
+    return np.array([bit == '1' for bit in reversed(bits)], dtype=bool)
+
+def parse_config(config):
+    """Parses the .tile sections of a config in the .config format
+
+    Returns:
+        dict of tile name to dict of 'arcs' ((sink, source) pairs), 'words'
+        (name to bool array), 'enums' (name to value) and 'unknown' (raw bits)
+    """
+    tiles = {}
+    settings = None
+    for line in config.splitlines():
+        line = line.strip()
+        if line.startswith('.tile '):
+            settings = tiles.setdefault(line[len('.tile '):].strip(),
+                                        {'arcs': [], 'words': {}, 'enums': {}, 'unknown': []})
+            continue
+        if settings is None or ':' not in line or line.startswith('#'):
+            continue
+        kind, _, value = line.partition(':')
+        fields = value.split()
+        if kind == 'arc':
+            settings['arcs'].append((fields[0], fields[1]))
+        elif kind == 'word':
+            settings['words'][fields[0]] = parse_word(fields[1])
+        elif kind == 'enum':
+            settings['enums'][fields[0]] = fields[1]
+        elif kind == 'unknown':
+            settings['unknown'].append(fields[0])
+    return tiles
+
+def io_wires(tiles):
+    """Returns the (input wires, output wires) of the PIOs configured in parsed tiles,
+    in the order of the tiles and PIOs"""
+    inputs, outputs = [], []
+    for name, settings in tiles.items():
+        row, col = tile_location(name)
+        for enum, value in sorted(settings['enums'].items()):
+            match = PIO_BASE_TYPE.match(enum)
+            if match is None:
+                continue
+            if value.startswith('INPUT'):
+                inputs.append(normalize_wire(row, col, PIO_INPUT_WIRE.format(match.group('pio'))))
+            elif value.startswith('OUTPUT'):
+                outputs.append(normalize_wire(row, col, PIO_OUTPUT_WIRE.format(match.group('pio'))))
+    return inputs, outputs
+
+
+class Netlist:
+    def __init__(self, drivers, luts, inputs, outputs):
+        """Combinational netlist of LUT4s and routing, evaluated on bit planes
+
+        Every wire holds a bit plane: bit j of a plane is the value of the wire
+        for sample j, so one bitwise NumPy operation evaluates 64 samples per
+        word. Undriven wires are low, a wire driven by several arcs is their OR,
+        flip-flops are transparent (Q follows F) and a wire on a combinational
+        loop reads low where the loop closes.
+
+        Args:
+            drivers (dict): Wire to list of the wires driving it
+            luts (dict): Output wire to (list of 4 input wires, 16 INIT bits)
+            inputs (list of str): Wires driven by bit i of the input words
+            outputs (list of str): Wires read as outputs
+
+        """
+        self.drivers = drivers
+        self.luts = luts
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+    @classmethod
+    def from_config(cls, tiles, inputs=None, outputs=None):
+        """Builds the netlist of parsed tiles (see parse_config)
+
+        Args:
+            tiles (dict): Parsed tiles
+            inputs (list of str): Input wires, those of the configured PIOs if None
+            outputs (list of str): Output wires, those of the configured PIOs if None
+
+        """
+        pio_inputs, pio_outputs = io_wires(tiles)
+        drivers = {}
+        luts = {}
+        for name, settings in tiles.items():
+            row, col = tile_location(name)
+            for sink, source in settings['arcs']:
+                drivers.setdefault(normalize_wire(row, col, sink), []).append(normalize_wire(row, col, source))
+            for word, init in settings['words'].items():
+                match = LUT_WORD.match(word)
+                if match is None:
+                    continue
+                lut = 2 * 'ABCD'.index(match.group('slice')) + int(match.group('lut'))
+                output = normalize_wire(row, col, 'F{}'.format(lut))
+                luts[output] = ([normalize_wire(row, col, '{}{}'.format(pin, lut)) for pin in 'ABCD'], init)
+                drivers.setdefault(normalize_wire(row, col, 'Q{}'.format(lut)), []).append(output)
+        return cls(drivers, luts,
+                   pio_inputs if inputs is None else inputs,
+                   pio_outputs if outputs is None else outputs)
+
+    def evaluate(self, bits):
+        """Evaluates the netlist
+
+        Args:
+            bits (np.ndarray of bools): (N, len(inputs)) values of the input wires
+
+        Returns:
+            (N, len(outputs)) np.ndarray of bools, the values of the output wires
+        """
+        bits = np.asarray(bits, dtype=bool).reshape(-1, len(self.inputs))
+        n = len(bits)
+        # Pad the samples to whole 64 bit words of the planes
+        padded = np.zeros((-(-n // 64) * 64, len(self.inputs)), dtype=bool)
+        padded[:n] = bits
+        planes = np.packbits(padded, axis=0).T.copy().view(np.uint64)
+        zeros = np.zeros(planes.shape[1], dtype=np.uint64)
+        ones = ~zeros
+
+        values = dict(zip(self.inputs, planes))
+        # Wires being evaluated, a wire met again is on a loop and reads low
+        pending = set()
+        for output in self.outputs:
+            stack = [output]
+            while stack:
+                wire = stack[-1]
+                if wire in values:
+                    stack.pop()
+                    continue
+                if wire in self.luts:
+                    fanin = self.luts[wire][0]
+                else:
+                    fanin = self.drivers.get(wire, [])
+                todo = [source for source in fanin if source not in values and source not in pending]
+                if wire not in pending and todo:
+                    pending.add(wire)
+                    stack += todo
+                    continue
+                pending.discard(wire)
+                stack.pop()
+                if wire in self.luts:
+                    values[wire] = self.lut(self.luts[wire][1],
+                                            [values.get(source, zeros) for source in fanin], zeros, ones)
+                else:
+                    value = zeros
+                    for source in fanin:
+                        value = value | values.get(source, zeros)
+                    values[wire] = value
+
+        if not self.outputs:
+            return np.zeros((n, 0), dtype=bool)
+        result = np.stack([values[output] for output in self.outputs])
+        return np.unpackbits(result.view(np.uint8), axis=1).T[:n].astype(bool)
+
+    @staticmethod
+    def lut(init, planes, zeros, ones):
+        """Evaluates a LUT4 on bit planes as a tree of multiplexers, input A first"""
+        values = [ones if bit else zeros for bit in init]
+        for plane in planes:
+            values = [(low & ~plane) | (high & plane) for low, high in zip(values[0::2], values[1::2])]
+        return values[0]
+
+    def evaluate_words(self, words):
+        """Evaluates the netlist on port words, input i being driven by bit i of the word"""
+        words = np.asarray(words, dtype=np.int64).reshape(-1)
+        return self.evaluate((words[:, None] >> np.arange(len(self.inputs))) & 1)
+
+
+class FpgaSimulator:
+    def __init__(self, tiles=SIMPLE_STEP_TILES, fixed_config=SIMPLE_STEP_CFG, inputs=None, outputs=None,
+                 channels=None):
+        """Stands in for an FpgaConfig, evaluating the evolved tiles in software
+
+        The CRAM is loaded into a pytrellis chip, whose evolved tiles are
+        decoded by the prjtrellis database into arcs, LUT words and enums.
+        Together with the fixed config they make the netlist that is evaluated.
+        Like the Arduino, the simulator reads NUM_CHANNELS ADC channels, each
+        wired to one of the outputs, so evaluations are on the same scale.
+
+        Args:
+            tiles (list of str): Names of the evolved tiles
+            fixed_config (str): Config of the fixed tiles, in the .config format
+            inputs (list of str): Input wires, those of the PIOs of the config if None
+            outputs (list of str): Output wires, those of the PIOs of the config if None
+            channels (list of int): Index of the output read by every ADC channel,
+                channel c reads output c modulo the number of outputs if None
+        """
+        from varro.fpga.chip import get_chip_pool
+        self.chip = get_chip_pool().acquire()
+        self.cram = np.zeros(FPGA_PACKED_BITSTREAM_SHAPE, dtype=np.uint8)
+        self.dirty_tiles = set(tiles)
+        self.tile_index = TileIndex.load()
+        self.tiles = {tile.info.name: tile for tile in self.chip.get_all_tiles()
+                      if tile.info.name in set(tiles)}
+        self.tile_configs = {}
+        self.fixed_tiles = parse_config(fixed_config)
+        self.inputs = inputs
+        self.outputs = outputs
+        self.channels = channels
+        self.netlist = None
+
+    def load_fpga(self, config_data):
+        """Loads a bit-packed genome (or 2d array of CRAM bits) and rebuilds the netlist
+        of the evolved tiles that changed"""
+        from varro.cython.fast_cram import load_cram_frames
+        packed = as_packed_cram(config_data)
+        dirty_frames = np.flatnonzero((packed != self.cram).any(axis=1))
+        load_cram_frames(self.chip.cram, packed, dirty_frames)
+        self.cram[dirty_frames] = packed[dirty_frames]
+        tile_names = self.tile_index.names[self.tile_index.tiles_in_frames(dirty_frames)]
+        self.dirty_tiles |= self.tiles.keys() & set(tile_names.tolist())
+
+        if self.dirty_tiles or self.netlist is None:
+            for name in self.dirty_tiles:
+                self.tile_configs[name] = parse_config('.tile {}\n{}'.format(name, self.tiles[name].dump_config()))[name]
+            self.dirty_tiles = set()
+            self.netlist = Netlist.from_config(dict(self.fixed_tiles, **self.tile_configs),
+                                               self.inputs, self.outputs)
+
+    def close(self):
+        """Returns the chip to its pool"""
+        from varro.fpga.chip import get_chip_pool
+        if self.chip is not None:
+            get_chip_pool().release(self.chip)
+            self.chip = None
+
+    def measure(self, words):
+        """Returns the (N, NUM_CHANNELS) simulated ADC readings, one port word per sample."""
+        words = np.asarray(words) & (2 ** NUM_PORTS - 1)
+        outputs = self.netlist.evaluate_words(words).astype(np.int64) * MAX_READING
+        if outputs.shape[1] == 0:
+            return np.zeros((len(outputs), NUM_CHANNELS), dtype=np.int64)
+        channels = self.channels
+        if channels is None:
+            channels = np.arange(NUM_CHANNELS) % outputs.shape[1]
+        return outputs[:, channels]
+
+    def evaluate(self, words):
+        """Evaluates given data on the simulated FPGA, one port word per sample."""
+        return self.measure(words).mean(axis=1) / 1024
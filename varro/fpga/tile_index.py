@@ -0,0 +1,118 @@
+"""
+This module contains the index of which CRAM frames and bits belong to which tile
+"""
+
+import os
+import json
+import numpy as np
+
+from varro.util.util import make_path
+from varro.util.variables import PRJTRELLIS_DATABASE, CHIP_NAME, FPGA_CACHE_DIR
+
+
+class TileIndex:
+    def __init__(self, names, types, frame_offset, num_frames, bit_offset, bits_per_frame):
+        """Index of the CRAM rectangle of every tile of a chip
+
+        Tile i occupies frames [frame_offset[i], frame_offset[i] + num_frames[i])
+        and bits [bit_offset[i], bit_offset[i] + bits_per_frame[i]) of each of
+        those frames. Tiles are sorted by name, like pytrellis' get_all_tiles().
+        """
+        self.names = np.asarray(names)
+        self.types = np.asarray(types)
+        self.frame_offset = np.asarray(frame_offset, dtype=np.int32)
+        self.num_frames = np.asarray(num_frames, dtype=np.int32)
+        self.bit_offset = np.asarray(bit_offset, dtype=np.int32)
+        self.bits_per_frame = np.asarray(bits_per_frame, dtype=np.int32)
+        self.ids = {name: idx for idx, name in enumerate(self.names.tolist())}
+
+    @classmethod
+    def from_database(cls, database=PRJTRELLIS_DATABASE, chip_name=CHIP_NAME):
+        """Builds the index from the tilegrid of a chip in the prjtrellis database"""
+        with open(tilegrid_path(database, chip_name)) as f:
+            tilegrid = json.load(f)
+
+        names = sorted(tilegrid)
+        return cls(names=names,
+                   types=[tilegrid[name]["type"] for name in names],
+                   frame_offset=[tilegrid[name]["start_frame"] for name in names],
+                   num_frames=[tilegrid[name]["cols"] for name in names],
+                   bit_offset=[tilegrid[name]["start_bit"] for name in names],
+                   bits_per_frame=[tilegrid[name]["rows"] for name in names])
+
+    @classmethod
+    def load(cls, database=PRJTRELLIS_DATABASE, chip_name=CHIP_NAME, cache_dir=FPGA_CACHE_DIR):
+        """Loads the index from the on-disk cache, building the cache from
+        the prjtrellis database if it is missing or older than the database
+        """
+        cache_file = os.path.join(cache_dir, 'tile_index_{}.npz'.format(chip_name))
+        try:
+            source_mtime = os.path.getmtime(tilegrid_path(database, chip_name))
+        except (OSError, ValueError):
+            # Without the database the cache is all we have
+            source_mtime = None
+
+        if os.path.isfile(cache_file) and \
+                (source_mtime is None or os.path.getmtime(cache_file) >= source_mtime):
+            with np.load(cache_file) as cache:
+                return cls(**{key: cache[key] for key in cache.files})
+
+        index = cls.from_database(database, chip_name)
+        index.save(cache_file)
+        return index
+
+    def save(self, cache_file):
+        """Saves the index as a compressed .npz file"""
+        make_path(os.path.dirname(cache_file))
+        np.savez_compressed(cache_file,
+                            names=self.names,
+                            types=self.types,
+                            frame_offset=self.frame_offset,
+                            num_frames=self.num_frames,
+                            bit_offset=self.bit_offset,
+                            bits_per_frame=self.bits_per_frame)
+
+    def __len__(self):
+        return len(self.names)
+
+    def region(self, name):
+        """Returns (name, frame_offset, num_frames, bit_offset, bits_per_frame) of a tile"""
+        idx = self.ids[name]
+        return (name, int(self.frame_offset[idx]), int(self.num_frames[idx]),
+                int(self.bit_offset[idx]), int(self.bits_per_frame[idx]))
+
+    def regions(self, names=None):
+        """Returns the regions of the given tiles, or of every tile if names is None"""
+        if names is None:
+            names = self.names.tolist()
+        return [self.region(name) for name in names]
+
+    def tile_type(self, name):
+        """Returns the type of a tile, e.g. 'CIB_LR'"""
+        return str(self.types[self.ids[name]])
+
+    def tiles_of_type(self, tile_type):
+        """Returns the names of all tiles of a type"""
+        return self.names[self.types == tile_type].tolist()
+
+    def tiles_at(self, frame, bit):
+        """Returns the names of the tiles that contain a CRAM bit"""
+        hit = (self.frame_offset <= frame) & (frame < self.frame_offset + self.num_frames) & \
+              (self.bit_offset <= bit) & (bit < self.bit_offset + self.bits_per_frame)
+        return self.names[hit].tolist()
+
+    def tiles_in_frames(self, frames):
+        """Returns the indices of the tiles that overlap any of the given CRAM frames"""
+        frames = np.unique(frames)
+        first = np.searchsorted(frames, self.frame_offset)
+        last = np.searchsorted(frames, self.frame_offset + self.num_frames)
+        return np.flatnonzero(last > first)
+
+def tilegrid_path(database, chip_name):
+    """Returns the path of a chip's tilegrid.json in the prjtrellis database"""
+    with open(os.path.join(database, 'devices.json')) as f:
+        families = json.load(f)['families']
+    for family, family_info in families.items():
+        if chip_name in family_info['devices']:
+            return os.path.join(database, family, chip_name, 'tilegrid.json')
+    raise ValueError('Chip ' + str(chip_name) + ' not found in ' + str(database))
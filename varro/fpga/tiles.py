@@ -36,6 +36,36 @@ SIMPLE_STEP_TILES = [
     'CIB_R94C82:CIB_DCU1',
 ]
 
+# The routing tiles of SIMPLE_STEP_TILES, which have equivalents in other rows
+SIMPLE_STEP_LR_TILES = [
+    'CIB_R19C125:CIB_LR',
+    'CIB_R25C125:CIB_LR',
+    'CIB_R31C125:CIB_LR',
+    'CIB_R37C125:CIB_LR',
+    'CIB_R38C125:CIB_LR',
+]
+
+# Named sets of tiles that FPGA genomes can be restricted to
+TILE_SETS = {
+    'simple_step': SIMPLE_STEP_TILES,
+    'simple_step_lr': SIMPLE_STEP_LR_TILES,
+}
+
+# The I/O tiles of SIMPLE_STEP_CFG that wire the evolved tiles to their pins
+SIMPLE_STEP_IO_TILES = [
+    'MIB_R18C126:PICR1_DQS3',
+    'MIB_R19C126:PICR2',
+    'MIB_R38C126:PICR0',
+    'MIB_R39C126:PICR1_DQS0',
+]
+
+# I/O tiles of each set of tiles, moved along with them when several
+# individuals are placed on one chip (see varro.fpga.multiplex)
+TILE_SET_IO_TILES = {
+    'simple_step': SIMPLE_STEP_IO_TILES,
+    'simple_step_lr': SIMPLE_STEP_IO_TILES,
+}
+
 SIMPLE_STEP_OTHER_TILES = [
     'CIB_R10C3:PVT_COUNT2',
     'MIB_R10C126:BANKREF2',
@@ -79,8 +79,9 @@ def get_args():
                         nargs='?',
                         metavar='MODEL-TO-OPTIMIZE',
                         action='store',
-                        choices=['fpga', 'nn'],
-                        help='The target platform that the parameters are evaluated on')
+                        choices=['fpga', 'fpga_sim', 'nn'],
+                        help='The target platform that the parameters are evaluated on, fpga_sim '
+                             'simulates the evolved FPGA tiles in software')
 
     ######################################################
     # 7. What problem are we trying to solve / optimize? #
@@ -283,6 +284,65 @@ def get_args():
                         help='Determine whether timing messages are logged',
                         type=bool)
 
+    ######################################################################################
+    # 23. Which tiles of the FPGA are evolved (the whole CRAM if not given)
+    ######################################################################################
+    parser.add_argument('--fpga_tiles',
+                        default=None,
+                        const=None,
+                        nargs='?',
+                        metavar='FPGA-TILES',
+                        action='store',
+                        choices=[None, 'simple_step', 'simple_step_lr'],
+                        help='The set of FPGA tiles whose configuration bits are evolved')
+
+    ######################################################################################
+    # 24. Farm of FPGA boards to evaluate on (a single board if not given)
+    ######################################################################################
+    parser.add_argument('--fpga_boards',
+                        default=None,
+                        const=None,
+                        nargs='?',
+                        metavar='FPGA-BOARDS',
+                        action='store',
+                        help='JSON registry of the FPGA boards to evaluate on in parallel, or sim:N for N simulated boards')
+
+    ######################################################################################
+    # 25. Number of individuals placed on one FPGA image
+    ######################################################################################
+    parser.add_argument('--fpga_multiplex',
+                        default=1,
+                        const=1,
+                        nargs='?',
+                        metavar='FPGA-MULTIPLEX',
+                        action='store',
+                        type=int,
+                        help='Number of individuals evaluated at once in disjoint windows of one FPGA image, at most 6 (needs --fpga_tiles, not with --fpga_boards)')
+
+    ######################################################################################
+    # 26. Backend that evaluates neural networks
+    ######################################################################################
+    parser.add_argument('--nn_backend',
+                        default='keras',
+                        const='keras',
+                        nargs='?',
+                        metavar='NN-BACKEND',
+                        action='store',
+                        choices=['keras', 'numpy'],
+                        help='Evaluate neural networks with Keras one individual at a time, or with NumPy only, which never imports TensorFlow and evaluates whole populations at once')
+
+    ######################################################################################
+    # 27. Number of worker processes that calculate fitness
+    ######################################################################################
+    parser.add_argument('--workers',
+                        default=1,
+                        const=1,
+                        nargs='?',
+                        metavar='WORKERS',
+                        action='store',
+                        type=int,
+                        help='Number of worker processes that calculate the fitness of neural networks in parallel')
+
     settings = parser.parse_args()
 
     # If we are predicting, we need to specify a
@@ -36,12 +36,12 @@ def get_problem_range(problem):
         raise ValueError('Problem \'' + str(problem) + '\' not recognised')
 
 def get_tb_fig(problem, y_pred):
-    # Returns tf image object for a given problem.__name__ and np array of predictions
+    # Returns a (1, height, width, 4) uint8 image, as tf.summary.image takes it,
+    # for a given problem.__name__ and np array of predictions
     import matplotlib.pyplot as plt
     import io
     import matplotlib.lines as mlines
     import numpy as np
-    import tensorflow as tf
 
     range_min = np.min(get_problem_range(problem))
     range_max = np.max(get_problem_range(problem))
@@ -81,8 +81,7 @@ def get_tb_fig(problem, y_pred):
     # the notebook.
     plt.close(figure)
     buf.seek(0)
-    # Convert PNG buffer to TF image
-    image = tf.image.decode_png(buf.getvalue(), channels=4, dtype=tf.uint8)
+    # Convert PNG buffer to an image, without importing TensorFlow
+    image = (plt.imread(buf, format='png') * 255).round().astype(np.uint8)
     # Add the batch dimension
-    image = tf.expand_dims(image, 0)
-    return image
+    return image[None]
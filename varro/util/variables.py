@@ -24,6 +24,10 @@ ABS_ALGO_TENSORBOARD_PATH = os.path.join(ROOT_DIR, 'logs/varro/algo/tensorboard'
 # of population in each generation of experiment
 EXPERIMENT_CHECKPOINTS_PATH = os.path.join(ROOT_DIR, 'checkpoints/varro/algo')
 
+# MNIST, as the npz file keras.datasets.mnist downloads
+MNIST_URL = 'https://storage.googleapis.com/tensorflow/tf-keras-datasets/mnist.npz'
+MNIST_DATA_PATH = os.path.join(ROOT_DIR, 'data/mnist/mnist.npz')
+
 DATE_NAME_FORMAT = "%Y-%b-%d-%H:%M:%S"
 
 # Grid Search
@@ -37,10 +41,28 @@ GRID_SEARCH_CONFIG_PATH = os.path.join(ROOT_DIR, 'tests/varro/algo/grid_search')
 
 # Interface
 FPGA_BITSTREAM_SHAPE = (13294, 1136)
+# Genomes store 8 CRAM bits per byte, each frame packed into its own 142 bytes
+FPGA_PACKED_BITSTREAM_SHAPE = (13294, 142)
 PRJTRELLIS_DATABASE = "../prjtrellis-db"
 CHIP_NAME = "LFE5UM5G-85F"
 CHIP_COMMENT = ".comment Part: LFE5UM5G-85F-8CABGA381"
 ARDUINO_PORT = "/dev/ttyACM0"
+# Baud rate of the legacy sketches that take one input per write
+ARDUINO_BAUD_RATE = 9600
+# Baud rate of the fpga-batch-comm sketch and its framed batch protocol
+ARDUINO_BATCH_BAUD_RATE = 115200
+# Seconds an Arduino takes to reset after its serial port is opened
+ARDUINO_RESET_TIME = 2
 FPGA_CONFIG_DIR = "data/config"
+# Config workspaces are kept in RAM here if it exists, and in FPGA_CONFIG_DIR otherwise
+FPGA_RAM_DIR = "/dev/shm"
+# Number of finished bitstreams kept for repeated CRAM images
+FPGA_BITSTREAM_CACHE_SIZE = 32
+# Bytes of bitstreams a cache keeps in memory. A full ECP5-85 .bit and its hex
+# .svf take several MB, and every ModelFPGA and farm has a cache of its own
+FPGA_BITSTREAM_CACHE_BYTES = 64 * 2 ** 20
+
+# This is the folder that caches data derived from the prjtrellis database
+FPGA_CACHE_DIR = os.path.join(ROOT_DIR, 'data/cache')
 
 